@@ -0,0 +1,390 @@
+"""
+Benchmarks of the generators and of the polygon_utils stages.
+
+    python benchmarks/run_benchmarks.py                 # every case
+    python benchmarks/run_benchmarks.py --quick         # skip the slow cases
+    python benchmarks/run_benchmarks.py -k penrose      # cases whose name contains 'penrose'
+    python benchmarks/run_benchmarks.py --save-baseline # store the results as the new baseline
+
+Every case runs in its own subprocess, so the peak RSS reported is the
+case's own (setup included, see rss_before_mb). Import cases time the import
+of a module in a fresh interpreter run with `python -X importtime`, and keep
+the slowest modules of its log. Results are written as JSON
+and compared with benchmarks/baseline.json: a case slower than the baseline
+by more than --threshold is reported as a regression and the exit code is 1.
+The baseline depends on the machine and is not committed: the first
+--save-baseline run creates it. The kernels/numba cases only run when Numba
+is installed.
+"""
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root and the generator directories to Python path
+benchmark_dir = Path(__file__).parent.resolve()
+project_root = benchmark_dir.parent
+sys.path.insert(0, str(project_root))
+for generator_dir in ('tramo5', 'tramo6', 'tramo7/hat_script'):
+    sys.path.insert(0, str(project_root / generator_dir))
+
+BASELINE = benchmark_dir / 'baseline.json'
+RESULTS = benchmark_dir / 'results.json'
+
+
+# Generators
+def deflation_polygons(tiling_type, n):
+    from shapely.geometry import Polygon
+    from shapely import affinity
+    from Deflation import generate, INITIAL_TILES
+    polygons = [Polygon(tile) for tile in generate(INITIAL_TILES[tiling_type], n)]
+    # same scale and position as tramo5/generate_stair_tiles.py
+    polygons = [affinity.scale(poly, xfact=3000, yfact=3000, origin=(0, 0)) for poly in polygons]
+    return [affinity.translate(poly, xoff=-600, yoff=-3200) for poly in polygons]
+
+
+def penrose_polygons(iters):
+    from penrose_tessellation import SUN, iterate, get_shapely_polygons
+    return get_shapely_polygons(iterate(SUN, iters))
+
+
+def hat_polygons(level):
+    from shapely.geometry import Polygon
+    from hat_blocks import make_block, rotate_60, convert_polygons_to_world_cs
+    # same basis as tramo7/hat_script/hat-tiling_v2.py
+    x = (0, 7.1)
+    polygons = convert_polygons_to_world_cs(make_block(level), [-100., -1400.], x, rotate_60(x))
+    return [Polygon(p) for p in polygons]
+
+
+SOURCES = {
+    'deflate_P1_N5': lambda: deflation_polygons('P1', 5),
+    'penrose_iters8': lambda: penrose_polygons(8),
+    'hat_level4': lambda: hat_polygons(4),
+}
+
+
+# Stages
+def framed(polygons):
+    from shapely.geometry import Polygon
+    from polygon_utils import center_frame
+    frame = Polygon([[0, 0], [1000, 0], [1000, 1700], [0, 1700]])
+    return center_frame(polygons, frame)
+
+
+def stage_frame_filter(polygons):
+    from polygon_utils import is_polygon_inside_frame
+    centered_frame = framed(polygons)
+    return lambda: [p for p in polygons if is_polygon_inside_frame(p, centered_frame)]
+
+
+def stage_inset(polygons):
+    from shapely.geometry import JOIN_STYLE
+    return lambda: [p.buffer(-3, join_style=JOIN_STYLE.mitre) for p in polygons]
+
+
+def stage_crop(polygons):
+    from polygon_utils import add_tile, add_inner_tile, crop_and_save_tile
+    tile = add_tile(905, 170, polygons, center_tile=True, up_shift=sum(framed(polygons).bounds[1::2]) / 2)
+    inner_tile = add_inner_tile(tile)
+    return lambda: crop_and_save_tile(polygons, inner_tile, save_holes=False)
+
+
+def stage_svg_export(polygons):
+    from polygon_utils import simple_svg_save
+    filename = os.path.join(tempfile.mkdtemp(), 'benchmark.svg')
+    return lambda: simple_svg_save(polygons, filename, label=False) and polygons
+
+
+STAGES = {
+    'frame_filter': stage_frame_filter,
+    'inset': stage_inset,
+    'crop': stage_crop,
+    'svg_export': stage_svg_export,
+}
+
+
+# Cases: name -> (setup returning the timed callable, slow)
+def deflation_case(tiling_type, n):
+    def setup():
+        from Deflation import generate, INITIAL_TILES
+        return lambda: generate(INITIAL_TILES[tiling_type], n)
+    return setup
+
+
+def penrose_case(iters):
+    def setup():
+        from penrose_tessellation import SUN, iterate
+        return lambda: iterate(SUN, iters)
+    return setup
+
+
+def hat_case(level):
+    def setup():
+        from hat_blocks import make_block
+        return lambda: make_block(level)
+    return setup
+
+
+# a whole metatile, as an array (make_metatile's lists of tuples are slower
+# than the tiling itself)
+def metatile_case(level):
+    def setup():
+        import hat_metatiles
+        x = (0, 7.1)
+        return lambda: hat_metatiles.query_window(level, (-1e9, -1e9, 1e9, 1e9), (0, 0),
+                                                  x, hat_metatiles.rotate_60(x))
+    return setup
+
+
+# a riser-sized window (908mm x 165mm) of each generator, in its own coordinates
+def query_case(engine):
+    def setup():
+        if engine == 'deflate':
+            from Deflation import queryWindow, INITIAL_TILES
+            window = (0.3, 0.3, 0.3 + 908 / 3000, 0.3 + 165 / 3000)
+            return lambda: [t for group in queryWindow(INITIAL_TILES['P1'], 8, window).values() for t in group]
+        if engine == 'penrose':
+            from penrose_tessellation import SUN, query_window
+            return lambda: query_window(SUN, 10, (-454, -82, 454, 82))['vertices']
+        if engine == 'socolar':
+            from socolar import generate
+            return lambda: generate((0, 0, 908, 165))
+        if engine == 'pentagrid':
+            import pentagrid
+            return lambda: pentagrid.generate((0, 0, 908, 165))
+        if engine == 'metatiles':
+            import hat_metatiles
+            x = (0, 7.1)
+            return lambda: hat_metatiles.query_window(7, (-454, -82, 454, 82), (0, 0), x, hat_metatiles.rotate_60(x))
+        import hat_blocks
+        x = (0, 7.1)
+        return lambda: hat_blocks.query_window(5, (-554, -1482, 354, -1318), (-100., -1400.),
+                                               x, hat_blocks.rotate_60(x))
+    return setup
+
+
+# the vectorized generators on each kernel backend, compiled (numba) and
+# warmed up outside the timed call. The generators only offer 'numba' (in
+# their KERNELS) when it imports: the same test here, without importing the
+# generators, which would spoil the import cases
+KERNEL_BACKENDS = ('numpy', 'numba') if importlib.util.find_spec('numba') else ('numpy',)
+
+
+def kernel_case(backend, engine):
+    def setup():
+        if engine == 'deflate':
+            import Deflation
+            Deflation.setKernelBackend(backend)
+            Deflation._deflateArrays(Deflation.tileArrays(Deflation.INITIAL_TILES['P1']))
+            return lambda: Deflation.generate_checkpointed(Deflation.INITIAL_TILES['P1'], 7, None)
+        if engine == 'penrose':
+            import penrose_tessellation
+            penrose_tessellation.set_kernel_backend(backend)
+            penrose_tessellation.query_window(penrose_tessellation.SUN, 1, (-1, -1, 1, 1))
+            return lambda: penrose_tessellation.iterate_checkpointed(penrose_tessellation.SUN, 10, None)['kind']
+        import hat_blocks
+        hat_blocks.set_kernel_backend(backend)
+        x = (0, 7.1)
+        hat_blocks.query_window(1, (-1e9, -1e9, 1e9, 1e9), (0, 0), x, hat_blocks.rotate_60(x))
+        return lambda: hat_blocks.query_window(5, (-1e9, -1e9, 1e9, 1e9), (-100., -1400.),
+                                               x, hat_blocks.rotate_60(x))
+    return setup
+
+
+# the nine tramo4 risers, from the strip's motif (the SVG parsed in setup)
+def girih_case():
+    def setup():
+        from girih import load_motif, riser_cut_lists
+        motif = load_motif()
+        return lambda: [p for cut_list in riser_cut_lists(motif) for p in cut_list]
+    return setup
+
+
+def stage_case(stage, source):
+    return lambda: STAGES[stage](SOURCES[source]())
+
+
+# modules a build worker imports, timed in a fresh interpreter
+IMPORTS = ('polygon_geometry', 'polygon_utils', 'Deflation', 'penrose_tessellation',
+           'hat_blocks', 'stamping', 'manufacturability', 'toolpath', 'nesting', 'preview',
+           'riser_session', 'tuner', 'streaming', 'girih', 'hat_metatiles')
+
+
+def import_case(module):
+    def run():
+        before = set(sys.modules)
+        importlib.import_module(module)
+        return sorted(set(sys.modules) - before)
+    return lambda: run
+
+
+def all_cases():
+    cases = {}
+    for tiling_type in ('P1', 'P2', 'P3', 'A5'):
+        for n in range(3, 9):
+            slow = (tiling_type == 'P1' and n >= 7) or (tiling_type == 'A5' and n >= 6)
+            cases[f'deflate/{tiling_type}/N{n}'] = (deflation_case(tiling_type, n), slow)
+    for iters in range(4, 9):
+        cases[f'penrose/iters{iters}'] = (penrose_case(iters), False)
+    for level in range(2, 6):
+        cases[f'hat/level{level}'] = (hat_case(level), level >= 5)
+    for level in range(4, 8):
+        cases[f'metatiles/level{level}'] = (metatile_case(level), False)
+    cases['girih/risers'] = (girih_case(), False)
+    for engine in ('deflate', 'penrose', 'hat'):
+        cases[f'query/{engine}'] = (query_case(engine), False)
+        for backend in KERNEL_BACKENDS:
+            cases[f'kernels/{backend}/{engine}'] = (kernel_case(backend, engine), False)
+    for engine in ('socolar', 'pentagrid', 'metatiles'):
+        cases[f'query/{engine}'] = (query_case(engine), False)
+    for stage in STAGES:
+        for source in SOURCES:
+            cases[f'stage/{stage}/{source}'] = (stage_case(stage, source), False)
+    for module in IMPORTS:
+        cases[f'import/{module}'] = (import_case(module), False)
+    return cases
+
+
+def _rss_mb():
+    # peak resident set size of this process (ru_maxrss is in KB on Linux, bytes on macOS)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def run_case(name):
+    """Run one case in this process and return its measurements"""
+    setup, _ = all_cases()[name]
+    run = setup()
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    result = run()
+    wall = time.perf_counter() - start
+    return {
+        'wall_s': wall,
+        'peak_rss_mb': _rss_mb(),
+        'rss_before_mb': rss_before,
+        'count': len(result),
+    }
+
+
+def slowest_imports(importtime_log, count=5):
+    """The modules with the largest self time in a `python -X importtime` log"""
+    modules = []
+    for line in importtime_log.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            self_us, _, module = line[len('import time:'):].split('|')
+            if self_us.strip().isdigit():
+                modules.append((int(self_us), module.strip()))
+    return [f'{module} {self_us / 1000:.1f}ms' for self_us, module in sorted(modules, reverse=True)[:count]]
+
+
+def run_in_subprocess(name, timeout):
+    command = [sys.executable, __file__, '--case', name]
+    if name.startswith('import/'):
+        command[1:1] = ['-X', 'importtime']
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f'timeout after {timeout}s'}
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed'}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if name.startswith('import/'):
+        result['slowest_imports'] = slowest_imports(completed.stderr)
+    return result
+
+
+def compare(results, baseline, threshold, noise=0.01):
+    """
+    Cases slower than the baseline by more than threshold (and by more than
+    `noise` seconds, so millisecond cases don't flap), as report lines
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or 'wall_s' not in base or 'wall_s' not in result:
+            continue
+        ratio = result['wall_s'] / max(base['wall_s'], 1e-9)
+        if ratio > 1 + threshold and result['wall_s'] - base['wall_s'] > noise:
+            regressions.append(f"{name}: {base['wall_s']:.3f}s -> {result['wall_s']:.3f}s (x{ratio:.2f})")
+    return regressions
+
+
+def format_result(name, result, base=None):
+    if 'error' in result:
+        return f"{name:<40} {result['error']}"
+    line = (f"{name:<40} {result['wall_s']:9.3f}s {result['peak_rss_mb']:8.0f}MB "
+            f"{result['count']:9d} {'modules' if name.startswith('import/') else 'tiles'}")
+    if base and 'wall_s' in base:
+        line += f"   baseline {base['wall_s']:.3f}s"
+    return line
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='filter', default='', help='only cases whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='skip the slow cases')
+    parser.add_argument('--output', default=str(RESULTS), help='where to write the results')
+    parser.add_argument('--baseline', default=str(BASELINE), help='baseline to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown (0.2 = 20%%)')
+    parser.add_argument('--timeout', type=float, default=900, help='seconds allowed per case')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.case:
+        # child process: one case, result as the last line of stdout
+        print(json.dumps(run_case(args.case)))
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['cases']
+    elif not args.save_baseline:
+        # timings depend on the machine, so no baseline is committed
+        print(f"no baseline at {args.baseline}: the results are not compared, "
+              f"run with --save-baseline to create one\n", flush=True)
+
+    results = {}
+    for name, (_, slow) in all_cases().items():
+        if args.filter not in name or (slow and args.quick):
+            continue
+        results[name] = run_in_subprocess(name, args.timeout)
+        print(format_result(name, results[name], baseline.get(name)), flush=True)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'cases': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        # keep the baseline of the cases that were not run this time
+        with open(args.baseline, 'w') as f:
+            json.dump({**report, 'cases': {**baseline, **results}}, f, indent=2)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressions (> {args.threshold:.0%} slower than the baseline):")
+        print('\n'.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Procedural girih strips for the tramo4 risers.
+
+    python girih.py            # writes tramo4/tabica_4.1.svg ... tabica_4.9.svg
+
+The tramo4 design (persian_geometry_final.svg) is an 8-fold strapwork
+strip: rows of 16- and 18-gon rosettes with their kites, bowties and
+pentagons, repeating every 86.93 mm along the strip. The notebook
+repeated the whole strip nine times (every STRIP_SPACING mm) and
+intersected every copy with every frame. Here the strip is read once and
+reduced to one period (the motif); the pattern is the motif on its
+lattice, and a frame only asks for the cells that meet it:
+
+    motif = load_motif()
+    polygons = pattern_window(motif, frame.bounds)
+    cut_list = crop_to_rectangle(polygons, frame.bounds)
+
+The nine 4.x risers come out of riser_cut_lists() in one pass.
+"""
+from functools import lru_cache
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+import numpy as np
+import shapely
+from shapely import affinity
+from shapely.geometry import Polygon
+
+from polygon_geometry import crop_to_rectangle
+
+project_root = Path(__file__).parent.resolve()
+
+PERSIAN_SVG = project_root / 'tramo4' / 'persian_geometry_final.svg'
+# lattice of the pattern: along the strip (measured on the rosettes of
+# the SVG, see strip_period) and between strips (as in the notebook)
+STRIP_SPACING = 240
+MIN_AREA = 21   # smaller holes are not cut
+
+
+# Motif
+@lru_cache(maxsize=None)
+def read_strip(svg=PERSIAN_SVG):
+    """Polygons of the strip SVG (parsed once per file)"""
+    from svg_paths import read_svg_geometries
+    geometries = read_svg_geometries(ET.parse(svg).getroot())
+    return tuple(g for g in geometries if g.geom_type == 'Polygon')
+
+
+def strip_period(polygons):
+    """
+    Period of a strip along x: spacing of its rosettes (the polygons with
+    the most vertices) along their longest row, one rosette per period.
+    """
+    counts = shapely.get_num_coordinates(np.asarray(polygons, dtype=object))
+    rosettes = np.asarray(polygons, dtype=object)[counts == counts.max()]
+    x, y = shapely.get_coordinates(shapely.centroid(rosettes)).T
+    rows, row_of = np.unique(np.round(y), return_inverse=True)
+    row = np.sort(x[row_of == np.bincount(row_of).argmax()])
+    return (row[-1] - row[0]) / (len(row) - 1)
+
+
+def load_motif(svg=PERSIAN_SVG, spacing=STRIP_SPACING):
+    """
+    One period of the strip: the polygons whose centroid falls in a
+    period-wide slice from the middle of the strip (so none of them is cut
+    by the ends of the drawing). Returns a dict with the motif polygons
+    (an object array), the lattice period (x, y) and the motif's origin.
+    """
+    polygons = np.asarray(read_strip(svg), dtype=object)
+    period = strip_period(polygons)
+    x = shapely.get_coordinates(shapely.centroid(polygons))[:, 0]
+    minx, _, maxx, _ = shapely.total_bounds(polygons)
+    start = minx + np.floor((maxx - minx) / period / 2) * period
+    motif = polygons[(x >= start) & (x < start + period)]
+    return {'polygons': motif, 'period': (period, spacing), 'origin': start}
+
+
+# Periodic pattern
+def pattern_window(motif, window):
+    """
+    Polygons of the periodic pattern (the motif on its lattice) whose
+    bounding box meets window = (minx, miny, maxx, maxy), as an object array.
+    """
+    polygons = motif['polygons']
+    px, py = motif['period']
+    minx, miny, maxx, maxy = shapely.total_bounds(polygons)
+    # lattice cells whose copy of the motif can meet the window
+    columns = range(int(np.floor((window[0] - maxx) / px)), int(np.ceil((window[2] - minx) / px)) + 1)
+    rows = range(int(np.floor((window[1] - maxy) / py)), int(np.ceil((window[3] - miny) / py)) + 1)
+    bounds = shapely.bounds(polygons)
+    cells = []
+    for j in rows:
+        for i in columns:
+            dx, dy = i * px, j * py
+            meets = ((bounds[:, 0] + dx <= window[2]) & (bounds[:, 2] + dx >= window[0])
+                     & (bounds[:, 1] + dy <= window[3]) & (bounds[:, 3] + dy >= window[1]))
+            if meets.any():
+                cells.append(shapely.transform(polygons[meets], lambda c, dx=dx, dy=dy: c + (dx, dy)))
+    return np.concatenate(cells) if cells else np.empty(0, dtype=object)
+
+
+# Risers, as in tramo4/cutting_ghiri.ipynb (SVG coordinates, y down)
+INNER_FRAME = (885, 116)
+OUTER_FRAME = (908, 167)
+FINAL_INNER_FRAME = (885, 150)
+FINAL_OUTER_FRAME = (908, 184)
+Y_START = 1705
+X_OFFSET = 10
+IN_MARGIN = 10.5
+UP_SHIFT = 4
+
+
+def _rectangle(width, height, dx, dy):
+    return affinity.translate(Polygon([(0, 0), (width, 0), (width, height), (0, height)]), dx, dy)
+
+
+def riser_frames():
+    """(inner frame, outer frame) of the nine 4.x risers"""
+    frames = [(_rectangle(*INNER_FRAME, X_OFFSET + IN_MARGIN, Y_START + 30 - (STRIP_SPACING + UP_SHIFT) * i),
+               _rectangle(*OUTER_FRAME, X_OFFSET, Y_START - (STRIP_SPACING + UP_SHIFT) * i))
+              for i in range(8)]
+    frames.append((_rectangle(*FINAL_INNER_FRAME, X_OFFSET + IN_MARGIN,
+                              Y_START + 15 + (STRIP_SPACING - UP_SHIFT) - 8),
+                   _rectangle(*FINAL_OUTER_FRAME, X_OFFSET, Y_START + (STRIP_SPACING - UP_SHIFT) - 8)))
+    return frames
+
+
+def riser_cut_lists(motif=None, frames=None):
+    """
+    Cut list of every riser: the pattern inside its inner frame (holes
+    smaller than MIN_AREA left out), followed by its outer frame.
+    """
+    motif = motif or load_motif()
+    cut_lists = []
+    for inner, outer in frames or riser_frames():
+        bounds = inner.bounds
+        cut_list = crop_to_rectangle(pattern_window(motif, bounds), bounds)
+        cut_lists.append([p for p in cut_list if p.area >= MIN_AREA] + [outer])
+    return cut_lists
+
+
+if __name__ == '__main__':
+    from polygon_utils import save_polygon_list_to_svg
+    for number, cut_list in enumerate(riser_cut_lists(), start=1):
+        filename = project_root / 'tramo4' / f'tabica_4.{number}.svg'
+        save_polygon_list_to_svg(cut_list, filename=str(filename))
+        print(f"{filename.name}: {len(cut_list) - 1} holes")
@@ -0,0 +1,235 @@
+"""
+Per-stage timing of the riser pipeline.
+
+    from instrumentation import stage, riser, enable, report_text
+
+    enable()                      # or TESCALERA_PROFILE=1 in the environment
+    with riser('511'):
+        with stage('inset', polygons) as s:
+            inset = [p.buffer(-3) for p in polygons]
+            s.out(inset)
+    print(report_text())
+
+Every stage records its wall time and the number of polygons in and out,
+grouped by riser. When instrumentation is off (the default) `stage` and
+`riser` hand back a shared do-nothing context manager, so the hooks can stay
+in the scripts at no cost.
+
+Options of enable():
+* count_geos: also count the calls into shapely's vectorized API (each one
+  a GEOS operation, over one geometry or an array of them). This uses a
+  profile hook, so it slows the stage down.
+* profile_stage: capture a cProfile (or pyinstrument) profile of every run
+  of the stage with that name, saved in profile_dir.
+"""
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# modules of shapely's vectorized API, every call goes down to GEOS
+_GEOS_MODULES = ('constructive', 'predicates', 'measurement', 'set_operations',
+                 'linear', 'coordinates', 'creation', '_geometry', 'io')
+
+_settings = {
+    'enabled': os.environ.get('TESCALERA_PROFILE', '') not in ('', '0'),
+    'count_geos': False,
+    'profile_stage': os.environ.get('TESCALERA_PROFILE_STAGE') or None,
+    'profiler': 'cprofile',
+    'profile_dir': Path('.'),
+}
+_records = []
+_current_riser = [None]
+
+
+def enable(count_geos=False, profile_stage=None, profiler='cprofile', profile_dir='.'):
+    """Turn instrumentation on (see the module docstring for the options)"""
+    _settings.update(enabled=True, count_geos=count_geos, profiler=profiler,
+                     profile_stage=profile_stage or _settings['profile_stage'],
+                     profile_dir=Path(profile_dir))
+
+
+def disable():
+    _settings['enabled'] = False
+
+
+def is_enabled():
+    return _settings['enabled']
+
+
+def reset():
+    """Forget the stages recorded so far"""
+    _records.clear()
+
+
+def _count(polygons):
+    if polygons is None:
+        return None
+    try:
+        return len(polygons)
+    except TypeError:
+        return 1
+
+
+class _NoStage:
+    # what stage() and riser() return when instrumentation is off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def out(self, polygons):
+        return polygons
+
+
+_NO_STAGE = _NoStage()
+
+
+class _GeosCounter:
+    # profile hook counting calls to shapely's vectorized API
+    def __init__(self):
+        self.calls = 0
+        self.previous = None
+
+    def __call__(self, frame, event, arg):
+        if event == 'call':
+            filename = frame.f_code.co_filename
+            if 'shapely' in filename and Path(filename).stem in _GEOS_MODULES:
+                self.calls += 1
+
+    def start(self):
+        self.previous = sys.getprofile()
+        sys.setprofile(self)
+
+    def stop(self):
+        sys.setprofile(self.previous)
+
+
+class _Stage:
+    def __init__(self, name, polygons, riser):
+        self.record = {
+            'riser': riser if riser is not None else _current_riser[0],
+            'stage': name,
+            'seconds': 0.0,
+            'polygons_in': _count(polygons),
+            'polygons_out': None,
+        }
+        self.counter = _GeosCounter() if _settings['count_geos'] else None
+        self.profiler = None
+
+    def out(self, polygons):
+        """Record the stage's output count; returns polygons unchanged"""
+        self.record['polygons_out'] = _count(polygons)
+        return polygons
+
+    def __enter__(self):
+        if _settings['profile_stage'] == self.record['stage']:
+            self.profiler = _start_profiler()
+        if self.counter is not None:
+            self.counter.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record['seconds'] = time.perf_counter() - self.start
+        if self.counter is not None:
+            self.counter.stop()
+            self.record['geos_calls'] = self.counter.calls
+        if self.profiler is not None:
+            _save_profile(self.profiler, self.record)
+        _records.append(self.record)
+        return False
+
+
+def stage(name, polygons=None, riser=None):
+    """
+    Context manager timing one stage of the pipeline.
+
+    Args:
+        name: stage name, e.g. 'inset'
+        polygons: the stage's input, to count it
+        riser: riser the stage works on, defaults to the enclosing riser()
+    """
+    if not _settings['enabled']:
+        return _NO_STAGE
+    return _Stage(name, polygons, riser)
+
+
+@contextmanager
+def _riser_scope(name):
+    previous = _current_riser[0]
+    _current_riser[0] = name
+    try:
+        yield
+    finally:
+        _current_riser[0] = previous
+
+
+def riser(name):
+    """Context manager assigning the stages inside it to a riser"""
+    if not _settings['enabled']:
+        return _NO_STAGE
+    return _riser_scope(name)
+
+
+# Profiling of a chosen stage
+def _start_profiler():
+    if _settings['profiler'] == 'pyinstrument':
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+
+def _save_profile(profiler, record):
+    name = f"{record['riser'] or 'all'}_{record['stage']}"
+    _settings['profile_dir'].mkdir(parents=True, exist_ok=True)
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        filename = _settings['profile_dir'] / f'{name}.prof'
+        profiler.dump_stats(filename)
+    else:
+        profiler.stop()
+        filename = _settings['profile_dir'] / f'{name}.html'
+        filename.write_text(profiler.output_html())
+    record['profile'] = str(filename)
+
+
+# Reports
+def report():
+    """Recorded stages grouped by riser: {riser: [stage records]}"""
+    grouped = {}
+    for record in _records:
+        grouped.setdefault(str(record['riser'] or 'all'), []).append(record)
+    return grouped
+
+
+def report_text():
+    """One line per stage, one block per riser, with the riser totals"""
+    lines = []
+    for riser_name, records in report().items():
+        lines.append(f"riser {riser_name}")
+        for record in records:
+            counts = ''
+            if record['polygons_in'] is not None:
+                counts += f"  in {record['polygons_in']:7d}"
+            if record['polygons_out'] is not None:
+                counts += f"  out {record['polygons_out']:7d}"
+            if 'geos_calls' in record:
+                counts += f"  geos {record['geos_calls']:8d}"
+            lines.append(f"  {record['stage']:<16} {record['seconds']:8.3f}s{counts}")
+        lines.append(f"  {'total':<16} {sum(r['seconds'] for r in records):8.3f}s")
+    return '\n'.join(lines)
+
+
+def save_report(filename):
+    """Write the per-riser report as JSON"""
+    with open(filename, 'w') as f:
+        json.dump(report(), f, indent=2)
@@ -0,0 +1,126 @@
+"""
+Manufacturability checks for the final cut list of a riser.
+
+The area threshold applied after cropping (`p.area >= 21`) lets through
+thin slivers, near-touching holes and webs narrower than the laser can
+hold. These checks look at distances instead:
+
+* narrow webs: two cut paths closer than the minimum web width. Pairs are
+  found with an STRtree `dwithin` query on the cut paths (polygon
+  boundaries), so the check stays near-linear on the 10k+ holes of a
+  Penrose riser. A hole close to the riser outline is a narrow web too.
+* thin features: polygons that mostly vanish when opened (shrunk by half
+  the web width, then grown back), i.e. slivers and strips narrower than
+  the laser can cut. Their minimum clearance is no use here: it is never
+  larger than the shortest edge, so a wide hole with one tiny edge left
+  by clipping would count as thin.
+"""
+import numpy as np
+import shapely
+from shapely import STRtree
+
+MIN_WEB_WIDTH = 1.5  # mm of material the laser can reliably leave between cuts
+MIN_KEPT_AREA = 0.5  # fraction of a polygon's area that must survive the opening
+
+
+def _cut_paths(geometries):
+    # polygons are cut along their boundary, lines along themselves
+    polygonal = np.isin(shapely.get_type_id(geometries),
+                        (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON))
+    paths = geometries.copy()
+    paths[polygonal] = shapely.boundary(geometries[polygonal])
+    return paths, polygonal
+
+
+def check_cut_list(cut_list, min_web=MIN_WEB_WIDTH, min_kept=MIN_KEPT_AREA):
+    """
+    Find the cut paths that are too close to each other, and the polygons
+    too thin to survive cutting.
+
+    Args:
+        cut_list: list of shapely geometries, as passed to simple_svg_save
+        min_web: minimum width of material between two cuts, in mm
+        min_kept: a polygon is thin when less than this fraction of its
+                  area is wider than min_web
+
+    Returns:
+        dict with
+        - narrow_webs: (k, 2) int array of index pairs (i < j) closer than min_web
+        - web_widths: (k,) distance between each of those pairs
+        - thin: indices of polygons mostly narrower than min_web
+        - kept_fractions: (k,) fraction of the area of each of those
+          polygons that is wider than min_web
+    """
+    geometries = np.empty(len(cut_list), dtype=object)
+    geometries[:] = list(cut_list)
+    valid = np.flatnonzero(~shapely.is_empty(geometries) & (shapely.get_dimensions(geometries) > 0))
+    paths, polygonal = _cut_paths(geometries[valid])
+
+    # pairs of cut paths within min_web of each other
+    tree = STRtree(paths)
+    first, second = tree.query(paths, predicate='dwithin', distance=min_web)
+    keep = first < second
+    first, second = first[keep], second[keep]
+    web_widths = shapely.distance(paths[first], paths[second])
+    narrow_webs = np.column_stack([valid[first], valid[second]])
+
+    # slivers and strips: the part of each polygon wider than min_web is what
+    # survives an opening by min_web / 2 (mitred, so corners come back)
+    polygon_idx = np.flatnonzero(polygonal)
+    polygons = geometries[valid[polygon_idx]]
+    opened = shapely.buffer(shapely.buffer(polygons, -min_web / 2, join_style='mitre'),
+                            min_web / 2, join_style='mitre')
+    areas = shapely.area(polygons)
+    kept = np.divide(shapely.area(shapely.intersection(opened, polygons)), areas,
+                     out=np.zeros(len(polygons)), where=areas > 0)
+    thin = kept < min_kept
+
+    return {
+        'narrow_webs': narrow_webs,
+        'web_widths': web_widths,
+        'thin': valid[polygon_idx[thin]],
+        'kept_fractions': kept[thin],
+    }
+
+
+def remove_offenders(cut_list, report, protected=()):
+    """
+    Drop the geometries flagged by check_cut_list: every thin polygon, and
+    for each narrow web the smaller of the two cuts, narrowest webs first.
+
+    Args:
+        cut_list: the list given to check_cut_list
+        report: its result
+        protected: indices never removed (riser outlines, frames); a narrow
+                   web between a protected geometry and a hole removes the
+                   hole, between two protected geometries it is only reported
+
+    Returns:
+        list of the geometries kept, in their original order
+    """
+    is_protected = np.zeros(len(cut_list), dtype=bool)
+    is_protected[list(protected)] = True
+    removed = np.zeros(len(cut_list), dtype=bool)
+    removed[report['thin']] = True
+    removed &= ~is_protected
+    areas = shapely.area(np.asarray(cut_list, dtype=object))
+    for k in np.argsort(report['web_widths'], kind='stable'):
+        i, j = report['narrow_webs'][k]
+        if removed[i] or removed[j] or (is_protected[i] and is_protected[j]):
+            continue
+        if is_protected[i] or is_protected[j]:
+            removed[j if is_protected[i] else i] = True
+        else:
+            removed[i if areas[i] < areas[j] else j] = True
+    return [geom for geom, drop in zip(cut_list, removed) if not drop]
+
+
+def format_report(report, min_web=MIN_WEB_WIDTH):
+    """One line per kind of problem, for printing at the end of a build"""
+    lines = [f"narrow webs (< {min_web}mm): {len(report['narrow_webs'])}"]
+    if len(report['web_widths']):
+        lines[-1] += f", narrowest {report['web_widths'].min():.2f}mm"
+    lines.append(f"thin polygons (mostly < {min_web}mm wide): {len(report['thin'])}")
+    if len(report['kept_fractions']):
+        lines[-1] += f", {report['kept_fractions'].min():.0%} of the thinnest is wider"
+    return '\n'.join(lines)
@@ -0,0 +1,221 @@
+"""
+Lay the risers of a staircase out on metal sheets.
+
+The scripts stack risers with hard-coded `up_shift=tile.bounds[3] + 7`
+offsets and fabricacion/distribucion_por_chapa.svg was arranged by hand.
+Here the outer tile of every riser is treated as a rectangle and packed
+with the MaxRects heuristic (best short side fit), opening a new sheet when
+nothing fits. A short local search over the packing order (swaps of two
+risers, kept when they save a sheet or empty the last one) improves on the
+largest-first order.
+
+Sheet coordinates put the sheet at [0, width] x [-height, 0], so that the
+y flip of simple_svg_save draws it inside its viewBox.
+"""
+import numpy as np
+import shapely
+from shapely import STRtree, affinity
+
+from polygon_utils import simple_svg_save
+
+SHEET_SIZE = (1000, 2000)  # mm, width x height of a metal sheet
+SPACING = 7                # mm between two risers, as in the stacking scripts
+MARGIN = 7                 # mm between the risers and the sheet edge
+
+
+# MaxRects
+def _fits(free, w, h):
+    return free[2] >= w and free[3] >= h
+
+
+def _split_free(free_rects, x, y, w, h):
+    # replace every free rectangle overlapping the placed one by the
+    # (up to four) maximal free rectangles around it
+    result = []
+    for fx, fy, fw, fh in free_rects:
+        if x >= fx + fw or x + w <= fx or y >= fy + fh or y + h <= fy:
+            result.append((fx, fy, fw, fh))
+            continue
+        if x > fx:
+            result.append((fx, fy, x - fx, fh))
+        if x + w < fx + fw:
+            result.append((x + w, fy, fx + fw - x - w, fh))
+        if y > fy:
+            result.append((fx, fy, fw, y - fy))
+        if y + h < fy + fh:
+            result.append((fx, y + h, fw, fy + fh - y - h))
+    # drop free rectangles contained in another one
+    pruned = []
+    for i, a in enumerate(result):
+        contained = any(
+            j != i and a[0] >= b[0] and a[1] >= b[1]
+            and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3]
+            and (a != b or j < i)
+            for j, b in enumerate(result))
+        if not contained:
+            pruned.append(a)
+    return pruned
+
+
+def _best_position(free_rects, w, h, rotate):
+    # best short side fit over all free rectangles and both orientations
+    best = None
+    for free in free_rects:
+        for rw, rh, rotated in ((w, h, False), (h, w, True)) if rotate else ((w, h, False),):
+            if _fits(free, rw, rh):
+                short = min(free[2] - rw, free[3] - rh)
+                long = max(free[2] - rw, free[3] - rh)
+                score = (short, long, free[1], free[0])
+                if best is None or score < best[0]:
+                    best = (score, free[0], free[1], rw, rh, rotated)
+    return best
+
+
+def _pack(sizes, order, bin_size, rotate):
+    # place the rectangles in the given order; returns one list of
+    # (index, x, y, rotated) per sheet
+    sheets, free = [], []
+    for index in order:
+        w, h = sizes[index]
+        for k, free_rects in enumerate(free):
+            best = _best_position(free_rects, w, h, rotate)
+            if best is not None:
+                break
+        else:
+            sheets.append([])
+            free.append([(0.0, 0.0, bin_size[0], bin_size[1])])
+            k = len(free) - 1
+            best = _best_position(free[k], w, h, rotate)
+            if best is None:
+                raise ValueError(f"riser {index} ({w:.0f} x {h:.0f}mm) does not fit on a sheet")
+        _, x, y, rw, rh, rotated = best
+        sheets[k].append((index, x, y, rotated))
+        free[k] = _split_free(free[k], x, y, rw, rh)
+    return sheets
+
+
+def _cost(sheets, areas):
+    # fewer sheets first, then the emptiest possible last sheet
+    return len(sheets), sum(areas[index] for index, *_ in sheets[-1])
+
+
+def pack_rectangles(sizes, sheet_size=SHEET_SIZE, spacing=SPACING, margin=MARGIN,
+                    rotate=True, iterations=100, seed=0):
+    """
+    Pack rectangles onto as few sheets as possible.
+
+    Args:
+        sizes: (n, 2) width and height of each rectangle, in mm
+        sheet_size: width and height of a sheet
+        spacing: gap left between two rectangles
+        margin: gap left between the rectangles and the sheet edge
+        rotate: allow quarter turns
+        iterations: local search swaps tried after the largest-first packing
+        seed: of the local search
+
+    Returns:
+        list of sheets, each a list of (index, x, y, rotated) with (x, y) the
+        lower left corner of the rectangle on the sheet
+    """
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    # each rectangle owns a strip of `spacing` on its right and top
+    padded = [tuple(size) for size in sizes + spacing]
+    bin_size = (sheet_size[0] - 2 * margin + spacing, sheet_size[1] - 2 * margin + spacing)
+    areas = sizes.prod(axis=1)
+
+    order = list(np.lexsort((-sizes.max(axis=1), -areas)))
+    best = _pack(padded, order, bin_size, rotate)
+    best_cost = _cost(best, areas)
+    rng = np.random.default_rng(seed)
+    for _ in range(iterations if len(order) > 1 else 0):
+        i, j = rng.choice(len(order), 2, replace=False)
+        candidate = order.copy()
+        candidate[i], candidate[j] = candidate[j], candidate[i]
+        sheets = _pack(padded, candidate, bin_size, rotate)
+        cost = _cost(sheets, areas)
+        if cost <= best_cost:
+            order, best, best_cost = candidate, sheets, cost
+
+    return [[(int(index), x + margin, y + margin, rotated) for index, x, y, rotated in sheet]
+            for sheet in best]
+
+
+# Risers
+def riser_sizes(tiles):
+    """(n, 2) bounding box width and height of the outer tile of each riser"""
+    bounds = shapely.bounds(np.asarray(tiles, dtype=object))
+    return bounds[:, 2:] - bounds[:, :2]
+
+
+def pack_risers(tiles, sheet_size=SHEET_SIZE, spacing=SPACING, margin=MARGIN, **kwargs):
+    """
+    Pack the outer tiles of the risers (see add_tile) onto sheets, using
+    their bounding boxes. Extra keyword arguments go to pack_rectangles.
+    """
+    return pack_rectangles(riser_sizes(tiles), sheet_size, spacing, margin, **kwargs)
+
+
+def group_by_riser(cut_list, tiles):
+    """
+    Split a combined cut list into one list per riser: every geometry goes
+    to the tile it lies within (the tile itself included). Geometries not
+    within any tile (e.g. the centred frame) are dropped.
+    """
+    tiles = np.asarray(tiles, dtype=object)
+    geometries = np.empty(len(cut_list), dtype=object)
+    geometries[:] = list(cut_list)
+    geom_idx, tile_idx = STRtree(tiles).query(geometries, predicate='within')
+    groups = [[] for _ in tiles]
+    seen = np.zeros(len(geometries), dtype=bool)
+    for g, t in zip(geom_idx, tile_idx):
+        if not seen[g]:
+            seen[g] = True
+            groups[t].append(cut_list[g])
+    return groups
+
+
+def place_riser(geometries, tile, x, y, rotated, sheet_size=SHEET_SIZE):
+    """
+    Move a riser's cut list so its tile lands at (x, y) on the sheet,
+    turned a quarter anticlockwise if rotated.
+    """
+    minx, miny, _, _ = tile.bounds
+    if rotated:
+        geometries = [affinity.rotate(g, 90, origin=(minx, miny)) for g in geometries]
+        tile = affinity.rotate(tile, 90, origin=(minx, miny))
+        minx, miny, _, _ = tile.bounds
+    # sheet frame [0, w] x [-h, 0], see the module docstring
+    dx, dy = x - minx, y - sheet_size[1] - miny
+    return [affinity.translate(g, dx, dy) for g in geometries]
+
+
+def save_sheets(riser_cut_lists, tiles, sheets, filename_pattern, sheet_size=SHEET_SIZE):
+    """
+    Write one cut file per sheet with simple_svg_save.
+
+    Args:
+        riser_cut_lists: one cut list per riser (see group_by_riser)
+        tiles: the outer tile of each riser
+        sheets: result of pack_risers
+        filename_pattern: e.g. 'sheet_{}.svg', formatted with the sheet number
+    """
+    size = (f'{sheet_size[0]}mm', f'{sheet_size[1]}mm')
+    filenames = []
+    for number, sheet in enumerate(sheets, start=1):
+        sheet_cut_list = []
+        for index, x, y, rotated in sheet:
+            sheet_cut_list += place_riser(riser_cut_lists[index], tiles[index], x, y, rotated, sheet_size)
+        filename = filename_pattern.format(number)
+        simple_svg_save(sheet_cut_list, filename, size=size, label=False)
+        filenames.append(filename)
+    return filenames
+
+
+def format_packing_report(sheets, sizes, sheet_size=SHEET_SIZE):
+    """One line per sheet with the risers on it and the area used"""
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    lines = []
+    for number, sheet in enumerate(sheets, start=1):
+        used = sum(sizes[index].prod() for index, *_ in sheet) / (sheet_size[0] * sheet_size[1])
+        lines.append(f"sheet {number}: {len(sheet)} risers, {used:.0%} used")
+    return '\n'.join(lines)
@@ -1,5 +1,6 @@
 import numpy as np
-from typing import List, Tuple, Set
+import shapely
+from typing import Dict, List, Tuple
 from shapely.geometry import Polygon
 
 def normalize_polygon(polygon) -> np.ndarray:
@@ -32,41 +33,221 @@ def normalize_polygon(polygon) -> np.ndarray:
     # Roll the array so that the leftmost point is first
     return np.roll(coords, -leftmost_index, axis=0)
 
+def _polygon_arrays(polygons: List) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vertices of every polygon (without the repeated last point) in one
+    (n_vertices, 2) array, plus the offsets of each polygon in it.
+    """
+    if all(isinstance(poly, Polygon) for poly in polygons):
+        rings = shapely.get_exterior_ring(np.asarray(polygons, dtype=object))
+        coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+        counts = np.bincount(ring_idx, minlength=len(polygons))
+        closing = np.cumsum(counts) - 1
+        keep = np.ones(len(coords), dtype=bool)
+        keep[closing[counts > 0]] = False
+        coords, counts = coords[keep], np.maximum(counts - 1, 0)
+    else:
+        arrays = [np.array(poly.exterior.coords)[:-1] if isinstance(poly, Polygon)
+                  else np.asarray(poly, dtype=float).reshape(-1, 2) for poly in polygons]
+        counts = np.array([len(a) for a in arrays], dtype=np.int64)
+        coords = np.concatenate(arrays) if arrays else np.empty((0, 2))
+    offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return coords, offsets
+
+
+def canonical_vertices(polygons: List, tolerance: float = 1e-10) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize every polygon to int64 multiples of `tolerance` and rewrite its
+    vertices in a canonical order, in one vectorized pass: start at the
+    lexicographically smallest vertex (min x, then min y) and go towards the
+    smaller of its two neighbours, so that cyclic rotations and both winding
+    directions of a polygon give the same sequence.
+
+    Returns:
+        canonical: (n_vertices, 2) int64 quantized vertices in canonical order
+        offsets: (n_polygons + 1,) offsets of each polygon in `canonical`
+    """
+    coords, offsets = _polygon_arrays(polygons)
+    counts = np.diff(offsets)
+    quantized = np.round(coords / tolerance).astype(np.int64)
+    if len(quantized) == 0:
+        return quantized, offsets
+    polygon_of = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(len(quantized)) - offsets[polygon_of]
+
+    # smallest vertex of each polygon: sort by (polygon, x, y)
+    order = np.lexsort((quantized[:, 1], quantized[:, 0], polygon_of))
+    first = order[offsets[:-1][counts > 0]]
+    start = np.zeros(len(counts), dtype=np.int64)
+    start[counts > 0] = local[first]
+
+    # direction: towards the smaller of the next and previous vertices
+    safe_counts = np.maximum(counts, 1)
+    following = quantized[offsets[:-1] + (start + 1) % safe_counts]
+    preceding = quantized[offsets[:-1] + (start - 1) % safe_counts]
+    backwards = (preceding[:, 0] < following[:, 0]) | (
+        (preceding[:, 0] == following[:, 0]) & (preceding[:, 1] < following[:, 1]))
+    direction = np.where(backwards, -1, 1)
+    step = local * direction[polygon_of]
+    canonical = quantized[offsets[polygon_of] + (start[polygon_of] + step) % counts[polygon_of]]
+    return canonical, offsets
+
+
+def find_duplicate_groups(polygons: List, tolerance: float = 1e-10) -> List[List[int]]:
+    """
+    Group identical polygons (same vertices up to `tolerance`, whatever the
+    starting vertex and winding direction).
+
+    Args:
+        polygons: List of numpy arrays or Shapely Polygon objects
+        tolerance: Floating point tolerance for coordinate comparison
+
+    Returns:
+        List of groups of two or more indices, each sorted, ordered by first index
+    """
+    canonical, offsets = canonical_vertices(polygons, tolerance)
+    # key -> indices of the polygons with that canonical form
+    groups: Dict[bytes, List[int]] = {}
+    for i, (lo, hi) in enumerate(zip(offsets[:-1], offsets[1:])):
+        groups.setdefault(canonical[lo:hi].tobytes(), []).append(i)
+    return [group for group in groups.values() if len(group) > 1]
+
+
 def find_duplicate_polygons(polygons: List, tolerance: float = 1e-10) -> List[Tuple[int, int]]:
     """
     Find duplicate polygons in a list of polygons.
-    
+
     Args:
         polygons: List of numpy arrays or Shapely Polygon objects
         tolerance: Floating point tolerance for coordinate comparison
-        
+
     Returns:
-        List of tuples containing indices of duplicate polygons
+        List of tuples (first occurrence, duplicate) of indices of duplicate
+        polygons, ordered by the duplicate's index
     """
-    duplicates = []
-    seen_polygons: Set[str] = set()
-    
-    for i, poly in enumerate(polygons):
-        # Normalize the polygon
-        norm_poly = normalize_polygon(poly)
-        
-        # Convert to string representation for hashing
-        # Round to handle floating point precision issues
-        poly_str = str(np.round(norm_poly / tolerance) * tolerance)
-        
-        # Check if we've seen this polygon before
-        if poly_str in seen_polygons:
-            # Find the first occurrence of this polygon
-            for j in range(i):
-                norm_poly_j = normalize_polygon(polygons[j])
-                poly_str_j = str(np.round(norm_poly_j / tolerance) * tolerance)
-                if poly_str_j == poly_str:
-                    duplicates.append((j, i))
-                    break
-        else:
-            seen_polygons.add(poly_str)
-    
-    return duplicates
+    duplicates = [(group[0], i) for group in find_duplicate_groups(polygons, tolerance)
+                  for i in group[1:]]
+    return sorted(duplicates, key=lambda pair: pair[1])
+
+def _drop_repeated_vertices(coords: np.ndarray, offsets: np.ndarray, tol: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drop every vertex within `tol` of the one before it (cyclically), e.g. a
+    ring coming back to its start point up to float noise before closing.
+    """
+    counts = np.diff(offsets)
+    polygon_of = np.repeat(np.arange(len(counts)), counts)
+    previous = np.arange(len(coords)) - 1
+    starts = offsets[:-1][counts > 0]
+    previous[starts] = offsets[1:][counts > 0] - 1
+    repeated = np.abs(coords - coords[previous]).max(axis=1) <= tol
+    # a last vertex repeating the first is dropped rather than the first,
+    # so every polygon keeps at least one vertex
+    wraps = starts[repeated[starts] & (counts[counts > 0] > 1)]
+    repeated[starts] = False
+    repeated[previous[wraps]] = True
+    counts = np.bincount(polygon_of[~repeated], minlength=len(counts))
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return coords[~repeated], offsets
+
+
+def _neighbour_pairs(points: np.ndarray, cell: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs (i, j), i < j, of points in the same or adjacent cells of a grid
+    of size `cell`: every pair closer than `cell` in x and y is among them.
+    """
+    cells = np.floor(points / cell).astype(np.int64)
+    cells -= cells.min(axis=0)
+    width = cells[:, 1].max() + 3
+    keys = (cells[:, 0] + 1) * width + cells[:, 1] + 1
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    first, second = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = keys + dx * width + dy
+            lo = np.searchsorted(sorted_keys, target, side='left')
+            hi = np.searchsorted(sorted_keys, target, side='right')
+            counts = hi - lo
+            i = np.repeat(np.arange(len(points)), counts)
+            j = order[np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+            first.append(i)
+            second.append(j)
+    first, second = np.concatenate(first), np.concatenate(second)
+    keep = first < second
+    return first[keep], second[keep]
+
+
+def _same_polygon(a: np.ndarray, b: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    For (p, n, 2) vertex arrays a and b, whether each b is a up to
+    `tolerance` per coordinate, with any starting vertex and winding.
+    """
+    n = a.shape[1]
+    steps = np.arange(n)
+    same = np.zeros(len(a), dtype=bool)
+    # every vertex of b matching the first vertex of a may fix the rotation
+    # (rings coming back to their start vertex have it twice, up to noise)
+    starts = np.abs(b - a[:, :1]).max(axis=2) <= tolerance
+    for shift in range(n):
+        rows = np.flatnonzero(starts[:, shift] & ~same)
+        if len(rows) == 0:
+            continue
+        forwards = b[rows][:, (shift + steps) % n]
+        backwards = b[rows][:, (shift - steps) % n]
+        same[rows] = ((np.abs(forwards - a[rows]).max(axis=(1, 2)) <= tolerance)
+                      | (np.abs(backwards - a[rows]).max(axis=(1, 2)) <= tolerance))
+    return same
+
+
+def dedupe(geoms: List, tol: float = 1e-6) -> np.ndarray:
+    """
+    Find near-duplicate polygons, robust to float noise: two polygons are
+    copies when they have the same number of vertices and every vertex of
+    one is within `tol` (in x and y) of the matching vertex of the other,
+    whatever the starting vertex and winding.
+
+    Candidates are found by snapping each polygon's vertex mean to a grid of
+    size `tol` and looking in the neighbouring cells too, so copies on both
+    sides of a cell boundary are not missed.
+
+    Args:
+        geoms: List of numpy arrays or Shapely Polygon objects
+        tol: largest coordinate difference between two copies
+
+    Returns:
+        Boolean mask, True for the polygons to keep (the first of every copy)
+    """
+    coords, offsets = _drop_repeated_vertices(*_polygon_arrays(geoms), tol)
+    counts = np.diff(offsets)
+    keep = np.ones(len(counts), dtype=bool)
+    if len(counts) < 2:
+        return keep
+    valid = counts > 0
+    means = np.zeros((len(counts), 2))
+    means[valid] = np.add.reduceat(coords, offsets[:-1][valid], axis=0) / counts[valid, None]
+
+    first, second = _neighbour_pairs(means, tol)
+    same_count = (counts[first] == counts[second]) & valid[first]
+    first, second = first[same_count], second[same_count]
+
+    # check the candidates, grouped by vertex count
+    is_copy = np.zeros(len(first), dtype=bool)
+    for n in np.unique(counts[first]):
+        pairs = np.flatnonzero(counts[first] == n)
+        vertex = np.arange(n)
+        a = coords[offsets[first[pairs], None] + vertex]
+        b = coords[offsets[second[pairs], None] + vertex]
+        is_copy[pairs] = _same_polygon(a, b, tol)
+    first, second = first[is_copy], second[is_copy]
+
+    # drop a polygon when it copies an earlier polygon that is itself kept
+    order = np.lexsort((first, second))
+    for i, j in zip(first[order], second[order]):
+        if keep[i]:
+            keep[j] = False
+    return keep
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,540 @@
+"""
+Core geometry helpers of the pipeline: frames, risers, cropping, shared
+edges and the binary geometry interchange. Only numpy and shapely are
+needed, so build scripts and worker processes can import this module
+without paying for matplotlib or svgwrite (polygon_utils re-exports
+everything here along with the plotting and SVG functions).
+"""
+import json
+import math
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, MultiPolygon, box, MultiPoint, Point
+from shapely import polygons as shp_polys
+from shapely import affinity
+
+from instrumentation import stage
+
+
+# Create Polygon
+def create_regular_polygon(center_x, center_y, radius, nr_points):
+    angle = 2 * math.pi / nr_points
+    polygon_points = []
+
+    for i in range(nr_points):
+        x = center_x + radius * math.cos(i * angle)
+        y = center_y + radius * math.sin(i * angle)
+        polygon_points.append((x, y))
+
+    return Polygon(polygon_points)
+
+# Polygon normalization helpers
+def _ensure_iterable(polygons):
+    if isinstance(polygons, Polygon):
+        return [polygons]
+    if isinstance(polygons, MultiPolygon):
+        return list(polygons.geoms)
+    return list(polygons)
+
+
+def _flatten_polygons(polygons):
+    flat_polygons = []
+    for polygon in polygons:
+        if isinstance(polygon, MultiPolygon):
+            flat_polygons.extend(list(polygon.geoms))
+        else:
+            flat_polygons.append(polygon)
+    return flat_polygons
+
+
+def center_frame(polygons, frame):
+    polygons = _flatten_polygons(_ensure_iterable(polygons))
+
+    max_poly_y = max(polygons, key=lambda x: x.centroid.bounds[1])
+    max_poly_x = max(polygons, key=lambda x: x.centroid.bounds[0])
+    min_poly_y = min(polygons, key=lambda x: x.centroid.bounds[1])
+    min_poly_x = min(polygons, key=lambda x: x.centroid.bounds[0])
+
+    min_y = min_poly_y.centroid.bounds[1]
+    min_x = min_poly_x.centroid.bounds[0]
+    max_y = max_poly_y.centroid.bounds[1]
+    max_x = max_poly_x.centroid.bounds[0]
+
+    polygon_center = box(min_x, min_y, max_x, max_y).centroid
+    frame_center = frame.centroid
+    dx = polygon_center.x - frame_center.x
+    dy = polygon_center.y - frame_center.y
+    centered_frame = affinity.translate(frame, dx, dy)
+    
+    return centered_frame
+    
+# center bounding box around polygons
+def center_rectangle_on_polygons(polygons, rectangle):
+    # Calculate the bounding box of all polygons
+    all_polygons = Polygon()
+    for poly in polygons:
+        all_polygons = all_polygons.union(poly)
+
+    polygons_bbox = all_polygons.bounds
+
+    # Calculate centroids
+    polygons_centroid = box(*polygons_bbox).centroid
+    rectangle_centroid = rectangle.centroid
+
+    # Calculate the translation needed
+    dx = polygons_centroid.x - rectangle_centroid.x
+    dy = polygons_centroid.y - rectangle_centroid.y
+
+    # Apply translation to the rectangle
+    centered_rectangle = affinity.translate(rectangle, dx, dy)
+
+    return centered_rectangle
+   
+# helper function to delete polygons that fall outside of frame
+def is_polygon_inside_frame(polygon, rect):
+    """Check if the centroid of a polygon is inside a rectangle."""
+    x, y = polygon.centroid.x, polygon.centroid.y
+    (rx1, ry1, rx2, ry2) = rect.bounds
+    return rx1 <= x <= rx2 and ry1 <= y <= ry2
+
+def crosses_boundary(poly, rect):
+    """It returns True when both conditions are met:
+      * not rect.contains(poly) → The polygon is NOT fully inside the rectangle*
+      * not poly.intersection(rect).is_empty → The polygon DOES overlap with the rectangle*
+      So it returns True only when the polygon partially overlaps - meaning it crosses the boundary.*
+      It returns False when:
+      * The polygon is fully inside (first condition fails)
+      * The polygon is fully outside (second condition fails)
+    """
+    return not rect.contains(poly) and not poly.intersection(rect).is_empty
+
+
+# Shared edges
+def _chain_edges(edges, n_vertices):
+    # walk the edge graph into maximal polylines: open chains start at
+    # vertices of degree != 2, what is left over are closed loops
+    ends = edges.ravel()
+    incident = np.argsort(ends, kind='stable') // 2
+    starts = np.zeros(n_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=n_vertices), out=starts[1:])
+    degree = np.diff(starts)
+    used = np.zeros(len(edges), dtype=bool)
+
+    def walk(vertex, edge):
+        chain = [vertex]
+        while True:
+            used[edge] = True
+            a, b = edges[edge]
+            vertex = b if a == vertex else a
+            chain.append(vertex)
+            if degree[vertex] != 2:
+                return chain
+            edge = next((e for e in incident[starts[vertex]:starts[vertex + 1]] if not used[e]), None)
+            if edge is None:
+                return chain
+
+    chains = []
+    for vertex in np.flatnonzero(degree != 2):
+        for edge in incident[starts[vertex]:starts[vertex + 1]]:
+            if not used[edge]:
+                chains.append(walk(vertex, edge))
+    for edge in np.flatnonzero(~used):
+        if not used[edge]:
+            chains.append(walk(edges[edge, 0], edge))
+    return chains
+
+
+def shared_edge_polylines(polygon_list, tolerance=1e-3):
+    """
+    Planar edge graph of a tiling: every edge shared by two neighbouring
+    polygons appears once, and the edges are chained into maximal polylines.
+
+    Vertices closer than `tolerance` (snapped to a grid of that size) are
+    merged. Edges only match when both tiles have a vertex at both ends, which
+    holds for edge-to-edge tilings such as the Penrose and hat patterns.
+
+    Returns:
+        polylines: list of (k, 2) coordinate arrays, closed loops end where they start
+        report: dict with the summed ring length, the cut length after
+                deduplication and the fraction saved
+    """
+    polygons = np.asarray(_flatten_polygons(_ensure_iterable(polygon_list)), dtype=object)
+    if len(polygons) == 0:
+        return [], {'ring_length': 0.0, 'cut_length': 0.0, 'saved': 0.0}
+    coords, ring_idx = shapely.get_coordinates(shapely.get_exterior_ring(polygons), return_index=True)
+
+    # one id per grid-snapped vertex
+    snapped = np.round(coords / tolerance).astype(np.int64)
+    _, first, vertex_ids = np.unique(snapped, axis=0, return_index=True, return_inverse=True)
+    vertex_ids = vertex_ids.ravel()
+    vertices = coords[first]
+
+    # consecutive vertices of the same ring, without degenerate edges
+    same_ring = ring_idx[:-1] == ring_idx[1:]
+    a, b = vertex_ids[:-1][same_ring], vertex_ids[1:][same_ring]
+    a, b = a[a != b], b[a != b]
+    ring_length = np.hypot(*(vertices[a] - vertices[b]).T).sum()
+    edges = np.unique(np.sort(np.column_stack([a, b]), axis=1), axis=0)
+    cut_length = np.hypot(*(vertices[edges[:, 0]] - vertices[edges[:, 1]]).T).sum()
+
+    polylines = [vertices[chain] for chain in _chain_edges(edges, len(vertices))]
+    report = {
+        'ring_length': float(ring_length),
+        'cut_length': float(cut_length),
+        'saved': float(1 - cut_length / ring_length) if ring_length else 0.0,
+    }
+    return polylines, report
+
+
+def add_tile(tile_width, tile_height, polygon_list, center_tile=False,up_shift=0):
+    # create tile, center it on the polygons
+    tile = shp_polys([[0,0], [tile_width, 0],
+                  [tile_width, tile_height], [0, tile_height]]) 
+    
+    if center_tile:
+        # calculate horizontal span /middle of polygons
+        left_most_polygon = min(polygon_list, key=lambda x: x.bounds[0])
+        right_most_polygon = max(polygon_list, key=lambda x: x.bounds[2])
+        
+        middle_of_polygons = (left_most_polygon.bounds[0] + right_most_polygon.bounds[2])/2
+        middle_of_tile = (tile.bounds[0] + tile.bounds[2])/2
+        shift_to_edge =  left_most_polygon.bounds[0] - tile.bounds[0] 
+        tile = affinity.translate(tile, shift_to_edge, up_shift)
+        
+        middle_of_tile = (tile.bounds[0] + tile.bounds[2])/2
+        shift_to_middle = middle_of_polygons - middle_of_tile
+        print(shift_to_edge,shift_to_middle)
+        tile = affinity.translate(tile, shift_to_middle, 0)
+        
+    return tile
+
+def add_inner_tile(outer_tile, endtile=False, side_margin=None, bottom_margin=None, height=None):
+    # margins and height default to the riser drawings, pass them to try others
+    if endtile:
+        TILE_BOTTOM_MARGIN = 30
+        INNER_TILE_HEIGHT = 148
+    else:
+        TILE_BOTTOM_MARGIN = 26
+        INNER_TILE_HEIGHT = 122
+    
+    TILE_SIDE_MARGIN = 16
+    if side_margin is not None:
+        TILE_SIDE_MARGIN = side_margin
+    if bottom_margin is not None:
+        TILE_BOTTOM_MARGIN = bottom_margin
+    if height is not None:
+        INNER_TILE_HEIGHT = height
+    outer_tile_width = outer_tile.bounds[2] - outer_tile.bounds[0]
+    bottom_left_point = outer_tile.exterior.coords[0]
+
+    inner_tile = shp_polys([[bottom_left_point[0] + TILE_SIDE_MARGIN, 
+                            bottom_left_point[1] + TILE_BOTTOM_MARGIN],
+                              [bottom_left_point[0] + outer_tile_width - TILE_SIDE_MARGIN, 
+                              bottom_left_point[1] + TILE_BOTTOM_MARGIN],
+                              [bottom_left_point[0] + outer_tile_width - TILE_SIDE_MARGIN, 
+                              bottom_left_point[1] + INNER_TILE_HEIGHT + TILE_BOTTOM_MARGIN],
+                              [bottom_left_point[0] + TILE_SIDE_MARGIN, 
+                              bottom_left_point[1] + INNER_TILE_HEIGHT + TILE_BOTTOM_MARGIN]])
+    
+    return inner_tile
+
+def crop_pieces(poly, result):
+    """
+    What a crop keeps of a polygon crossing the boundary of inner_tile,
+    given result = poly.intersection(inner_tile).
+    """
+    if isinstance(result, MultiPolygon):
+        return list(result.geoms)
+    elif isinstance(result, MultiPoint):
+        return [poly]
+    elif isinstance(result, Point):
+        # only one point in common, nothing to keep
+        return []
+    else:
+        return [result]
+
+def _crop_input(polygons, save_holes):
+    if save_holes:
+        # keep only holes
+        return [poly for poly in polygons if poly.geom_type == 'MultiPolygon']
+    # keep all (multi and single) polygons
+    return _flatten_polygons(_ensure_iterable(polygons))
+
+def rectangle_bounds(window):
+    """Bounds of the window when it is an axis-aligned rectangle, else None"""
+    if window.geom_type != 'Polygon' or window.interiors:
+        return None
+    minx, miny, maxx, maxy = window.bounds
+    # a polygon filling its bounding box is that box
+    if not math.isclose(window.area, (maxx - minx) * (maxy - miny), rel_tol=1e-12):
+        return None
+    return minx, miny, maxx, maxy
+
+def rectangle_classes(polygons, bounds):
+    """
+    (inside, crossing) boolean arrays of polygons against the rectangle
+    bounds, from their bounding boxes alone: a polygon is inside a
+    rectangle when its bounding box is (as for rect.contains), and can
+    only cross it when the bounding boxes overlap.
+    """
+    minx, miny, maxx, maxy = bounds
+    box_bounds = shapely.bounds(polygons).reshape(-1, 4)
+    inside = ((box_bounds[:, 0] >= minx) & (box_bounds[:, 1] >= miny)
+              & (box_bounds[:, 2] <= maxx) & (box_bounds[:, 3] <= maxy))
+    overlap = ((box_bounds[:, 0] <= maxx) & (box_bounds[:, 2] >= minx)
+               & (box_bounds[:, 1] <= maxy) & (box_bounds[:, 3] >= miny))
+    return inside, overlap & ~inside
+
+def rectangle_pieces(polygons, bounds):
+    """
+    What a crop keeps of each polygon (an array of polygons crossing the
+    rectangle bounds): the polygon parts of shapely.clip_by_rect, so a
+    polygon touching the rectangle only along an edge or at points keeps
+    nothing, whatever the shape of the contact.
+    """
+    clipped = shapely.clip_by_rect(polygons, *bounds)
+    parts, index = shapely.get_parts(clipped, return_index=True)
+    areal = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & (shapely.area(parts) > 0)
+    pieces = [[] for _ in range(len(polygons))]
+    for i, part in zip(index[areal], parts[areal]):
+        pieces[i].append(part)
+    return pieces
+
+def crop_to_rectangle(polygons, bounds):
+    """
+    Crop of the polygons to the rectangle bounds, in their order: polygons
+    inside are kept whole, the ones crossing its boundary are clipped.
+    Same polygons as the crop by a rectangular inner_tile, decided on
+    bounding boxes and clipped in one vectorized clip_by_rect call.
+    """
+    polygons = np.asarray(polygons, dtype=object).reshape(-1)
+    inside, crossing = rectangle_classes(polygons, bounds)
+    clipped = dict(zip(np.flatnonzero(crossing), rectangle_pieces(polygons[crossing], bounds)))
+    cropped = []
+    for k in np.flatnonzero(inside | crossing):
+        cropped.extend([polygons[k]] if inside[k] else clipped[k])
+    return cropped
+
+def crop_and_save_tile(polygons, inner_tile, save_holes=True):
+    cropped_polygons = []
+    
+    # keep only the holes, or all (multi and single) polygons
+    polygons = _crop_input(polygons, save_holes)
+    
+    with stage('crop', polygons) as crop:
+        bounds = rectangle_bounds(inner_tile)
+        if bounds is not None:
+            # risers are rectangles: clip on the rectangle's bounds
+            return crop.out(crop_to_rectangle(polygons, bounds))
+        for poly in polygons:
+            if crosses_boundary(poly, inner_tile):
+                cropped_polygons.extend(crop_pieces(poly, poly.intersection(inner_tile)))
+            elif inner_tile.contains(poly):
+                cropped_polygons.append(poly)
+            else:
+                continue
+        crop.out(cropped_polygons)
+    return cropped_polygons
+
+# Binary geometry interchange
+# ---------------------------
+# Columnar layout shared by every stage (generation, crop, export, notebooks):
+#   coords        float64 (n_coords, 2)  all vertices, rings closed
+#   ring_offsets  int64   (n_rings + 1)  ring -> coords
+#   part_offsets  int64   (n_parts + 1)  part (Polygon/LineString) -> rings
+#   geom_offsets  int64   (n_geoms + 1)  geometry -> parts
+#   type_codes    uint8   (n_geoms)      shapely.GeometryType of each geometry
+#   prototile_ids int32   (n_geoms)      optional tile type of each geometry
+# The first ring of a polygon part is its exterior, the rest are its holes.
+GEOMETRY_FILE_MAGIC = b'TESCGEO1'
+_GEOMETRY_ALIGNMENT = 64
+_POLYGON_TYPES = (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON)
+_LINE_TYPES = (shapely.GeometryType.LINESTRING, shapely.GeometryType.MULTILINESTRING)
+_MULTI_TYPES = (shapely.GeometryType.MULTIPOLYGON, shapely.GeometryType.MULTILINESTRING)
+
+
+def _offsets_from_counts(counts):
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def geometries_to_arrays(geometries, prototile_ids=None):
+    """
+    Convert a list of Polygons, MultiPolygons, LineStrings or MultiLineStrings
+    into the columnar arrays described above, without a per-vertex python loop.
+
+    Args:
+        geometries: iterable of shapely geometries
+        prototile_ids: optional sequence of ints (one per geometry), e.g. the
+                       kite/dart or hat/mirror-hat of each tile
+
+    Returns:
+        dict of numpy arrays
+    """
+    geoms = np.empty(len(geometries), dtype=object)
+    geoms[:] = list(geometries)
+    type_codes = shapely.get_type_id(geoms)
+    unsupported = ~np.isin(type_codes, _POLYGON_TYPES + _LINE_TYPES)
+    if unsupported.any():
+        raise ValueError(f"unsupported geometry type: {geoms[unsupported][0].geom_type}")
+
+    parts, part_geom = shapely.get_parts(geoms, return_index=True)
+    is_polygon_part = shapely.get_type_id(parts) == shapely.GeometryType.POLYGON
+
+    # polygons contribute their exterior + interiors, lines contribute themselves
+    polygon_part_idx = np.flatnonzero(is_polygon_part)
+    rings, ring_idx = shapely.get_rings(parts[is_polygon_part], return_index=True)
+    line_part_idx = np.flatnonzero(~is_polygon_part)
+    ring_part = np.concatenate([polygon_part_idx[ring_idx], line_part_idx])
+    all_rings = np.concatenate([rings, parts[line_part_idx]])
+    order = np.argsort(ring_part, kind='stable')
+    all_rings, ring_part = all_rings[order], ring_part[order]
+
+    arrays = {
+        'coords': shapely.get_coordinates(all_rings).astype(np.float64),
+        'ring_offsets': _offsets_from_counts(shapely.get_num_coordinates(all_rings)),
+        'part_offsets': _offsets_from_counts(np.bincount(ring_part, minlength=len(parts))),
+        'geom_offsets': _offsets_from_counts(np.bincount(part_geom, minlength=len(geoms))),
+        'type_codes': type_codes.astype(np.uint8),
+    }
+    if prototile_ids is not None:
+        arrays['prototile_ids'] = np.asarray(prototile_ids, dtype=np.int32)
+        if len(arrays['prototile_ids']) != len(geoms):
+            raise ValueError("prototile_ids must have one entry per geometry")
+    return arrays
+
+
+def arrays_to_geometries(arrays):
+    """
+    Rebuild the shapely geometries from the columnar arrays returned by
+    `geometries_to_arrays` or `read_geometry_arrays`.
+
+    Returns:
+        numpy object array of shapely geometries
+    """
+    coords = np.asarray(arrays['coords'])
+    ring_offsets = np.asarray(arrays['ring_offsets'])
+    part_offsets = np.asarray(arrays['part_offsets'])
+    geom_offsets = np.asarray(arrays['geom_offsets'])
+    type_codes = np.asarray(arrays['type_codes'])
+
+    n_rings = len(ring_offsets) - 1
+    n_parts = len(part_offsets) - 1
+    n_geoms = len(geom_offsets) - 1
+    ring_part = np.repeat(np.arange(n_parts), np.diff(part_offsets))
+    part_geom = np.repeat(np.arange(n_geoms), np.diff(geom_offsets))
+    coord_ring = np.repeat(np.arange(n_rings), np.diff(ring_offsets))
+    is_polygon_part = np.isin(type_codes[part_geom], _POLYGON_TYPES)
+
+    parts = np.empty(n_parts, dtype=object)
+    # polygon parts: build the rings, then group them into polygons
+    polygon_part_idx = np.flatnonzero(is_polygon_part)
+    polygon_ring_mask = is_polygon_part[ring_part]
+    if polygon_ring_mask.any():
+        coord_mask = polygon_ring_mask[coord_ring]
+        _, ring_ids = np.unique(coord_ring[coord_mask], return_inverse=True)
+        rings = shapely.linearrings(coords[coord_mask], indices=ring_ids)
+        _, ring_polygon = np.unique(ring_part[polygon_ring_mask], return_inverse=True)
+        with_rings = np.unique(ring_part[polygon_ring_mask])
+        parts[with_rings] = shapely.polygons(rings, indices=ring_polygon)
+    empty_polygons = np.setdiff1d(polygon_part_idx, ring_part)
+    parts[empty_polygons] = shapely.Polygon()
+
+    line_part_idx = np.flatnonzero(~is_polygon_part)
+    if len(line_part_idx):
+        coord_mask = ~polygon_ring_mask[coord_ring]
+        _, line_ids = np.unique(coord_ring[coord_mask], return_inverse=True)
+        parts[line_part_idx] = shapely.linestrings(coords[coord_mask], indices=line_ids)
+
+    geometries = np.empty(n_geoms, dtype=object)
+    part_counts = np.diff(geom_offsets)
+    single = ~np.isin(type_codes, _MULTI_TYPES)
+    single_with_part = single & (part_counts > 0)
+    geometries[single_with_part] = parts[geom_offsets[:-1][single_with_part]]
+    for type_code, build, empty in (
+            (shapely.GeometryType.MULTIPOLYGON, shapely.multipolygons, shapely.MultiPolygon),
+            (shapely.GeometryType.MULTILINESTRING, shapely.multilinestrings, shapely.MultiLineString)):
+        geom_idx = np.flatnonzero(type_codes == type_code)
+        if not len(geom_idx):
+            continue
+        part_mask = type_codes[part_geom] == type_code
+        if part_mask.any():
+            with_parts = np.unique(part_geom[part_mask])
+            _, part_ids = np.unique(part_geom[part_mask], return_inverse=True)
+            geometries[with_parts] = build(parts[part_mask], indices=part_ids)
+        geometries[np.setdiff1d(geom_idx, part_geom)] = empty()
+    for type_code, empty in ((shapely.GeometryType.POLYGON, shapely.Polygon),
+                             (shapely.GeometryType.LINESTRING, shapely.LineString)):
+        geometries[(type_codes == type_code) & (part_counts == 0)] = empty()
+    return geometries
+
+
+def write_geometry_arrays(filename, geometries, prototile_ids=None):
+    """
+    Save geometries to a compact binary file (see `read_geometry_arrays`).
+    Each array is stored raw and 64-byte aligned after a small JSON header,
+    so the file can be memory-mapped without copying or parsing.
+
+    Args:
+        filename: output path (by convention with a `.tgeo` extension)
+        geometries: list of shapely geometries, or the dict returned by
+                    `geometries_to_arrays`
+        prototile_ids: optional tile type of each geometry
+    """
+    if isinstance(geometries, dict):
+        arrays = dict(geometries)
+        if prototile_ids is not None:
+            arrays['prototile_ids'] = np.asarray(prototile_ids, dtype=np.int32)
+    else:
+        arrays = geometries_to_arrays(geometries, prototile_ids)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // _GEOMETRY_ALIGNMENT) * _GEOMETRY_ALIGNMENT
+    header = json.dumps(layout).encode()
+    data_start = -(-(len(GEOMETRY_FILE_MAGIC) + 8 + len(header)) // _GEOMETRY_ALIGNMENT) * _GEOMETRY_ALIGNMENT
+    header = header.ljust(data_start - len(GEOMETRY_FILE_MAGIC) - 8)
+
+    with open(filename, 'wb') as out:
+        out.write(GEOMETRY_FILE_MAGIC)
+        out.write(np.uint64(len(header)).tobytes())
+        out.write(header)
+        for name, array in arrays.items():
+            out.seek(data_start + layout[name]['offset'])
+            out.write(array.tobytes())
+        out.truncate(data_start + offset)
+
+
+def read_geometry_arrays(filename, mmap=True):
+    """
+    Load the columnar arrays saved by `write_geometry_arrays`.
+
+    With mmap=True (default) the arrays are read-only views on a single
+    memory map of the file: nothing is copied until the data is touched, and
+    worker processes opening the same file share the pages of the OS cache.
+    Use `arrays_to_geometries` to get shapely geometries back.
+    """
+    with open(filename, 'rb') as f:
+        magic = f.read(len(GEOMETRY_FILE_MAGIC))
+        if magic != GEOMETRY_FILE_MAGIC:
+            raise ValueError(f"{filename} is not a tescalera geometry file")
+        header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        layout = json.loads(f.read(header_length))
+    data_start = len(GEOMETRY_FILE_MAGIC) + 8 + header_length
+
+    if mmap:
+        buffer = np.memmap(filename, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(filename, dtype=np.uint8)
+    arrays = {}
+    for name, spec in layout.items():
+        dtype = np.dtype(spec['dtype'])
+        start = data_start + spec['offset']
+        count = int(np.prod(spec['shape']))
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return arrays
@@ -1,25 +1,31 @@
-import math
 import numpy as np
-import matplotlib.pyplot as plt
-from shapely.geometry import Polygon, MultiPolygon, box, MultiPoint, Point
-from shapely import polygons as shp_polys
-from shapely import centroid, affinity
+from shapely.geometry import Polygon, MultiPolygon
+from shapely import centroid
+
+# matplotlib and svgwrite are imported on first use, inside the plotting
+# and SVG functions: headless builds never load them
+from polygon_geometry import (
+    create_regular_polygon,
+    _ensure_iterable,
+    _flatten_polygons,
+    center_frame,
+    center_rectangle_on_polygons,
+    is_polygon_inside_frame,
+    crosses_boundary,
+    shared_edge_polylines,
+    add_tile,
+    add_inner_tile,
+    crop_and_save_tile,
+    rectangle_bounds,
+    crop_to_rectangle,
+    GEOMETRY_FILE_MAGIC,
+    geometries_to_arrays,
+    arrays_to_geometries,
+    write_geometry_arrays,
+    read_geometry_arrays,
+)
+from preview import plot_outlines
 
-import svgwrite
-from svgwrite import mm
-
-
-# Create Polygon
-def create_regular_polygon(center_x, center_y, radius, nr_points):
-    angle = 2 * math.pi / nr_points
-    polygon_points = []
-
-    for i in range(nr_points):
-        x = center_x + radius * math.cos(i * angle)
-        y = center_y + radius * math.sin(i * angle)
-        polygon_points.append((x, y))
-
-    return Polygon(polygon_points)
 
 # Polt polygon dict
 def plot_polygon_dict(polygons, colors=None, alphas=None):
@@ -28,6 +34,7 @@ def plot_polygon_dict(polygons, colors=None, alphas=None):
     :param polygons: dictionary of polygons to plot
            note that keys are used as labels
     """
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize=(5, 5))
 
     if colors is None:
@@ -47,120 +54,32 @@ def plot_polygon_dict(polygons, colors=None, alphas=None):
 
     ax.axis('equal')
 
-# Polygon normalization helpers
-def _ensure_iterable(polygons):
-    if isinstance(polygons, Polygon):
-        return [polygons]
-    if isinstance(polygons, MultiPolygon):
-        return list(polygons.geoms)
-    return list(polygons)
-
-
-def _flatten_polygons(polygons):
-    flat_polygons = []
-    for polygon in polygons:
-        if isinstance(polygon, MultiPolygon):
-            flat_polygons.extend(list(polygon.geoms))
-        else:
-            flat_polygons.append(polygon)
-    return flat_polygons
-
-
 # Plot polygon list
 def plot_polygon_list(polygons, colors=None, alphas=None):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize=(5, 5))
 
     polygons = _flatten_polygons(_ensure_iterable(polygons))
 
     if colors is None:
         colors = plt.cm.rainbow(np.linspace(0, 1, len(polygons)))
-    if alphas is None:
-        alphas = [0.1] * len(polygons)
-
-    for polygon, color, alpha in zip(polygons, colors, alphas):
-        x, y = polygon.exterior.xy
-        ax.plot(x, y, color=color)
 
-    ax.axis('equal')
+    # exteriors only, one LineCollection for all of them
+    plot_outlines([polygon.exterior for polygon in polygons], ax=ax, colors=colors, linewidth=1.5)
     plt.show()
 
 
 # Plot polygon list
 def blue_plot(polygons):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize=(10, 5))
-    color = "blue"
     all_polys = _flatten_polygons(_ensure_iterable(polygons))
-    for poly in all_polys:
-        x, y = poly.exterior.xy
-        ax.plot(x, y, color=color, linewidth=0.5)
-
-    ax.axis('equal')
+    plot_outlines([poly.exterior for poly in all_polys], ax=ax, colors="blue", linewidth=0.5)
     plt.show()
 
 
-def center_frame(polygons, frame):
-    polygons = _flatten_polygons(_ensure_iterable(polygons))
-
-    max_poly_y = max(polygons, key=lambda x: x.centroid.bounds[1])
-    max_poly_x = max(polygons, key=lambda x: x.centroid.bounds[0])
-    min_poly_y = min(polygons, key=lambda x: x.centroid.bounds[1])
-    min_poly_x = min(polygons, key=lambda x: x.centroid.bounds[0])
-
-    min_y = min_poly_y.centroid.bounds[1]
-    min_x = min_poly_x.centroid.bounds[0]
-    max_y = max_poly_y.centroid.bounds[1]
-    max_x = max_poly_x.centroid.bounds[0]
-
-    polygon_center = box(min_x, min_y, max_x, max_y).centroid
-    frame_center = frame.centroid
-    dx = polygon_center.x - frame_center.x
-    dy = polygon_center.y - frame_center.y
-    centered_frame = affinity.translate(frame, dx, dy)
-    
-    return centered_frame
-    
-# center bounding box around polygons
-def center_rectangle_on_polygons(polygons, rectangle):
-    # Calculate the bounding box of all polygons
-    all_polygons = Polygon()
-    for poly in polygons:
-        all_polygons = all_polygons.union(poly)
-
-    polygons_bbox = all_polygons.bounds
-
-    # Calculate centroids
-    polygons_centroid = box(*polygons_bbox).centroid
-    rectangle_centroid = rectangle.centroid
-
-    # Calculate the translation needed
-    dx = polygons_centroid.x - rectangle_centroid.x
-    dy = polygons_centroid.y - rectangle_centroid.y
-
-    # Apply translation to the rectangle
-    centered_rectangle = affinity.translate(rectangle, dx, dy)
-
-    return centered_rectangle
-   
-# helper function to delete polygons that fall outside of frame
-def is_polygon_inside_frame(polygon, rect):
-    """Check if the centroid of a polygon is inside a rectangle."""
-    x, y = polygon.centroid.x, polygon.centroid.y
-    (rx1, ry1, rx2, ry2) = rect.bounds
-    return rx1 <= x <= rx2 and ry1 <= y <= ry2
-
-def crosses_boundary(poly, rect):
-    """It returns True when both conditions are met:
-      * not rect.contains(poly) → The polygon is NOT fully inside the rectangle*
-      * not poly.intersection(rect).is_empty → The polygon DOES overlap with the rectangle*
-      So it returns True only when the polygon partially overlaps - meaning it crosses the boundary.*
-      It returns False when:
-      * The polygon is fully inside (first condition fails)
-      * The polygon is fully outside (second condition fails)
-    """
-    return not rect.contains(poly) and not poly.intersection(rect).is_empty
-
-
 def save_polygon_list_to_svg(polygon_list, filename='tramo1.2.svg', size=('1200mm', '300mm')):
+    import svgwrite
     # Create a new SVG drawing with 1mm = 1 user unit scale
     dwg = svgwrite.Drawing(filename, size=size, profile='full', viewBox=f"0 0 {size[0].replace('mm','')} {size[1].replace('mm','')}")
     
@@ -220,6 +139,7 @@ def save_polygon_list_to_svg(polygon_list, filename='tramo1.2.svg', size=('1200m
 
 def export_polygons_to_svg(polygon_list, filename='tramo7.2.svg', size=('12000mm', '12000mm')):
 
+    import svgwrite
     # Create a new SVG drawing with 1mm = 1 user unit scale
     dwg = svgwrite.Drawing(filename, size=size, profile='full', viewBox=f"0 0 {size[0].replace('mm','')} {size[1].replace('mm','')}")
     
@@ -291,7 +211,9 @@ def export_polygons_to_svg(polygon_list, filename='tramo7.2.svg', size=('12000mm
     dwg.save()
 
 
-def simple_svg_save(polygon_list, filename='tramo7.2.svg', size=('1800mm', '2100mm'), label=True):
+def simple_svg_save(polygon_list, filename='tramo7.2.svg', size=('1800mm', '2100mm'), label=True,
+                    shared_edges=False):
+    import svgwrite
     # Create a new SVG drawing with 1mm = 1 user unit scale
     dwg = svgwrite.Drawing(filename, size=size, profile='full', viewBox=f"0 0 {size[0].replace('mm','')} {size[1].replace('mm','')}")
     
@@ -303,6 +225,20 @@ def simple_svg_save(polygon_list, filename='tramo7.2.svg', size=('1800mm', '2100
                   stroke_width=0.5, 
                   )
     
+    # without an inset, neighbouring tiles share their edges: write each
+    # shared edge once, as maximal polylines, instead of every ring
+    if shared_edges:
+        polylines, report = shared_edge_polylines(
+            [polygon for polygon in polygon_list if isinstance(polygon, Polygon)])
+        for line in polylines:
+            path = dwg.path(d=f'M {line[0, 0]},{-line[0, 1]}')
+            for x, y in line[1:]:
+                path.push(f'L {x},{-y}')
+            hat_group.add(path)
+        print(f"shared edges: cut length {report['cut_length']:.0f}mm instead of "
+              f"{report['ring_length']:.0f}mm ({report['saved']:.0%} saved)")
+        polygon_list = [polygon for polygon in polygon_list if not isinstance(polygon, Polygon)]
+
     for polygon in polygon_list:
         if isinstance(polygon, Polygon):
             coords = [(coord[0], - coord[1]) for coord in polygon.exterior.coords]
@@ -311,11 +247,14 @@ def simple_svg_save(polygon_list, filename='tramo7.2.svg', size=('1800mm', '2100
                 path.push(f'L {coord[0]},{coord[1]}')
             path.push('Z')
             hat_group.add(path)
-            # Find the index of the polygon in the list
-            try:
-                idx = polygon_list.index(polygon)
-            except ValueError:
-                idx = None
+            # Find the index of the polygon in the list (a linear search,
+            # only done for labels)
+            idx = None
+            if label == True:
+                try:
+                    idx = polygon_list.index(polygon)
+                except ValueError:
+                    idx = None
             if idx is not None and label==True:
                 # Compute the centroid
                 centroid_pt = polygon.centroid
@@ -343,79 +282,3 @@ def simple_svg_save(polygon_list, filename='tramo7.2.svg', size=('1800mm', '2100
     dwg.save()
     
     return dwg
-
-def add_tile(tile_width, tile_height, polygon_list, center_tile=False,up_shift=0):
-    # create tile, center it on the polygons
-    tile = shp_polys([[0,0], [tile_width, 0],
-                  [tile_width, tile_height], [0, tile_height]]) 
-    
-    if center_tile:
-        # calculate horizontal span /middle of polygons
-        left_most_polygon = min(polygon_list, key=lambda x: x.bounds[0])
-        right_most_polygon = max(polygon_list, key=lambda x: x.bounds[2])
-        
-        middle_of_polygons = (left_most_polygon.bounds[0] + right_most_polygon.bounds[2])/2
-        middle_of_tile = (tile.bounds[0] + tile.bounds[2])/2
-        shift_to_edge =  left_most_polygon.bounds[0] - tile.bounds[0] 
-        tile = affinity.translate(tile, shift_to_edge, up_shift)
-        
-        middle_of_tile = (tile.bounds[0] + tile.bounds[2])/2
-        shift_to_middle = middle_of_polygons - middle_of_tile
-        print(shift_to_edge,shift_to_middle)
-        tile = affinity.translate(tile, shift_to_middle, 0)
-        
-    return tile
-
-def add_inner_tile(outer_tile, endtile=False):
-    if endtile:
-        TILE_BOTTOM_MARGIN = 30
-        INNER_TILE_HEIGHT = 148
-    else:
-        TILE_BOTTOM_MARGIN = 26
-        INNER_TILE_HEIGHT = 122
-    
-    TILE_SIDE_MARGIN = 16
-    outer_tile_width = outer_tile.bounds[2] - outer_tile.bounds[0]
-    bottom_left_point = outer_tile.exterior.coords[0]
-
-    inner_tile = shp_polys([[bottom_left_point[0] + TILE_SIDE_MARGIN, 
-                            bottom_left_point[1] + TILE_BOTTOM_MARGIN],
-                              [bottom_left_point[0] + outer_tile_width - TILE_SIDE_MARGIN, 
-                              bottom_left_point[1] + TILE_BOTTOM_MARGIN],
-                              [bottom_left_point[0] + outer_tile_width - TILE_SIDE_MARGIN, 
-                              bottom_left_point[1] + INNER_TILE_HEIGHT + TILE_BOTTOM_MARGIN],
-                              [bottom_left_point[0] + TILE_SIDE_MARGIN, 
-                              bottom_left_point[1] + INNER_TILE_HEIGHT + TILE_BOTTOM_MARGIN]])
-    
-    return inner_tile
-
-def crop_and_save_tile(polygons, inner_tile, save_holes=True):
-    cropped_polygons = []
-    
-    # keep only the holes
-    if save_holes:
-        # keep only holes
-        polygons = [poly for poly in polygons if poly.geom_type == 'MultiPolygon']
-    else:
-        # keep all (multi and single) polygons
-        polygons = _flatten_polygons(_ensure_iterable(polygons))
-    
-    print(len(polygons))
-    for poly in polygons:
-        if crosses_boundary(poly, inner_tile):
-            result = poly.intersection(inner_tile)
-            if isinstance(result, MultiPolygon):
-                cropped_polygons.extend(result.geoms)
-            elif isinstance(result, MultiPoint):
-                cropped_polygons.append(poly)
-            elif isinstance(result, Point):
-                # if only one point in common and centroid outside of inner tile
-                if not inner_tile.contains(result.centroid):
-                    continue
-            else:
-                cropped_polygons.append(result)
-        elif inner_tile.contains(poly):
-            cropped_polygons.append(poly)
-        else:
-            continue
-    return cropped_polygons
\ No newline at end of file
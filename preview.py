@@ -0,0 +1,121 @@
+"""
+Fast previews of large tilings.
+
+Drawing 100k+ tiles with one `ax.plot` per polygon takes minutes; here all
+the outlines go into a single coordinate array, drawn either as one
+matplotlib LineCollection (plot_outlines) or rasterized straight from numpy
+into a grayscale PNG (save_thumbnail), with no plotting library at all.
+"""
+import struct
+import zlib
+
+import numpy as np
+import shapely
+
+
+def outline_arrays(polygons):
+    """
+    Every ring of the given polygons (exteriors and holes) and every line,
+    in one (n, 2) coordinate array plus the offsets of each outline in it.
+    """
+    geometries = np.asarray(list(polygons), dtype=object).ravel()
+    parts = shapely.get_parts(geometries)
+    polygonal = shapely.get_type_id(parts) == shapely.GeometryType.POLYGON
+    outlines = np.concatenate([shapely.get_rings(parts[polygonal]), parts[~polygonal]])
+    coords = shapely.get_coordinates(outlines)
+    offsets = np.zeros(len(outlines) + 1, dtype=np.int64)
+    np.cumsum(shapely.get_num_coordinates(outlines), out=offsets[1:])
+    return coords, offsets
+
+
+def plot_outlines(polygons, ax=None, colors='blue', linewidth=0.5):
+    """
+    Draw the outlines of all the polygons as one LineCollection.
+
+    Args:
+        polygons: list of shapely geometries
+        ax: matplotlib axes, a new figure when None
+        colors: one color, or one per outline (see outline_arrays)
+        linewidth: line width in points
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    if ax is None:
+        _, ax = plt.subplots(figsize=(10, 5))
+    coords, offsets = outline_arrays(polygons)
+    # views into the single coordinate array, nothing is copied
+    segments = np.split(coords, offsets[1:-1])
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=linewidth))
+    ax.autoscale_view()
+    ax.axis('equal')
+    return ax
+
+
+# Headless raster previews
+def rasterize_outlines(polygons, width=800, height=None, margin=4, bounds=None):
+    """
+    Draw the outlines into a uint8 image (black lines on white), with every
+    segment stepped along its longest axis (a vectorized DDA/Bresenham).
+
+    Args:
+        polygons: list of shapely geometries
+        width: image width in pixels
+        height: image height in pixels, from the aspect ratio when None
+        margin: blank pixels around the drawing
+        bounds: (minx, miny, maxx, maxy) drawn area, the polygons' bounds when None
+
+    Returns:
+        (height, width) uint8 array
+    """
+    coords, offsets = outline_arrays(polygons)
+    if bounds is None:
+        bounds = (*coords.min(axis=0), *coords.max(axis=0)) if len(coords) else (0, 0, 1, 1)
+    minx, miny, maxx, maxy = bounds
+    span_x, span_y = max(maxx - minx, 1e-9), max(maxy - miny, 1e-9)
+    if height is None:
+        height = int(np.ceil(span_y / span_x * (width - 2 * margin))) + 2 * margin
+    scale = min((width - 2 * margin) / span_x, (height - 2 * margin) / span_y)
+
+    # pixel coordinates, row 0 at the top
+    pixels = np.empty_like(coords)
+    pixels[:, 0] = margin + (coords[:, 0] - minx) * scale
+    pixels[:, 1] = height - 1 - margin - (coords[:, 1] - miny) * scale
+
+    # segments between consecutive points of the same outline
+    last = np.zeros(len(coords), dtype=bool)
+    last[offsets[1:] - 1] = True
+    start, end = pixels[:-1][~last[:-1]], pixels[1:][~last[:-1]]
+    steps = np.ceil(np.abs(end - start).max(axis=1)).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(steps)), steps)
+    t = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = t / np.maximum(steps[segment] - 1, 1)
+    points = start[segment] + (end - start)[segment] * t[:, None]
+    x, y = np.rint(points).astype(np.int64).T
+
+    image = np.full((height, width), 255, dtype=np.uint8)
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    image[y[inside], x[inside]] = 0
+    return image
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def write_png(filename, image):
+    """Write a (height, width) uint8 array as an 8-bit grayscale PNG"""
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape
+    # every scanline starts with its filter type (0: none)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), image]).tobytes()
+    with open(filename, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)))
+        f.write(_png_chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(_png_chunk(b'IEND', b''))
+
+
+def save_thumbnail(polygons, filename, width=800, **kwargs):
+    """Rasterize the outlines (see rasterize_outlines) and write them as a PNG"""
+    write_png(filename, rasterize_outlines(polygons, width, **kwargs))
@@ -0,0 +1,111 @@
+"""
+Incremental re-crop of the risers while tuning their placement.
+
+    session = RiserSession(inset_polygon_list, save_holes=False)
+    crop_511 = session.place('511', inner_tile_511)
+    crop_511 = session.move('511', dy=5)      # milliseconds, no regeneration
+    print(session.last_update)
+
+The inset polygons and their STRtree stay in memory. Placing a riser window
+queries the tree instead of testing every polygon: polygons inside the
+window are kept whole and only the ones crossing its boundary are clipped.
+When a window moves, the polygons inside it are updated with the symmetric
+difference of the old and new queries, and a riser whose window did not
+change is not touched at all. The cut lists are the same, in the same order,
+as crop_and_save_tile's.
+"""
+import time
+
+import numpy as np
+import shapely
+from shapely import STRtree, affinity
+
+from polygon_geometry import (crop_pieces, rectangle_bounds, rectangle_classes,
+                              rectangle_pieces, _crop_input)
+from instrumentation import stage
+
+
+class RiserSession:
+    def __init__(self, polygons, save_holes=True):
+        """
+        Args:
+            polygons: the pattern (after inset), as given to crop_and_save_tile
+            save_holes: as in crop_and_save_tile
+        """
+        polygons = _crop_input(polygons, save_holes)
+        self.polygons = np.empty(len(polygons), dtype=object)
+        self.polygons[:] = polygons
+        self.tree = STRtree(self.polygons)
+        self.windows = {}
+        self._pieces = {}       # riser -> {polygon index: pieces kept}
+        self._inside = {}       # riser -> sorted indices of the polygons inside the window
+        self.last_update = None
+
+    def place(self, name, window):
+        """
+        Put the window (inner tile) of a riser at a new place and return its
+        cut list.
+        """
+        old_window = self.windows.get(name)
+        if old_window is not None and shapely.equals_exact(old_window, window, 0):
+            return self.cut_list(name)
+
+        start = time.perf_counter()
+        with stage('crop', self.polygons, riser=name) as crop:
+            bounds = rectangle_bounds(window)
+            if bounds is not None:
+                # rectangular window: bounding boxes decide, clip_by_rect clips
+                candidates = np.sort(self.tree.query(window))
+                inside, crossing = rectangle_classes(self.polygons[candidates], bounds)
+                inside, crossing = candidates[inside], candidates[crossing]
+                clipped = rectangle_pieces(self.polygons[crossing], bounds)
+            else:
+                candidates = self.tree.query(window, predicate='intersects')
+                inside = np.sort(self.tree.query(window, predicate='contains'))
+                crossing = np.setdiff1d(candidates, inside)
+                clipped = [crop_pieces(self.polygons[index], result) for index, result in
+                           zip(crossing, shapely.intersection(self.polygons[crossing], window))]
+
+            pieces = self._pieces.setdefault(name, {})
+            old_inside = self._inside.get(name, np.empty(0, dtype=np.int64))
+            # polygons that left or entered the window
+            removed = np.setdiff1d(old_inside, inside, assume_unique=True)
+            added = np.setdiff1d(inside, old_inside, assume_unique=True)
+            # pieces of the polygons crossing the old boundary go, the ones
+            # crossing the new boundary are clipped again
+            for index in np.setdiff1d(np.fromiter(pieces, dtype=np.int64, count=len(pieces)),
+                                      old_inside, assume_unique=True):
+                del pieces[index]
+            for index in removed:
+                del pieces[index]
+            for index in added:
+                pieces[index] = [self.polygons[index]]
+            for index, kept in zip(crossing, clipped):
+                if kept:
+                    pieces[index] = kept
+
+            self.windows[name] = window
+            self._inside[name] = inside
+            cut_list = crop.out(self.cut_list(name))
+
+        self.last_update = {
+            'riser': name,
+            'added': len(added),
+            'removed': len(removed),
+            'clipped': len(crossing),
+            'seconds': time.perf_counter() - start,
+        }
+        return cut_list
+
+    def move(self, name, dx=0, dy=0):
+        """Shift the window of a placed riser and return its new cut list"""
+        return self.place(name, affinity.translate(self.windows[name], dx, dy))
+
+    def cut_list(self, name):
+        """Cut list of a placed riser, in the order of the pattern"""
+        pieces = self._pieces[name]
+        return [piece for index in sorted(pieces) for piece in pieces[index]]
+
+    def cut_lists(self):
+        """{riser: cut list} of every placed riser"""
+        return {name: self.cut_list(name) for name in self.windows}
@@ -0,0 +1,139 @@
+"""
+Stamp a decoration template (e.g. the holes of a hat) into every tile.
+
+A tiling only uses a handful of discrete orientations, so the template is
+transformed once per (angle, mirrored) pair and every stamped copy is then a
+gather + translation, done for all tiles at once by broadcasting:
+
+    stamped[k] = oriented[orientation_of[k]] + centre[k]
+
+The convention is the one of the hat pipeline: a stamped copy is the
+template, mirrored in x (x -> -x) if needed, rotated anticlockwise by
+`angle` degrees about the origin and translated to the tile centre.
+"""
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, MultiPolygon
+
+
+def template_to_arrays(template):
+    """
+    Flatten a template (Polygon, MultiPolygon or list of Polygons, already
+    centred on the origin) into one (P, 2) coordinate array plus the ring
+    offsets. Only exteriors are kept: decorations are cut as plain holes.
+    """
+    if isinstance(template, Polygon):
+        template = [template]
+    elif isinstance(template, MultiPolygon):
+        template = list(template.geoms)
+    rings = shapely.get_exterior_ring(np.asarray(template, dtype=object))
+    coords = shapely.get_coordinates(rings)
+    ring_offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    np.cumsum(shapely.get_num_coordinates(rings), out=ring_offsets[1:])
+    return coords, ring_offsets
+
+
+def orient_template(coords, angles, mirrored):
+    """
+    Transform template coordinates into each of the given orientations.
+
+    Args:
+        coords: (P, 2) template coordinates
+        angles: (m,) rotation of each orientation, in degrees
+        mirrored: (m,) booleans, mirror in x before rotating
+
+    Returns:
+        (m, P, 2) array
+    """
+    theta = np.radians(np.asarray(angles, dtype=float))
+    flip = np.where(np.asarray(mirrored, dtype=bool), -1.0, 1.0)
+    cos, sin = np.cos(theta), np.sin(theta)
+    # rotation @ mirror, one 2x2 matrix per orientation
+    matrices = np.empty((len(theta), 2, 2))
+    matrices[:, 0, 0] = cos * flip
+    matrices[:, 0, 1] = -sin
+    matrices[:, 1, 0] = sin * flip
+    matrices[:, 1, 1] = cos
+    return np.einsum('mij,pj->mpi', matrices, coords)
+
+
+def stamp_template(template, angles, mirrored, centres, decimals=6):
+    """
+    Stamp a template into every tile.
+
+    Args:
+        template: decoration centred on the origin (see template_to_arrays)
+        angles: (n,) rotation of the decoration in each tile, in degrees
+        mirrored: (n,) whether each tile is a mirror image
+        centres: (n, 2) where the template origin lands in each tile
+        decimals: angles are rounded to this precision to find the tiling's
+                  discrete orientations
+
+    Returns:
+        stamped: (n, P, 2) coordinates of every stamped copy
+        ring_offsets: (R + 1,) offsets of the template rings along axis 1
+    """
+    coords, ring_offsets = template_to_arrays(template)
+    angles = np.round(np.mod(np.asarray(angles, dtype=float), 360.0), decimals)
+    mirrored = np.asarray(mirrored, dtype=bool)
+    centres = np.asarray(centres, dtype=float).reshape(-1, 2)
+
+    # the tiling's discrete orientations, each transformed only once
+    keys = np.column_stack([angles, mirrored])
+    orientations, orientation_of = np.unique(keys, axis=0, return_inverse=True)
+    oriented = orient_template(coords, orientations[:, 0], orientations[:, 1])
+
+    stamped = oriented[orientation_of.ravel()] + centres[:, None, :]
+    return stamped, ring_offsets
+
+
+def stamped_to_polygons(stamped, ring_offsets):
+    """
+    Convert stamped copies to one MultiPolygon per tile (the layout the
+    hat pipeline uses for holes), building every ring in one shapely call.
+    """
+    n_tiles, n_points, _ = stamped.shape
+    ring_sizes = np.diff(ring_offsets)
+    n_rings = len(ring_sizes)
+    ring_ids = np.tile(np.repeat(np.arange(n_rings), ring_sizes), n_tiles)
+    ring_ids += np.repeat(np.arange(n_tiles) * n_rings, n_points)
+    rings = shapely.linearrings(stamped.reshape(-1, 2), indices=ring_ids)
+    polygons = shapely.polygons(rings)
+    return list(shapely.multipolygons(polygons, indices=np.repeat(np.arange(n_tiles), n_rings)))
+
+
+def tile_frames(tiles, reference_edge=(0, 1)):
+    """
+    Orientation of each tile of a tiling, for stamping a template designed
+    for the tile whose reference edge points along +x with vertices
+    listed anticlockwise (e.g. Penrose kites/darts, girih tiles).
+
+    Args:
+        tiles: list of shapely Polygons
+        reference_edge: indices of the two vertices defining the reference edge
+
+    Returns:
+        angles (degrees), mirrored flags and centres (area centroids)
+    """
+    tiles = np.asarray(tiles, dtype=object)
+    exteriors = shapely.get_exterior_ring(tiles)
+    start = shapely.get_coordinates(shapely.get_point(exteriors, reference_edge[0]))
+    end = shapely.get_coordinates(shapely.get_point(exteriors, reference_edge[1]))
+    edge = end - start
+    angles = np.degrees(np.arctan2(edge[:, 1], edge[:, 0]))
+    # clockwise tiles are mirror images: x -> -x sends the reference edge
+    # to -x, so they need a further half turn
+    mirrored = ~shapely.is_ccw(exteriors)
+    angles = np.where(mirrored, angles + 180.0, angles)
+    centres = shapely.get_coordinates(shapely.centroid(tiles))
+    return angles, mirrored, centres
+
+
+def stamp_tiles(tiles, template, reference_edge=(0, 1)):
+    """
+    Decorate every tile of a tiling with the template, returning one
+    MultiPolygon of decorations per tile.
+    """
+    angles, mirrored, centres = tile_frames(tiles, reference_edge)
+    stamped, ring_offsets = stamp_template(template, angles, mirrored, centres)
+    return stamped_to_polygons(stamped, ring_offsets)
@@ -0,0 +1,242 @@
+"""
+Chunked generation and export of wall-scale patterns (room dividers,
+facades) with bounded memory.
+
+    python streaming.py penrose_wall.svg --pattern penrose --iters 12 --scale 6 \\
+        --bounds -6000 -1500 6000 1500 --chunk 1000 --workers 4
+
+The target area is split into square chunks. For every chunk the generator
+only descends into the tiles that can reach it (Deflation.queryWindow,
+penrose_tessellation.query_window, hat_blocks.query_window,
+socolar.query_window, pentagrid.kites_and_darts,
+hat_metatiles.query_window), and the chunk's tiles are deduplicated, inset,
+clipped to the target area and written out before the next chunk starts.
+A tile belongs to the chunk holding its centroid (clamped to the
+target area), so tiles straddling two chunks are written once and never cut
+at a seam. With workers > 1 the chunks are computed in parallel and written
+in order.
+
+The SVG has 1mm = 1 user unit with the lower left corner of the target
+area at the bottom left of the drawing.
+"""
+import argparse
+import importlib
+import sys
+from functools import partial
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+import shapely
+from shapely import affinity
+from shapely.geometry import Polygon, JOIN_STYLE
+
+from polygon_geometry import crop_to_rectangle
+from polygon_duplicates import dedupe
+
+project_root = Path(__file__).parent.resolve()
+
+
+# Sources: window (minx, miny, maxx, maxy) -> polygons meeting it
+def _generator(directory, module):
+    # the generators live next to their scripts
+    path = str(project_root / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module)
+
+
+def deflation_tiles(window, tiling_type='P1', n=5, scale=3000, offset=(-600, -3200)):
+    """Tiles of a Deflation tiling meeting the window, scaled and moved as in tramo5"""
+    deflation = _generator('tramo5', 'Deflation')
+    minx, miny, maxx, maxy = window
+    ox, oy = offset
+    local = ((minx - ox) / scale, (miny - oy) / scale, (maxx - ox) / scale, (maxy - oy) / scale)
+    tiles = deflation.queryWindow(deflation.INITIAL_TILES[tiling_type], n, local)
+    return [Polygon(vertices) for group in tiles.values() for vertices in group * scale + offset]
+
+
+def penrose_tiles(window, iters=8, seed='sun', scale=1.0):
+    """Kites and darts of penrose_tessellation meeting the window, scaled about the origin"""
+    penrose = _generator('tramo6', 'penrose_tessellation')
+    initial_tiles = penrose.STAR if seed == 'star' else penrose.SUN
+    tiles = penrose.query_window(initial_tiles, iters, tuple(np.asarray(window) / scale))
+    return [Polygon(vertices) for vertices in tiles['vertices'] * scale]
+
+
+def hat_tiles(window, level=5, scale=7.1, origin=(-100, -1400)):
+    """Hats of a hat block meeting the window, with the basis of tramo7 (x = (0, scale))"""
+    hat_blocks = _generator('tramo7/hat_script', 'hat_blocks')
+    x = (0, scale)
+    tiles = hat_blocks.query_window(level, window, origin, x, hat_blocks.rotate_60(x))
+    return [Polygon(vertices) for vertices in tiles]
+
+
+def metatile_tiles(window, level=7, scale=7.1, origin=(0, 0)):
+    """Hats of an H metatile centred on origin meeting the window, with the basis of tramo7"""
+    hat_metatiles = _generator('tramo7/hat_script', 'hat_metatiles')
+    x = (0, scale)
+    tiles = hat_metatiles.query_window(level, window, origin, x, hat_metatiles.rotate_60(x))
+    return [Polygon(vertices) for vertices in tiles]
+
+
+def socolar_tiles(window, scale=26.83):
+    """Squares, rhombs and hexagons of the 12-fold tiling of tramo5, with edge scale"""
+    socolar = _generator('tramo5', 'socolar')
+    return [Polygon(vertices) for vertices in socolar.generate(window, scale)]
+
+
+def pentagrid_tiles(window, tiling='P2', scale=20.665):
+    """Kites and darts (or P3 rhombs) of the pentagrid of tramo6, with short edge scale"""
+    pentagrid = _generator('tramo6', 'pentagrid')
+    return [Polygon(vertices) for vertices in pentagrid.generate(window, scale, tiling)]
+
+
+SOURCES = {
+    'deflation': deflation_tiles,
+    'penrose': penrose_tiles,
+    'hat': hat_tiles,
+    'metatiles': metatile_tiles,
+    'socolar': socolar_tiles,
+    'pentagrid': pentagrid_tiles,
+}
+
+
+# Chunks
+def chunk_grid(bounds, chunk_size):
+    """Chunk windows covering bounds, row by row from the bottom left"""
+    minx, miny, maxx, maxy = bounds
+    nx = max(int(np.ceil((maxx - minx) / chunk_size)), 1)
+    ny = max(int(np.ceil((maxy - miny) / chunk_size)), 1)
+    return [(minx + i * chunk_size, miny + j * chunk_size,
+             min(minx + (i + 1) * chunk_size, maxx), min(miny + (j + 1) * chunk_size, maxy))
+            for j in range(ny) for i in range(nx)]
+
+
+def _owned(polygons, chunk, bounds):
+    # tiles whose centroid, clamped to the target area, falls in this chunk
+    # (chunks are half open, except along the far edges of the target area)
+    minx, miny, maxx, maxy = bounds
+    centroids = shapely.get_coordinates(shapely.centroid(polygons))
+    x = np.clip(centroids[:, 0], minx, maxx)
+    y = np.clip(centroids[:, 1], miny, maxy)
+    cminx, cminy, cmaxx, cmaxy = chunk
+    return ((x >= cminx) & ((x < cmaxx) | (cmaxx >= maxx))
+            & (y >= cminy) & ((y < cmaxy) | (cmaxy >= maxy)))
+
+
+def process_chunk(chunk, source, bounds, inset_distance=3, tolerance=1e-6):
+    """
+    Cut list of one chunk: its tiles deduplicated, inset and clipped to the
+    target area.
+    """
+    polygons = np.empty(0, dtype=object)
+    tiles = source(chunk)
+    if tiles:
+        polygons = np.empty(len(tiles), dtype=object)
+        polygons[:] = tiles
+        polygons = polygons[_owned(polygons, chunk, bounds)]
+        polygons = polygons[dedupe(polygons, tolerance)]
+    if inset_distance:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # mitre join style keeps sharp corners, slivers buffer to nothing
+            polygons = shapely.buffer(polygons, -inset_distance, join_style=JOIN_STYLE.mitre)
+        polygons = polygons[~shapely.is_empty(polygons)]
+
+    return crop_to_rectangle(polygons, bounds)
+
+
+# SVG output
+def _svg_paths(cut_list, bounds):
+    # one path per polygon part, y flipped so the drawing sits in the viewBox
+    minx, _, _, maxy = bounds
+    paths = []
+    for geometry in cut_list:
+        geometry = affinity.affine_transform(geometry, [1, 0, 0, -1, -minx, maxy])
+        for part in shapely.get_parts(geometry):
+            if part.geom_type != 'Polygon':
+                continue
+            points = ' L '.join(f'{x},{y}' for x, y in part.exterior.coords[:-1])
+            paths.append(f'<path d="M {points} Z" />')
+    return '\n'.join(paths)
+
+
+def _chunk_paths(chunk, source, bounds, inset_distance):
+    return _svg_paths(process_chunk(chunk, source, bounds, inset_distance), bounds)
+
+
+def stream_to_svg(source, bounds, filename, chunk_size=1000, inset_distance=3, workers=1):
+    """
+    Generate, inset, clip and write a pattern chunk by chunk.
+
+    Args:
+        source: function window -> polygons meeting it (see SOURCES)
+        bounds: target area (minx, miny, maxx, maxy), in mm
+        filename: SVG file to write
+        chunk_size: side of a chunk, in mm
+        inset_distance: inset of every tile, 0 for none
+        workers: processes computing chunks in parallel
+
+    Returns:
+        number of chunks written
+    """
+    chunks = chunk_grid(bounds, chunk_size)
+    render = partial(_chunk_paths, source=source, bounds=bounds, inset_distance=inset_distance)
+    width, height = bounds[2] - bounds[0], bounds[3] - bounds[1]
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        rendered = pool.imap(render, chunks) if pool else map(render, chunks)
+        with open(filename, 'w') as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+                    f'width="{width}mm" height="{height}mm" viewBox="0 0 {width} {height}">\n')
+            f.write('<g fill="none" stroke="blue" stroke-width="0.1">\n')
+            for paths in rendered:
+                if paths:
+                    f.write(paths + '\n')
+            f.write('</g>\n</svg>\n')
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return len(chunks)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('filename', help='SVG file to write')
+    parser.add_argument('--pattern', choices=sorted(SOURCES), default='penrose')
+    parser.add_argument('--bounds', type=float, nargs=4, default=[-6000, -1500, 6000, 1500],
+                        metavar=('MINX', 'MINY', 'MAXX', 'MAXY'), help='target area in mm')
+    parser.add_argument('--chunk', type=float, default=1000, help='chunk size in mm')
+    parser.add_argument('--inset', type=float, default=3, help='inset distance in mm')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--iters', type=int, default=8, help='penrose: inflations')
+    parser.add_argument('--tiling', help='deflation: P1, P2 or A5 (P1), pentagrid: P2 or P3 (P2)')
+    parser.add_argument('-n', type=int, default=5, help='deflation: generations')
+    parser.add_argument('--level', type=int, help='hat: block level (5), metatiles: metatile level (7)')
+    parser.add_argument('--scale', type=float,
+                        help='scale of the pattern (penrose: 1, deflation: 3000, hat and metatiles: 7.1, '
+                             'socolar: 26.83, pentagrid: 20.665)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.pattern == 'penrose':
+        source = partial(penrose_tiles, iters=args.iters, scale=args.scale or 1.0)
+    elif args.pattern == 'hat':
+        source = partial(hat_tiles, level=args.level or 5, scale=args.scale or 7.1)
+    elif args.pattern == 'metatiles':
+        source = partial(metatile_tiles, level=args.level or 7, scale=args.scale or 7.1)
+    elif args.pattern == 'socolar':
+        source = partial(socolar_tiles, scale=args.scale or 26.83)
+    elif args.pattern == 'pentagrid':
+        source = partial(pentagrid_tiles, tiling=args.tiling or 'P2', scale=args.scale or 20.665)
+    else:
+        if args.tiling == 'P3':
+            # the P3 rhomb deflation cannot be limited to a window (see
+            # Deflation.UNBOUNDED_TILES), the pentagrid computes any window
+            sys.exit("deflation cannot stream P3, use --pattern pentagrid --tiling P3")
+        source = partial(deflation_tiles, tiling_type=args.tiling or 'P1', n=args.n, scale=args.scale or 3000)
+    count = stream_to_svg(source, tuple(args.bounds), args.filename, args.chunk, args.inset, args.workers)
+    print(f"wrote {count} chunks to {args.filename}")
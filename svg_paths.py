@@ -0,0 +1,382 @@
+"""
+Fast SVG geometry ingestion.
+
+Path data is tokenized straight into numpy arrays: runs of M/L/H/V/Z
+commands become whole coordinate blocks (relative runs are a cumsum), and
+nested `transform` attributes are composed into one 3x3 matrix per element,
+applied to all of its points in a single matrix product.
+Curves (C/S/Q/T/A) are flattened adaptively to within `tolerance`, so the
+straight "curves" Inkscape likes to write collapse to their end points.
+"""
+import math
+import re
+from itertools import groupby
+from xml.etree import ElementTree as ET
+
+import numpy as np
+from shapely.geometry import Polygon, LineString
+
+DEFAULT_TOLERANCE = 0.01  # mm, well below the laser kerf
+
+# elements whose children are never drawn
+_SKIPPED_TAGS = {'defs', 'clipPath', 'mask', 'symbol', 'marker', 'pattern', 'metadata'}
+
+_NUMBER = r'[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?'
+_NUMBER_RE = re.compile(_NUMBER)
+_COMMAND_RE = re.compile(r'([MmLlHhVvZzCcSsQqTtAa])([^MmLlHhVvZzCcSsQqTtAa]*)')
+_ARC_RE = re.compile(
+    rf'({_NUMBER})[\s,]*({_NUMBER})[\s,]*({_NUMBER})[\s,]*([01])[\s,]*([01])[\s,]*({_NUMBER})[\s,]*({_NUMBER})')
+# a single subpath of absolute straight lines, the bulk of our own exports,
+# with its numbers separated by blanks or commas (compact data such as
+# M1-2L3-4 or M0.5.5 goes through parse_path)
+_COORDINATES = rf'{_NUMBER}(?:[\s,]+{_NUMBER})*'
+_POLYLINE_RE = re.compile(rf'\s*M\s*{_COORDINATES}(?:[\s,]*L\s*{_COORDINATES})*\s*[Zz]?\s*')
+_POLYLINE_BLANKS = str.maketrans('MLZz,', '     ')
+_TRANSFORM_RE = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+
+
+# Transforms
+def parse_transform(transform_str):
+    """
+    Parse an SVG `transform` attribute (possibly a list of transforms)
+    into a single 3x3 affine matrix.
+    """
+    matrix = np.eye(3)
+    if not transform_str:
+        return matrix
+    for name, args in _TRANSFORM_RE.findall(transform_str):
+        v = [float(a) for a in _NUMBER_RE.findall(args)]
+        t = np.eye(3)
+        if name == 'matrix':
+            t[0, :] = v[0], v[2], v[4]
+            t[1, :] = v[1], v[3], v[5]
+        elif name == 'translate':
+            t[0, 2] = v[0]
+            t[1, 2] = v[1] if len(v) > 1 else 0.0
+        elif name == 'scale':
+            t[0, 0] = v[0]
+            t[1, 1] = v[1] if len(v) > 1 else v[0]
+        elif name == 'rotate':
+            a = math.radians(v[0])
+            cx, cy = (v[1], v[2]) if len(v) > 2 else (0.0, 0.0)
+            t[:2, :2] = [[math.cos(a), -math.sin(a)], [math.sin(a), math.cos(a)]]
+            t[:2, 2] = (cx, cy) - t[:2, :2] @ (cx, cy)
+        elif name == 'skewX':
+            t[0, 1] = math.tan(math.radians(v[0]))
+        elif name == 'skewY':
+            t[1, 0] = math.tan(math.radians(v[0]))
+        matrix = matrix @ t
+    return matrix
+
+
+def apply_transform(points, matrix):
+    """Apply a 3x3 affine matrix to an (n, 2) array of points at once"""
+    return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+# Curve flattening
+# (plain floats: the curves of a path are short runs, where numpy's per-call
+# overhead would dominate)
+def _flatten_cubic(p0, p1, p2, p3, tolerance, out, depth=0):
+    """Append the end points of a polyline within tolerance of a cubic Bezier"""
+    # distance of the control points to the chord
+    cx, cy = p3[0] - p0[0], p3[1] - p0[1]
+    length = math.hypot(cx, cy)
+    if length == 0:
+        deviation = max(math.dist(p0, p1), math.dist(p0, p2))
+    else:
+        deviation = max(abs(cx * (p1[1] - p0[1]) - cy * (p1[0] - p0[0])),
+                        abs(cx * (p2[1] - p0[1]) - cy * (p2[0] - p0[0]))) / length
+    if depth >= 16 or deviation <= tolerance:
+        out.append(p3)
+        return
+    # de Casteljau split at t = 0.5
+    p01 = ((p0[0] + p1[0]) / 2, (p0[1] + p1[1]) / 2)
+    p12 = ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)
+    p23 = ((p2[0] + p3[0]) / 2, (p2[1] + p3[1]) / 2)
+    p012 = ((p01[0] + p12[0]) / 2, (p01[1] + p12[1]) / 2)
+    p123 = ((p12[0] + p23[0]) / 2, (p12[1] + p23[1]) / 2)
+    mid = ((p012[0] + p123[0]) / 2, (p012[1] + p123[1]) / 2)
+    _flatten_cubic(p0, p01, p012, mid, tolerance, out, depth + 1)
+    _flatten_cubic(mid, p123, p23, p3, tolerance, out, depth + 1)
+
+
+def _flatten_arc(p0, rx, ry, phi, large_arc, sweep, p1, tolerance, out):
+    """Append the end points of a polyline within tolerance of an elliptical arc"""
+    # endpoint -> centre parameterisation (SVG spec, appendix F.6.5)
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0 or p0 == p1:
+        out.append(p1)
+        return
+    cos_phi, sin_phi = math.cos(math.radians(phi)), math.sin(math.radians(phi))
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1 = cos_phi * dx + sin_phi * dy
+    y1 = -sin_phi * dx + cos_phi * dy
+    scale = x1 ** 2 / rx ** 2 + y1 ** 2 / ry ** 2
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    num = rx ** 2 * ry ** 2 - rx ** 2 * y1 ** 2 - ry ** 2 * x1 ** 2
+    coef = math.sqrt(max(num, 0) / (rx ** 2 * y1 ** 2 + ry ** 2 * x1 ** 2))
+    if large_arc == sweep:
+        coef = -coef
+    cx1, cy1 = coef * rx * y1 / ry, -coef * ry * x1 / rx
+    cx = cos_phi * cx1 - sin_phi * cy1 + (p0[0] + p1[0]) / 2
+    cy = sin_phi * cx1 + cos_phi * cy1 + (p0[1] + p1[1]) / 2
+    theta = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    delta = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx) - theta
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    # segment count so that the sagitta stays within tolerance
+    r = max(rx, ry)
+    step = 2 * math.acos(1 - tolerance / r) if tolerance < r else math.pi / 2
+    n = max(1, math.ceil(abs(delta) / step))
+    for k in range(1, n):
+        t = theta + delta * k / n
+        ex, ey = rx * math.cos(t), ry * math.sin(t)
+        out.append((cos_phi * ex - sin_phi * ey + cx, sin_phi * ex + cos_phi * ey + cy))
+    out.append(p1)
+
+
+# Path data
+def _command_runs(d):
+    # merge consecutive commands of the same kind ("L x,y L x,y ...", as
+    # written by svgwrite) into one run so each run is a single array
+    for cmd, group in groupby(_COMMAND_RE.findall(d), key=lambda c: c[0]):
+        if cmd in 'MmZz':
+            yield from group
+        else:
+            yield cmd, ' '.join(args for _, args in group)
+
+
+def parse_path(d, tolerance=DEFAULT_TOLERANCE):
+    """
+    Tokenize SVG path data into numpy arrays.
+
+    Args:
+        d: the `d` attribute of a path
+        tolerance: maximum distance between a curve and its flattened polyline
+
+    Returns:
+        list of (points, closed) tuples, one per subpath, where points is an
+        (n, 2) float array. Closed subpaths end on their first point.
+    """
+    subpaths = []
+    blocks = None           # coordinate blocks of the current subpath
+    pos = (0.0, 0.0)
+    start = (0.0, 0.0)
+    control = None          # last control point, for S/s and T/t reflection
+    control_kind = None
+
+    def finish(closed):
+        nonlocal blocks
+        if blocks:
+            points = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+            if closed and (points[-1] != points[0]).any():
+                points = np.vstack([points, points[:1]])
+            if len(points) > 1:
+                subpaths.append((points, closed))
+        blocks = None
+
+    for cmd, args in _command_runs(d):
+        upper = cmd.upper()
+        relative = cmd != upper
+        if upper == 'Z':
+            finish(True)
+            pos = start
+            control_kind = None
+            continue
+        if upper == 'M':
+            finish(False)
+            points = np.array(_NUMBER_RE.findall(args), dtype=float).reshape(-1, 2)
+            if relative:
+                points = np.cumsum(points, axis=0) + pos
+            blocks = [points]
+            start = (points[0, 0], points[0, 1])
+            pos = (points[-1, 0], points[-1, 1])
+            control_kind = None
+            continue
+        if blocks is None:
+            # drawing right after a Z starts a new subpath at the last start
+            blocks = [np.array([start])]
+
+        if upper in 'LHV':
+            # straight runs: one array per run, relative runs are a cumsum
+            values = np.array(_NUMBER_RE.findall(args), dtype=float)
+            if upper == 'L':
+                points = values.reshape(-1, 2)
+                if relative:
+                    points = np.cumsum(points, axis=0) + pos
+            else:
+                axis = 0 if upper == 'H' else 1
+                points = np.empty((len(values), 2))
+                points[:, 1 - axis] = pos[1 - axis]
+                points[:, axis] = np.cumsum(values) + pos[axis] if relative else values
+            control_kind = None
+        else:
+            out = []
+            if upper == 'A':
+                for rx, ry, phi, large_arc, sweep, x, y in _ARC_RE.findall(args):
+                    end = (float(x), float(y))
+                    if relative:
+                        end = (pos[0] + end[0], pos[1] + end[1])
+                    _flatten_arc(pos, float(rx), float(ry), float(phi),
+                                 large_arc == '1', sweep == '1', end, tolerance, out)
+                    pos = end
+                control_kind = None
+            else:
+                values = [float(v) for v in _NUMBER_RE.findall(args)]
+                arity = {'C': 6, 'S': 4, 'Q': 4, 'T': 2}[upper]
+                for i in range(0, len(values) - arity + 1, arity):
+                    v = values[i:i + arity]
+                    if relative:
+                        v = [c + pos[k % 2] for k, c in enumerate(v)]
+                    pts = list(zip(v[::2], v[1::2]))
+                    if upper == 'C':
+                        c1, c2, end = pts
+                    elif upper == 'S':
+                        c1 = (2 * pos[0] - control[0], 2 * pos[1] - control[1]) if control_kind == 'C' else pos
+                        c2, end = pts
+                    else:
+                        if upper == 'Q':
+                            q, end = pts
+                        else:
+                            q = (2 * pos[0] - control[0], 2 * pos[1] - control[1]) if control_kind == 'Q' else pos
+                            end = pts[0]
+                        # quadratic -> cubic
+                        c1 = (pos[0] + 2 / 3 * (q[0] - pos[0]), pos[1] + 2 / 3 * (q[1] - pos[1]))
+                        c2 = (end[0] + 2 / 3 * (q[0] - end[0]), end[1] + 2 / 3 * (q[1] - end[1]))
+                    _flatten_cubic(pos, c1, c2, end, tolerance, out)
+                    control, control_kind = (c2, 'C') if upper in 'CS' else (q, 'Q')
+                    pos = end
+            points = np.array(out, dtype=float).reshape(-1, 2)
+
+        if len(points):
+            blocks.append(points)
+            pos = (points[-1, 0], points[-1, 1])
+    finish(False)
+    return subpaths
+
+
+def _element_subpaths(element, tag, tolerance):
+    if tag == 'path':
+        return parse_path(element.get('d', ''), tolerance)
+    if tag in ('polygon', 'polyline'):
+        points = np.array(_NUMBER_RE.findall(element.get('points', '')), dtype=float).reshape(-1, 2)
+        if tag == 'polygon' and len(points):
+            points = np.vstack([points, points[:1]])
+        return [(points, tag == 'polygon')] if len(points) > 1 else []
+    if tag == 'line':
+        x1, y1, x2, y2 = (float(element.get(k, 0)) for k in ('x1', 'y1', 'x2', 'y2'))
+        return [(np.array([[x1, y1], [x2, y2]]), False)]
+    if tag == 'rect':
+        x, y, w, h = (float(element.get(k, 0)) for k in ('x', 'y', 'width', 'height'))
+        points = np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h], [x, y]])
+        return [(points, True)]
+    return []
+
+
+# SVG documents
+def _parse_polylines(ds):
+    """
+    Batch parser for the common case of single-subpath "M x,y L x,y ... Z"
+    paths: the commands are blanked out and the numbers of all paths are
+    converted in a single call, with NaN marking path breaks.
+    """
+    text = ' nan '.join(ds).translate(_POLYLINE_BLANKS)
+    values = np.array(text.split(), dtype=float)
+    breaks = np.isnan(values)
+    coords = values[~breaks].reshape(-1, 2)
+    path_of_value = np.cumsum(breaks)[~breaks]
+    offsets = np.zeros(len(ds) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(path_of_value[::2], minlength=len(ds)), out=offsets[1:])
+    closed = np.array([d.rstrip()[-1] in 'Zz' for d in ds])
+    return coords, offsets, closed
+
+
+def read_svg_paths(svg, id_contains=None, apply_transforms=True, tolerance=DEFAULT_TOLERANCE):
+    """
+    Read every drawable element (path, polygon, polyline, line, rect) of an
+    SVG file, composing the nested `transform` attributes on the way down.
+
+    Args:
+        svg: file path, or an already parsed ElementTree root
+        id_contains: if given, keep only elements whose id contains this string
+        apply_transforms: set to False to get raw path coordinates
+        tolerance: curve flattening tolerance
+
+    Returns:
+        list of (points, closed) tuples in document order
+    """
+    root = ET.parse(svg).getroot() if isinstance(svg, str) else svg
+    matrices = [np.eye(3)]  # one composed matrix per transformed element
+    elements = []           # (matrix index, subpaths or index into polylines)
+    polylines = []
+    stack = [(root, 0)]
+    while stack:
+        element, matrix = stack.pop()
+        tag = element.tag.rsplit('}', 1)[-1]
+        if tag in _SKIPPED_TAGS:
+            continue
+        if apply_transforms and element.get('transform'):
+            matrices.append(matrices[matrix] @ parse_transform(element.get('transform')))
+            matrix = len(matrices) - 1
+
+        if id_contains is None or id_contains in (element.get('id') or ''):
+            d = element.get('d') if tag == 'path' else None
+            if d is not None and _POLYLINE_RE.fullmatch(d):
+                elements.append((matrix, len(polylines)))
+                polylines.append(d)
+            else:
+                subpaths = _element_subpaths(element, tag, tolerance)
+                if subpaths:
+                    elements.append((matrix, subpaths))
+        # reversed so the stack pops children in document order
+        stack.extend((child, matrix) for child in reversed(element))
+
+    if polylines:
+        coords, offsets, closed = _parse_polylines(polylines)
+        if apply_transforms:
+            # every point picks up the composed matrix of its element
+            matrix_of_path = np.array([m for m, sub in elements if isinstance(sub, int)])
+            transforms = np.stack(matrices)[np.repeat(matrix_of_path, np.diff(offsets))]
+            coords = np.einsum('nij,nj->ni', transforms[:, :2, :2], coords) + transforms[:, :2, 2]
+
+    if polylines:
+        # close the rings that do not already end on their first point
+        firsts, lasts = coords[offsets[:-1]], coords[offsets[1:] - 1]
+        needs_closing = closed & (firsts != lasts).any(axis=1)
+
+    result = []
+    for matrix, subpaths in elements:
+        if isinstance(subpaths, int):
+            points = coords[offsets[subpaths]:offsets[subpaths + 1]]
+            if needs_closing[subpaths]:
+                points = np.vstack([points, points[:1]])
+            result.append((points, bool(closed[subpaths])))
+            continue
+        if apply_transforms and matrix:
+            points = apply_transform(np.concatenate([p for p, _ in subpaths]), matrices[matrix])
+            splits = np.cumsum([len(p) for p, _ in subpaths])[:-1]
+            subpaths = [(p, c) for p, (_, c) in zip(np.split(points, splits), subpaths)]
+        result.extend(subpaths)
+    return result
+
+
+def read_svg_geometries(svg, id_contains=None, apply_transforms=True,
+                        tolerance=DEFAULT_TOLERANCE, closing_tolerance=0.01):
+    """
+    Read an SVG file into shapely geometries: closed subpaths (or subpaths
+    whose ends are within closing_tolerance) become Polygons, the rest
+    LineStrings.
+    """
+    geometries = []
+    for points, closed in read_svg_paths(svg, id_contains, apply_transforms, tolerance):
+        ends_meet = np.all(np.abs(points[0] - points[-1]) < closing_tolerance)
+        if (closed or ends_meet) and len(points) >= 4:
+            geometries.append(Polygon(points))
+        else:
+            geometries.append(LineString(points))
+    return geometries
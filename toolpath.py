@@ -0,0 +1,340 @@
+"""
+Order the closed paths of a cut list into a short laser tour.
+
+Generators emit polygons in whatever order they produce them (set iteration
+order for the Penrose inflation, which is effectively random), so the head
+spends most of its time on rapid moves. order_toolpath:
+
+1. splits the cut list into closed loops (polygon exteriors, the only paths
+   simple_svg_save writes) and groups them by nesting depth, so holes are
+   cut before the piece around them falls free;
+2. builds a nearest-neighbour tour per depth, entering each loop at its
+   closest vertex, with a spatial hash over all vertices;
+3. improves it with 2-opt moves over k-nearest-neighbour candidate lists,
+   and re-chooses each loop's start vertex given its neighbours in the tour.
+
+Every loop is closed, so the head leaves a loop where it entered it and
+the travel between two loops is the distance between their start vertices.
+"""
+from collections import deque
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Polygon, MultiPolygon
+
+HOME = (0.0, 0.0)  # where the head starts, in the cut list's coordinates
+
+
+# Loops
+def cut_loops(cut_list):
+    """
+    Split a cut list into its closed loops.
+
+    Returns:
+        loops: list of Polygons, one per cut exterior
+        is_hole: booleans, True for the parts of MultiPolygons (the hole
+                 layer of simple_svg_save)
+    """
+    loops, is_hole = [], []
+    for geom in cut_list:
+        if isinstance(geom, Polygon) and not geom.is_empty:
+            loops.append(geom)
+            is_hole.append(False)
+        elif isinstance(geom, MultiPolygon):
+            parts = [part for part in geom.geoms if not part.is_empty]
+            loops.extend(parts)
+            is_hole.extend([True] * len(parts))
+    return loops, np.array(is_hole, dtype=bool)
+
+
+def _loop_vertices(loops):
+    # vertices of every exterior without the closing point, plus the offsets
+    # of each loop in the vertex array
+    rings = shapely.get_exterior_ring(np.asarray(loops, dtype=object))
+    counts = shapely.get_num_coordinates(rings) - 1
+    coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+    offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    np.cumsum(counts + 1, out=offsets[1:])
+    keep = np.ones(len(coords), dtype=bool)
+    keep[offsets[1:] - 1] = False
+    offsets[1:] = np.cumsum(counts)
+    return coords[keep], ring_idx[keep], offsets
+
+
+def nesting_depth(loops):
+    """Number of other loops enclosing each loop (0 for the outer frames)"""
+    filled = shapely.polygons(shapely.get_exterior_ring(np.asarray(loops, dtype=object)))
+    inner, outer = STRtree(filled).query(filled, predicate='within')
+    inside = inner != outer
+    return np.bincount(inner[inside], minlength=len(loops))
+
+
+def travel_length(points, home=HOME):
+    """Length of the rapid moves visiting the given start points in order"""
+    path = np.vstack([np.asarray(home, dtype=float).reshape(1, 2), points])
+    return float(np.hypot(*np.diff(path, axis=0).T).sum())
+
+
+# Nearest neighbour tour
+class _VertexHash:
+    """Uniform grid over the loop vertices, with loops removed once cut"""
+
+    def __init__(self, vertices, cell):
+        self.vertices = vertices
+        self.cell = cell
+        self.origin = vertices.min(axis=0)
+        cells = np.floor((vertices - self.origin) / cell).astype(np.int64)
+        self.width = cells[:, 1].max() + 1
+        keys = cells[:, 0] * self.width + cells[:, 1]
+        order = np.argsort(keys, kind='stable')
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        self.buckets = {int(k): order[s:e] for k, s, e in zip(unique_keys, starts, ends)}
+        self.alive = np.ones(len(vertices), dtype=bool)
+        self.extent = cells.max(axis=0)
+
+    def remove_loop(self, loop, offsets):
+        self.alive[offsets[loop]:offsets[loop + 1]] = False
+
+    def nearest(self, point, max_rings=3):
+        cx, cy = np.floor((np.asarray(point) - self.origin) / self.cell).astype(np.int64)
+        best, best_dist = -1, np.inf
+        for r in range(max_rings + 1):
+            ring = [(cx + dx, cy + dy)
+                    for dx in range(-r, r + 1) for dy in range(-r, r + 1)
+                    if max(abs(dx), abs(dy)) == r]
+            found = [self.buckets.get(int(x * self.width + y)) for x, y in ring
+                     if 0 <= x <= self.extent[0] and 0 <= y <= self.extent[1]]
+            found = [idx[self.alive[idx]] for idx in found if idx is not None]
+            if found:
+                idx = np.concatenate(found)
+                if len(idx):
+                    dist = np.hypot(*(self.vertices[idx] - point).T)
+                    k = np.argmin(dist)
+                    if dist[k] < best_dist:
+                        best, best_dist = idx[k], dist[k]
+            # anything outside the searched block is at least r cells away
+            if best_dist <= r * self.cell:
+                return best
+        # sparse leftovers: brute force over the remaining vertices
+        idx = np.flatnonzero(self.alive)
+        if len(idx) == 0:
+            return -1
+        dist = np.hypot(*(self.vertices[idx] - point).T)
+        k = np.argmin(dist)
+        return idx[k] if dist[k] < best_dist else best
+
+
+def _nearest_neighbour_tour(vertices, loop_of, offsets, loops, start):
+    # loops: indices of the loops to visit; returns them in tour order with
+    # the vertex each one is entered at
+    mask = np.zeros(len(offsets) - 1, dtype=bool)
+    mask[loops] = True
+    in_group = mask[loop_of]
+    group_vertices = np.flatnonzero(in_group)
+    lo, hi = vertices[group_vertices].min(axis=0), vertices[group_vertices].max(axis=0)
+    cell = max(np.sqrt(np.prod(np.maximum(hi - lo, 1e-9)) / len(loops)), 1e-6)
+
+    grid = _VertexHash(vertices, cell)
+    grid.alive &= in_group
+    order, entry = [], []
+    point = np.asarray(start, dtype=float)
+    for _ in range(len(loops)):
+        vertex = grid.nearest(point)
+        loop = loop_of[vertex]
+        order.append(loop)
+        entry.append(vertex)
+        grid.remove_loop(loop, offsets)
+        point = vertices[vertex]
+    return np.array(order, dtype=np.int64), np.array(entry, dtype=np.int64)
+
+
+# 2-opt
+def _k_nearest(points, k):
+    # k nearest neighbours of every point from the 3x3 block of grid cells
+    # around it, cells holding about k points each
+    n = len(points)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64)
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    cell = max(np.sqrt(np.prod(np.maximum(hi - lo, 1e-9)) * k / n), 1e-6)
+    cells = np.floor((points - lo) / cell).astype(np.int64)
+    width = cells[:, 1].max() + 3
+    keys = (cells[:, 0] + 1) * width + cells[:, 1] + 1
+    order = np.argsort(keys, kind='stable')
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    ends = np.append(starts[1:], n)
+    buckets = {int(key): order[s:e] for key, s, e in zip(unique_keys, starts, ends)}
+
+    neighbours = np.full((n, k), -1, dtype=np.int64)
+    offsets = [dx * width + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+    for key, members in buckets.items():
+        block = [buckets[key + off] for off in offsets if key + off in buckets]
+        candidates = np.concatenate(block)
+        dist = np.hypot(points[members, None, 0] - points[None, candidates, 0],
+                        points[members, None, 1] - points[None, candidates, 1])
+        dist[members[:, None] == candidates[None, :]] = np.inf
+        m = min(k, len(candidates) - 1)
+        if m <= 0:
+            continue
+        nearest = np.argsort(dist, axis=1, kind='stable')[:, :m]
+        neighbours[members, :m] = candidates[nearest]
+    return neighbours
+
+
+def _two_opt(points, neighbours, max_moves=None):
+    """
+    Improve an open tour over `points` in place of their current order.
+    points[0] is the fixed start (the head position), the tour may end
+    anywhere. Returns the new order as indices into points.
+    """
+    n = len(points)
+    tour = np.arange(n)
+    pos = np.arange(n)
+    x, y = points[:, 0], points[:, 1]
+
+    def dist(a, b):
+        return np.hypot(x[a] - x[b], y[a] - y[b])
+
+    active = deque(range(n))
+    queued = np.ones(n, dtype=bool)
+    moves = 0
+    while active and (max_moves is None or moves < max_moves):
+        a = active.popleft()
+        queued[a] = False
+        i = pos[a]
+        if i == n - 1:
+            continue
+        b = tour[i + 1]
+        d_ab = dist(a, b)
+        for c in neighbours[a]:
+            if c < 0 or c == 0:
+                continue
+            d_ac = dist(a, c)
+            if d_ac >= d_ab:
+                break
+            j = pos[c]
+            if j > i + 1:
+                # a-b ... c-d  ->  a-c ... b-d, reversing b..c
+                d = tour[j + 1] if j < n - 1 else -1
+                gain = d_ab - d_ac
+                if d >= 0:
+                    gain += dist(c, d) - dist(b, d)
+                lo, hi = i + 1, j
+            elif j < i:
+                # c-e ... a-b  ->  c-a ... e-b, reversing e..a
+                e = tour[j + 1]
+                gain = d_ab + dist(c, e) - d_ac - dist(e, b)
+                lo, hi = j + 1, i
+            else:
+                continue
+            if gain > 1e-9:
+                tour[lo:hi + 1] = tour[lo:hi + 1][::-1]
+                pos[tour[lo:hi + 1]] = np.arange(lo, hi + 1)
+                moves += 1
+                for node in (a, b, c):
+                    if not queued[node]:
+                        active.append(node)
+                        queued[node] = True
+                break
+    return tour
+
+
+def _choose_start_vertices(order, entry, vertices, offsets, start):
+    # entering a loop at v costs |prev - v| + |v - next|; sweep the tour
+    # once with the neighbours fixed
+    entry = entry.copy()
+    previous = np.asarray(start, dtype=float)
+    for k, loop in enumerate(order):
+        candidates = vertices[offsets[loop]:offsets[loop + 1]]
+        cost = np.hypot(*(candidates - previous).T)
+        if k + 1 < len(order):
+            cost = cost + np.hypot(*(candidates - vertices[entry[k + 1]]).T)
+        entry[k] = offsets[loop] + np.argmin(cost)
+        previous = vertices[entry[k]]
+    return entry
+
+
+def _optimize_group(vertices, loop_of, offsets, loops, start, neighbours_k, rounds):
+    order, entry = _nearest_neighbour_tour(vertices, loop_of, offsets, loops, start)
+    for _ in range(rounds):
+        points = np.vstack([np.asarray(start, dtype=float).reshape(1, 2), vertices[entry]])
+        tour = _two_opt(points, _k_nearest(points, neighbours_k))[1:] - 1
+        order, entry = order[tour], entry[tour]
+        entry = _choose_start_vertices(order, entry, vertices, offsets, start)
+    return order, entry
+
+
+def _rotated_loops(loops, order, entry, vertices, offsets):
+    # the ordered loops with each exterior starting at its entry vertex,
+    # all rings built in one shapely call
+    counts = np.diff(offsets)[order]
+    ring_ids = np.repeat(np.arange(len(order)), counts + 1)
+    step = np.arange(len(ring_ids)) - np.repeat(np.cumsum(counts + 1) - counts - 1, counts + 1)
+    shift = np.repeat(entry - offsets[order], counts + 1)
+    vertex = np.repeat(offsets[order], counts + 1) + (step + shift) % np.repeat(counts, counts + 1)
+    polygons = shapely.polygons(shapely.linearrings(vertices[vertex], indices=ring_ids))
+    # keep the holes of polygons that have some
+    for k, loop in enumerate(order):
+        if loops[loop].interiors:
+            polygons[k] = Polygon(polygons[k].exterior, loops[loop].interiors)
+    return polygons
+
+
+def order_toolpath(cut_list, home=HOME, neighbours=8, rounds=2):
+    """
+    Reorder a cut list into a short laser tour.
+
+    Args:
+        cut_list: list of Polygons / MultiPolygons, as passed to simple_svg_save
+        home: position of the head before the first cut
+        neighbours: size of the 2-opt candidate lists
+        rounds: 2-opt + start vertex passes after the nearest-neighbour tour
+
+    Returns:
+        ordered: list of Polygons, each exterior starting at its entry vertex.
+                 Parts of MultiPolygons come back as single-part MultiPolygons
+                 so they stay on the hole layer of simple_svg_save.
+        report: dict with the rapid travel before and after, in mm
+    """
+    loops, is_hole = cut_loops(cut_list)
+    if not loops:
+        return [], {'loops': 0, 'travel_before': 0.0, 'travel_after': 0.0}
+    vertices, loop_of, offsets = _loop_vertices(loops)
+    travel_before = travel_length(vertices[offsets[:-1]], home)
+
+    # innermost loops first, each depth chained from where the last ended
+    depth = nesting_depth(loops)
+    start = np.asarray(home, dtype=float)
+    order, entry = [], []
+    for level in range(depth.max(), -1, -1):
+        group = np.flatnonzero(depth == level)
+        if len(group) == 0:
+            continue
+        group_order, group_entry = _optimize_group(
+            vertices, loop_of, offsets, group, start, neighbours, rounds)
+        order.append(group_order)
+        entry.append(group_entry)
+        start = vertices[group_entry[-1]]
+    order, entry = np.concatenate(order), np.concatenate(entry)
+    travel_after = travel_length(vertices[entry], home)
+
+    ordered = []
+    for loop, polygon in zip(order, _rotated_loops(loops, order, entry, vertices, offsets)):
+        ordered.append(MultiPolygon([polygon]) if is_hole[loop] else polygon)
+    report = {
+        'loops': len(loops),
+        'travel_before': travel_before,
+        'travel_after': travel_after,
+    }
+    return ordered, report
+
+
+def format_travel_report(report):
+    """One line summary of order_toolpath's report"""
+    before, after = report['travel_before'], report['travel_after']
+    saved = 100 * (1 - after / before) if before else 0.0
+    return (f"toolpath: {report['loops']} loops, rapid travel "
+            f"{before / 1000:.2f}m -> {after / 1000:.2f}m ({saved:.0f}% less)")
@@ -11,9 +11,17 @@
 # for     v = A + E - i in the diamond deflation 
 # and ('diamond', i, s, v, t)  (l->i)
 
+# The A5 (Ammann-Beenker) rhomb deflation had ('squareA5', D, l, i, m)
+# for ('squareA5', D, f, i, m), which overlapped the neighbouring tiles
 
+
+import hashlib
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy
 from numpy import sqrt, sin, cos, array, radians
-import matplotlib.pyplot as plt
 
 from shapely.geometry import Polygon
 from shapely import affinity, polygons
@@ -94,44 +102,14 @@ pent1 = [('pent1', (0,0), (1,0), array(rotatePoint(1,0, 72))+(1,0),
 
 
 def plotOutline(tiles):
-    # Marks a black line around the outline of each tile
-    for tile in tiles:
-        if tile[0]=='triangle' or tile[0]=='sierpinskiTriangle':
-            plt.plot([tile[1][0], tile[2][0], tile[3][0], tile[1][0]],
-                [tile[1][1], tile[2][1], tile[3][1], tile[1][1]],
-                'k', linewidth=0.1)
-        elif tile[0]=='kite' or tile[0]=='dart' or tile[0]=='fat' \
-            or tile[0]=='thin' or tile[0]=='square' or tile[0]=='squareA5' \
-            or tile[0]=='rhombA5' or tile[0]=='diamond':
-            plt.plot([tile[1][0], tile[2][0], tile[3][0], tile[4][0], tile[1][0]],
-                [tile[1][1], tile[2][1], tile[3][1], tile[4][1], tile[1][1]],
-                'k', linewidth=0.1) 
-        elif tile[0]=='pent1' or tile[0]=='pent2' or tile[0]=='pent3':
-            plt.plot([tile[1][0], tile[2][0], tile[3][0], tile[4][0],
-                tile[5][0], tile[1][0]],
-                [tile[1][1], tile[2][1], tile[3][1], tile[4][1],
-                tile[5][1], tile[1][1]],
-                'k', linewidth=0.1)
-        elif tile[0]=='boat':
-            plt.plot([tile[1][0], tile[2][0], tile[3][0], tile[4][0],
-                tile[5][0], tile[6][0], tile[7][0], tile[1][0]],
-                [tile[1][1], tile[2][1], tile[3][1], tile[4][1],
-                tile[5][1], tile[6][1], tile[7][1], tile[1][1]],
-                'k', linewidth=0.1)
-        elif tile[0]=='star':
-            plt.plot([tile[1][0], tile[2][0], tile[3][0], tile[4][0],
-                tile[5][0], tile[6][0], tile[7][0], tile[8][0],
-                tile[9][0], tile[10][0], tile[1][0]],
-                [tile[1][1], tile[2][1], tile[3][1], tile[4][1],
-                tile[5][1], tile[6][1], tile[7][1], tile[8][1],
-                tile[9][1], tile[10][1], tile[1][1]],
-                'k', linewidth=0.1)
-        elif tile[0]=='hexagon' or tile[0]=='chair':
-            plt.plot([tile[1][0], tile[2][0], tile[3][0], tile[4][0],
-                tile[5][0], tile[6][0], tile[1][0]],
-                [tile[1][1], tile[2][1], tile[3][1], tile[4][1],
-                tile[5][1], tile[6][1], tile[1][1]],
-                'k', linewidth=0.1)
+    # Marks a black line around the outline of each tile, all of them drawn
+    # as a single LineCollection (one plt.plot per tile takes minutes at N=8)
+    # (matplotlib is only loaded when plotting)
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    outlines = [list(tile[1:]) + [tile[1]] for tile in tiles]
+    plt.gca().add_collection(LineCollection(outlines, colors='k', linewidths=0.1))
+    plt.gca().autoscale_view()
 
 def deflate_kite(kite):
     # Deflation process for kite tiles, returns 4 new smaller tiles (2 kites and 2 darts).
@@ -307,7 +285,7 @@ def deflate_rhombA5(rhombA5):
         ('rhombA5', C, i, f, h),
         ('squareA5', B, e, g, k),
         ('squareA5', D, n, j, e),
-        ('squareA5', D, l, i, m),
+        ('squareA5', D, f, i, m),
         ('squareA5', B, l, h, f)
     ]
 def deflate_squareA5(squareA5):
@@ -566,38 +544,416 @@ def deflateGeneral (tiles, n):
                 # Chooses between the different deflation processes by checking
                 # first element, returns the next generation of tiles
                 function = eval('deflate_' + tile[0])
-                nextGenTiles = nextGenTiles + function(tile)
-            uniqueCentres, uniqueTiles = [], []
+                nextGenTiles.extend(function(tile))
+            uniqueCentres, uniqueTiles = set(), []
             # Clears information on previous generation of tiles each iteration
             # (to avoid mixing of generations)
             for tile in nextGenTiles:
                 # Filters this new list of deflated tiles to remove duplicates
-                centre = getCentre(tile)
+                centre = tuple(getCentre(tile))
                 # Calls the getCentre function on given tile
                 if centre not in uniqueCentres:
                     # Only adds tile to tile list if it does not match centres with
                     # any already in centre list
                     uniqueTiles.append(tile)
                     # List of unique tiles
-                    uniqueCentres.append(centre)
-                    # Corresponding list of unique centres
+                    uniqueCentres.add(centre)
+                    # Corresponding set of unique centres
             tiles = uniqueTiles
     return tiles
 
+# Descendants of a tile stay within this many of its diameters of its
+# bounding box (measured over 8 generations: at most 0.42 for kites and darts,
+# 0.27 for A5 and 0.16 for the pentagon family)
+WINDOW_MARGIN = 2.0
+
+# Tile types whose descendants are not bounded by the parent: the hexagon
+# rule grows every hexagon into a flower of seven, and the fat and thin
+# rhomb rules place children outside their parent (and give overlapping
+# tiles from the third generation on, so the widest tile keeps growing).
+# The window queries would silently miss tiles of these, so they refuse them.
+UNBOUNDED_TILES = {'fat', 'thin', 'hexagon'}
+
+def checkBounded(tiles):
+    # Raises ValueError if tiles hold a type of UNBOUNDED_TILES
+    unbounded = sorted(UNBOUNDED_TILES & {tile[0] for tile in tiles})
+    if unbounded:
+        raise ValueError("window queries cannot prune %s tiles (their descendants leave "
+                         "the parent), use deflateGeneral" % ', '.join(unbounded))
+
+def reachesWindow(tile, window, margin=WINDOW_MARGIN):
+    # True when the tile, or any of its descendants, may reach
+    # window = (minx, miny, maxx, maxy)
+    xs = [point[0] for point in tile[1:]]
+    ys = [point[1] for point in tile[1:]]
+    pad = margin * sqrt((max(xs) - min(xs))**2 + (max(ys) - min(ys))**2)
+    return (min(xs) - pad <= window[2] and max(xs) + pad >= window[0]
+            and min(ys) - pad <= window[3] and max(ys) + pad >= window[1])
+
+def deflateWindow(tiles, n, window):
+    # Same as deflateGeneral, restricted to the tiles whose bounding box
+    # meets window: at every generation the tiles that cannot reach it are
+    # dropped, so the cost follows the tiles in the window, not the patch
+    # (the P3 rhombs and hexagons are refused, see UNBOUNDED_TILES)
+    checkBounded(tiles)
+    tiles = [tile for tile in tiles if reachesWindow(tile, window)]
+    for i in range(n):
+        margin = WINDOW_MARGIN if i < n - 1 else 0
+        tiles = [tile for tile in deflateGeneral(tiles, 1) if reachesWindow(tile, window, margin)]
+    return tiles
+
+# Vectorized substitution. Every deflate_* rule only adds and scales the
+# parent's vertices, so each child vertex is a fixed linear combination of
+# them: deflating a tile whose vertices are the unit vectors gives the
+# coefficients, and a whole generation of one tile type is then deflated
+# with one matrix product.
+_substitutionMatrices = {}
+
+def substitutionMatrices(tileType, nVertices):
+    # [(child type, (child vertices, parent vertices) matrix)] of a tile type
+    if tileType not in _substitutionMatrices:
+        probes = []
+        for k in range(nVertices):
+            unit = [array([1.0 if j == k else 0.0, 0.0]) for j in range(nVertices)]
+            probes.append(eval('deflate_' + tileType)([tileType] + unit))
+        _substitutionMatrices[tileType] = [
+            (child[0], numpy.array([[probe[c][v][0] for probe in probes]
+                                    for v in range(1, len(child))]))
+            for c, child in enumerate(probes[0])]
+    return _substitutionMatrices[tileType]
+
+def queryWindow(tiles, n, window):
+    # Tiles of generation n whose bounding box meets window = (minx, miny,
+    # maxx, maxy), as {tile type: (k, vertices, 2) array}. Same tiles, in
+    # the same order, as deflateWindow (and so as deflateGeneral restricted
+    # to the window), descending one generation at a time on arrays.
+    checkBounded(tiles)
+    generation = _keepReaching(tileArrays(tiles), window, WINDOW_MARGIN)
+    for i in range(n):
+        generation = _deflateArrays(generation)
+        generation = _keepReaching(generation, window, WINDOW_MARGIN if i < n - 1 else 0)
+    return {kind: vertices[numpy.argsort(ranks, kind='stable')]
+            for kind, (vertices, ranks) in generation.items() if len(vertices)}
+
+def tileArrays(tiles):
+    # A generation as {tile type: (vertices, ranks)}: a (k, vertices, 2)
+    # array per type, and the position of every tile in the generation
+    groups = {}
+    for k, tile in enumerate(tiles):
+        groups.setdefault(tile[0], []).append(k)
+    return {kind: (numpy.array([[list(v) for v in tiles[k][1:]] for k in ranks], dtype=float),
+                   numpy.array(ranks, dtype=numpy.int64))
+            for kind, ranks in groups.items()}
+
+def arrayTiles(generation):
+    # Inverse of tileArrays: tiles as in deflateGeneral, in generation order
+    tiles = [(rank, (kind,) + tuple(v)) for kind, (vertices, ranks) in generation.items()
+             for rank, v in zip(ranks.tolist(), vertices)]
+    return [tile for _, tile in sorted(tiles, key=lambda pair: pair[0])]
+
+def _deflateArrays(generation):
+    # one step of deflateGeneral on arrays
+    children = {}
+    for kind, (vertices, ranks) in generation.items():
+        rules = substitutionMatrices(kind, vertices.shape[1])
+        # every child of every tile in one buffer, rule after rule
+        allChildren = KERNELS[kernelBackend](numpy.concatenate([m for _, m in rules]), vertices)
+        start = 0
+        for c, (childKind, matrix) in enumerate(rules):
+            childVertices = allChildren[:, start:start + len(matrix)]
+            start += len(matrix)
+            children.setdefault(childKind, []).append(
+                (childVertices, ranks, numpy.full(len(ranks), c)))
+    return _dropSameCentre(_ranked(children))
+
+# Substitution kernels: children[k, v] = sum over p of matrix[v, p] *
+# parents[k, p], added up in the order of p on every backend so that the
+# results are bit-identical. 'numba' (when Numba is installed) compiles the
+# loops, which write the children straight into one output array; 'numpy'
+# works on whole arrays. TESCALERA_KERNELS or setKernelBackend choose.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+def _substituteNumpy(matrix, parents):
+    children = matrix[None, :, 0, None] * parents[:, None, 0]
+    for p in range(1, matrix.shape[1]):
+        children = children + matrix[None, :, p, None] * parents[:, None, p]
+    return children
+
+def _substituteLoops(matrix, parents):
+    nTiles, nParent, nDims = parents.shape
+    nChild = matrix.shape[0]
+    children = numpy.empty((nTiles, nChild, nDims))
+    for k in range(nTiles):
+        for v in range(nChild):
+            for d in range(nDims):
+                total = matrix[v, 0] * parents[k, 0, d]
+                for p in range(1, nParent):
+                    total = total + matrix[v, p] * parents[k, p, d]
+                children[k, v, d] = total
+    return children
+
+KERNELS = {'numpy': _substituteNumpy}
+if numba is not None:
+    KERNELS['numba'] = numba.njit(cache=True)(_substituteLoops)
+
+kernelBackend = os.environ.get('TESCALERA_KERNELS', 'numba')
+if kernelBackend not in KERNELS:
+    kernelBackend = 'numpy'
+
+def setKernelBackend(name):
+    # 'numpy' or 'numba' (see KERNELS)
+    global kernelBackend
+    if name not in KERNELS:
+        raise ValueError("kernel backend %r is not available (%s)" % (name, ', '.join(KERNELS)))
+    kernelBackend = name
+
+def _ranked(children):
+    # children keep the order of deflateGeneral (parent first, then rule):
+    # rank them by (parent rank, rule index)
+    kinds = list(children)
+    parents = numpy.concatenate([r for kind in kinds for _, r, _ in children[kind]])
+    rules = numpy.concatenate([c for kind in kinds for _, _, c in children[kind]])
+    ranks = numpy.empty(len(parents), dtype=numpy.int64)
+    ranks[numpy.lexsort((rules, parents))] = numpy.arange(len(parents))
+    generation, start = {}, 0
+    for kind in kinds:
+        vertices = numpy.concatenate([v for v, _, _ in children[kind]])
+        generation[kind] = (vertices, ranks[start:start + len(vertices)])
+        start += len(vertices)
+    return generation
+
+def _keepReaching(generation, window, margin):
+    # vectorized reachesWindow
+    result = {}
+    for kind, (vertices, ranks) in generation.items():
+        low, high = vertices.min(axis=1), vertices.max(axis=1)
+        pad = margin * numpy.hypot(*(high - low).T)
+        keep = ((low[:, 0] - pad <= window[2]) & (high[:, 0] + pad >= window[0])
+                & (low[:, 1] - pad <= window[3]) & (high[:, 1] + pad >= window[1]))
+        result[kind] = (vertices[keep], ranks[keep])
+    return result
+
+def _dropSameCentre(generation):
+    # vectorized duplicate filter of deflateGeneral: the first tile (in
+    # generation order) of every centre is kept, whatever its type
+    centres = numpy.concatenate([numpy.round((v[:, 0] + v[:, 2]) / 2, 9) for v, _ in generation.values()])
+    ranks = numpy.concatenate([r for _, r in generation.values()])
+    order = numpy.argsort(ranks, kind='stable')
+    _, first = numpy.unique(centres[order], axis=0, return_index=True)
+    keep = numpy.zeros(len(ranks), dtype=bool)
+    keep[order[first]] = True
+    offsets = numpy.cumsum([0] + [len(r) for _, r in generation.values()])
+    return {kind: (vertices[keep[offsets[k]:offsets[k + 1]]], r[keep[offsets[k]:offsets[k + 1]]])
+            for k, (kind, (vertices, r)) in enumerate(generation.items())}
+
+# Checkpointed generations. Every generation deflated so far is kept as
+# arrays (see tileArrays), so asking for one more generation costs one
+# substitution and going back to an earlier one costs nothing. With a
+# checkpoint directory (TESCALERA_CHECKPOINTS, or the directory argument)
+# the generations are also saved as .npz files and reused by later runs.
+CHECKPOINT_DIRECTORY = os.environ.get('TESCALERA_CHECKPOINTS')
+_checkpoints = {}
+
+def deflateCheckpointed(tiles, n, directory=CHECKPOINT_DIRECTORY):
+    # Same tiles as deflateGeneral(tiles, n), as arrays (see tileArrays)
+    key = _tilesKey(tiles)
+    generations = _checkpoints.setdefault(key, [tileArrays(tiles)])
+    while len(generations) <= n:
+        k = len(generations)
+        generation = _loadCheckpoint(directory, key, k)
+        if generation is None:
+            generation = _deflateArrays(generations[-1])
+            _saveCheckpoint(directory, key, k, generation)
+        generations.append(generation)
+    return generations[n]
+
+def _tilesKey(tiles):
+    # name of a seed: hash of its tile types and vertices
+    seed = repr([(tile[0],) + tuple(round(float(c), 12) for v in tile[1:] for c in v) for tile in tiles])
+    return hashlib.sha1(seed.encode()).hexdigest()[:16]
+
+def _checkpointPath(directory, key, k):
+    return os.path.join(directory, 'deflation_%s_%d.npz' % (key, k))
+
+def _loadCheckpoint(directory, key, k):
+    if directory is None or not os.path.exists(_checkpointPath(directory, key, k)):
+        return None
+    with numpy.load(_checkpointPath(directory, key, k)) as arrays:
+        kinds = [name[:-len('_vertices')] for name in arrays.files if name.endswith('_vertices')]
+        return {kind: (arrays[kind + '_vertices'], arrays[kind + '_ranks']) for kind in kinds}
+
+def _saveCheckpoint(directory, key, k, generation):
+    if directory is None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    arrays = {}
+    for kind, (vertices, ranks) in generation.items():
+        arrays[kind + '_vertices'], arrays[kind + '_ranks'] = vertices, ranks
+    numpy.savez(_checkpointPath(directory, key, k), **arrays)
+
+# Parallel deflation. Once the first generations exist the tiles are split,
+# in generation order, between worker processes; each worker deflates its
+# share and hands the arrays back in shared memory. The duplicate filter of
+# deflateGeneral compares centres only, so it can drop a tile that is not
+# the same as the earlier one: to drop the same tiles, every worker also
+# deflates the tiles of earlier shares close to its own ("ghosts", which
+# come first and so win the filter) and discards them at the end. A last
+# same-centre pass merges the shares.
+def deflateParallel(tiles, n, workers=None, serialGenerations=None):
+    # Same tiles as deflateCheckpointed(tiles, n), using worker processes
+    # (the ghosts are found with WINDOW_MARGIN: UNBOUNDED_TILES are
+    # deflated serially)
+    workers = workers or os.cpu_count()
+    generation = tileArrays(tiles)
+    if UNBOUNDED_TILES & set(generation):
+        workers = 1
+    k = 0
+    # deflate serially until every worker gets a few tiles
+    while k < n and (k < serialGenerations if serialGenerations is not None
+                     else sum(len(r) for _, r in generation.values()) < 8 * workers):
+        generation = _deflateArrays(generation)
+        k += 1
+    shares = _splitGeneration(generation, workers)
+    if k == n or len(shares) < 2:
+        for i in range(k, n):
+            generation = _deflateArrays(generation)
+        return generation
+
+    jobs = [(share, _ghosts(shares[:i], share), n - k) for i, share in enumerate(shares)]
+    # workers register their blocks with the parent's resource tracker
+    resource_tracker.ensure_running()
+    with multiprocessing.Pool(min(workers, len(shares))) as pool:
+        results = pool.map(_deflateShare, jobs)
+    # shares are in generation order: shift each one's ranks past the previous
+    merged, offset = {}, 0
+    for result in results:
+        top = -1
+        for kind, (vertices, ranks) in result.items():
+            ranks = _fromSharedMemory(ranks)
+            merged.setdefault(kind, []).append((_fromSharedMemory(vertices), ranks + offset))
+            top = max(top, int(ranks.max(initial=-1)))
+        offset += top + 1
+    generation = {kind: (numpy.concatenate([v for v, _ in parts]), numpy.concatenate([r for _, r in parts]))
+                  for kind, parts in merged.items()}
+    return _dropSameCentre(generation)
+
+def _splitGeneration(generation, count):
+    # up to count shares of consecutive tiles (in generation order)
+    ranks = numpy.sort(numpy.concatenate([r for _, r in generation.values()]))
+    bounds = [part[0] for part in numpy.array_split(ranks, count) if len(part)] + [ranks[-1] + 1]
+    return [{kind: (vertices[(r >= low) & (r < high)], r[(r >= low) & (r < high)])
+             for kind, (vertices, r) in generation.items()}
+            for low, high in zip(bounds[:-1], bounds[1:])]
+
+def _reach(generation):
+    # bounding box of a generation, padded by the reach of its descendants
+    vertices = numpy.concatenate([v.reshape(-1, 2) for v, _ in generation.values()])
+    diameter = max(numpy.hypot(*(v.max(axis=1) - v.min(axis=1)).T).max(initial=0)
+                   for v, _ in generation.values() if len(v))
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    pad = WINDOW_MARGIN * diameter
+    return (low[0] - pad, low[1] - pad, high[0] + pad, high[1] + pad)
+
+def _ghosts(earlierShares, share):
+    # tiles of the earlier shares whose descendants may meet the share's
+    window = _reach(share)
+    ghosts = {}
+    for earlier in earlierShares:
+        for kind, (vertices, ranks) in _keepReaching(earlier, window, WINDOW_MARGIN).items():
+            ghosts.setdefault(kind, []).append((vertices, ranks))
+    return {kind: (numpy.concatenate([v for v, _ in parts]), numpy.concatenate([r for _, r in parts]))
+            for kind, parts in ghosts.items()}
+
+def _deflateShare(job):
+    share, ghosts, steps = job
+    # ghosts have the lowest ranks, and so have their descendants: the
+    # tiles ranked below `first` are ghosts
+    first = min(int(r.min()) for _, r in share.values() if len(r))
+    generation = {kind: (numpy.concatenate([ghosts[kind][0], v]), numpy.concatenate([ghosts[kind][1], r]))
+                  if kind in ghosts else (v, r) for kind, (v, r) in share.items()}
+    generation.update({kind: ghost for kind, ghost in ghosts.items() if kind not in share})
+    for i in range(steps):
+        first = sum(len(substitutionMatrices(kind, v.shape[1])) * int((r < first).sum())
+                    for kind, (v, r) in generation.items())
+        generation = _deflateArrays(generation)
+        # only keep the ghosts that can still meet the share
+        own = {kind: (v[r >= first], r[r >= first]) for kind, (v, r) in generation.items()}
+        if not any(len(r) for _, r in own.values()):
+            break
+        window = _reach(own)
+        ghosts = _keepReaching({kind: (v[r < first], r[r < first]) for kind, (v, r) in generation.items()},
+                               window, WINDOW_MARGIN)
+        generation = {kind: (numpy.concatenate([ghosts[kind][0], own[kind][0]]),
+                             numpy.concatenate([ghosts[kind][1], own[kind][1]])) for kind in own}
+    return {kind: (_toSharedMemory(v[r >= first]), _toSharedMemory(r[r >= first]))
+            for kind, (v, r) in generation.items()}
+
+def _toSharedMemory(array):
+    # copy an array into a new shared memory block, returns what the parent
+    # needs to read it back
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    numpy.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    block.close()
+    return block.name, array.shape, array.dtype.str
+
+def _fromSharedMemory(spec):
+    # read back (and free) a block written by _toSharedMemory
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    array = numpy.ndarray(shape, dtype, buffer=block.buf).copy()
+    block.close()
+    block.unlink()
+    return array
+
+# Initial tiles of each tiling type (the generate functions take either
+# the tiles or their name)
+INITIAL_TILES = {
+    'P1': pent1,
+    'P2': sun,
+    'P3': starP3,
+    'A5': starA5,
+}
+
+def initialTiles(tiling):
+    # the initial tiles of a tiling type, or the given tiles
+    return INITIAL_TILES[tiling] if isinstance(tiling, str) else tiling
+
 tilingType = 'P1' # penrose tiling type P1
-initialTile = pent1
+initialTile = INITIAL_TILES[tilingType]
 N = 5
 fillType = 'fill'
 
-plt.figure(dpi=1200,figsize=(5,5))
-# Constructs the matplotlib figure as a high definition, square plot
-plt.axis('off')
-# Disables axis plots on image
-plt.axis('equal')
-# Fixes aspect ratio issue
+def generate(initial_tile=initialTile, n=N):
+    # Deflates the initial tile n times and returns the vertices of every
+    # tile (without the tile type), ready for shapely.Polygon
+    return [tile[1:] for tile in deflateGeneral(initialTiles(initial_tile), n)]
+
+def generate_checkpointed(initial_tile=initialTile, n=N, directory=CHECKPOINT_DIRECTORY):
+    # Same tiles as generate (up to float rounding), from the checkpointed
+    # generations: stepping n up or down between calls costs one
+    # substitution at most, see deflateCheckpointed
+    generation = deflateCheckpointed(initialTiles(initial_tile), n, directory)
+    tiles = [v for vertices, _ in generation.values() for v in vertices]
+    ranks = numpy.concatenate([ranks for _, ranks in generation.values()])
+    return [tiles[k] for k in numpy.argsort(ranks, kind='stable')]
+
+def generate_window(window, initial_tile=initialTile, n=N):
+    # Vertices of the tiles of generation n whose bounding box meets
+    # window = (minx, miny, maxx, maxy), see deflateWindow (not for P3)
+    return [tile[1:] for tile in deflateWindow(initialTiles(initial_tile), n, window)]
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-plotOutline(deflateGeneral(initialTile, N))
+    plt.figure(dpi=1200,figsize=(5,5))
+    # Constructs the matplotlib figure as a high definition, square plot
+    plt.axis('off')
+    # Disables axis plots on image
+    plt.axis('equal')
+    # Fixes aspect ratio issue
 
-all_tiles = []
-for tile in deflateGeneral(initialTile, N):
-    all_tiles.append(tile[1:])
\ No newline at end of file
+    plotOutline(deflateGeneral(initialTile, N))
+    plt.show()
@@ -16,14 +16,23 @@ from polygon_utils import (
     center_frame,
     add_tile,
     add_inner_tile,
-    crop_and_save_tile,
 )
+from polygon_duplicates import dedupe
+from manufacturability import check_cut_list, format_report
+from toolpath import order_toolpath, format_travel_report
+from nesting import pack_risers, riser_sizes, group_by_riser, save_sheets, format_packing_report
+from preview import save_thumbnail
+from riser_session import RiserSession
+from instrumentation import stage, is_enabled, report_text, save_report
 
 
 # Add the current directory to the path so we can import penrose_p2
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from Deflation import all_tiles
+from Deflation import generate
+
+with stage('generate') as generation:
+    all_tiles = generation.out(generate())
 
 
 # convert all tiles to Shapely polygons
@@ -44,14 +53,23 @@ frame = Polygon([[0,0],
 centered_frame = center_frame(polygons, frame)
 
 # keep only polygons inside selected frame
-filtered_polygons = [polygon for polygon in polygons if \
-     is_polygon_inside_frame(polygon, centered_frame)]
+with stage('frame_filter', polygons) as frame_filter:
+    filtered_polygons = frame_filter.out([polygon for polygon in polygons if \
+         is_polygon_inside_frame(polygon, centered_frame)])
+
+# drop overlapping copies before the (expensive) inset
+with stage('dedupe', filtered_polygons) as deduplication:
+    keep = dedupe(filtered_polygons, 1e-6)
+    filtered_polygons = deduplication.out(
+        [polygon for polygon, kept in zip(filtered_polygons, keep) if kept])
 
 INSET_DISTANCE = 3   # X ratio gives gaps of about 2Xmm solid channels
 inset_polygon_list = []
-for poly in filtered_polygons:
-    # mitre join style is used to keepsharp corners
-    inset_polygon_list.append(poly.buffer(-INSET_DISTANCE, join_style=JOIN_STYLE.mitre))    
+with stage('inset', filtered_polygons) as inset:
+    for poly in filtered_polygons:
+        # mitre join style is used to keepsharp corners
+        inset_polygon_list.append(poly.buffer(-INSET_DISTANCE, join_style=JOIN_STYLE.mitre))
+    inset.out(inset_polygon_list)
 
 filtered_polygons = inset_polygon_list
 
@@ -94,16 +112,18 @@ final_polygon_list = inset_polygon_list + \
 
 # simple_svg_save(final_polygon_list, f"{str(script_dir)}/p1_section5_tiles.svg", label=False)
 
-# crop tiles at the edge of a tile frame 
-crop_511 = crop_and_save_tile(filtered_polygons, inner_tile_511, save_holes=False)
-crop_512 = crop_and_save_tile(filtered_polygons, inner_tile_512, save_holes=False)
-crop_513 = crop_and_save_tile(filtered_polygons, inner_tile_513, save_holes=False)
-crop_514 = crop_and_save_tile(filtered_polygons, inner_tile_514, save_holes=False)
-crop_515 = crop_and_save_tile(filtered_polygons, inner_tile_515, save_holes=False)
-crop_516 = crop_and_save_tile(filtered_polygons, inner_tile_516, save_holes=False)
-crop_517 = crop_and_save_tile(filtered_polygons, inner_tile_517, save_holes=False)
-crop_518 = crop_and_save_tile(filtered_polygons, inner_tile_518, save_holes=False)
-crop_519 = crop_and_save_tile(filtered_polygons, inner_tile_519, save_holes=False)
+# crop tiles at the edge of a tile frame (the session keeps the pattern's
+# STRtree, so windows can be moved again in milliseconds, see riser_session)
+session = RiserSession(filtered_polygons, save_holes=False)
+crop_511 = session.place('511', inner_tile_511)
+crop_512 = session.place('512', inner_tile_512)
+crop_513 = session.place('513', inner_tile_513)
+crop_514 = session.place('514', inner_tile_514)
+crop_515 = session.place('515', inner_tile_515)
+crop_516 = session.place('516', inner_tile_516)
+crop_517 = session.place('517', inner_tile_517)
+crop_518 = session.place('518', inner_tile_518)
+crop_519 = session.place('519', inner_tile_519)
 
 final_export_list = crop_511 + crop_512 + crop_513 + crop_514 + \
     crop_515 + crop_516 + crop_517 + crop_518 + crop_519 + [centered_frame] + \
@@ -117,6 +137,38 @@ final_export_list = [
     if hasattr(p, 'area') and p.area >= 21
 ]
 
-simple_svg_save(final_export_list, f"{str(script_dir)}/p1_section5_tiles_cropped.svg", label=False)
-
-
+# report slivers and webs too narrow for the laser (only reported: check
+# the pieces before dropping them with remove_offenders, protecting the
+# frame and the riser outlines)
+cut_report = check_cut_list(final_export_list)
+print(format_report(cut_report))
+# outlines = [centered_frame, tile_511, tile_512, tile_513, tile_514, tile_515,
+#             tile_516, tile_517, tile_518, tile_519]
+# final_export_list = remove_offenders(
+#     final_export_list, cut_report,
+#     protected=[k for k, p in enumerate(final_export_list) if any(p is t for t in outlines)])
+
+# order the cuts into a short laser tour, holes before the risers
+final_export_list, travel_report = order_toolpath(final_export_list)
+print(format_travel_report(travel_report))
+
+with stage('export', final_export_list):
+    simple_svg_save(final_export_list, f"{str(script_dir)}/p1_section5_tiles_cropped.svg", label=False)
+
+# lay the risers out on metal sheets, one cut file per sheet
+risers = [tile_511, tile_512, tile_513, tile_514, tile_515,
+          tile_516, tile_517, tile_518, tile_519]
+sheets = pack_risers(risers)
+print(format_packing_report(sheets, riser_sizes(risers)))
+riser_cut_lists = group_by_riser(final_export_list, risers)
+save_sheets(riser_cut_lists, risers, sheets,
+            f"{str(script_dir)}/p1_section5_sheet_{{}}.svg")
+
+# quick PNG previews of every riser, no plotting library involved
+for number, riser_cut_list in zip(range(511, 520), riser_cut_lists):
+    save_thumbnail(riser_cut_list, f"{str(script_dir)}/p1_section5_riser_{number}.png", width=600)
+
+# per-stage timings (TESCALERA_PROFILE=1 to record them)
+if is_enabled():
+    print(report_text())
+    save_report(f"{str(script_dir)}/p1_section5_profile.json")
@@ -0,0 +1,127 @@
+"""
+12-fold tilings of squares, 30 degree rhombs and regular hexagons (the
+tiles of tramo_5_socolar.svg), computed from a grid instead of drawn.
+
+    python socolar.py [edge]    # writes socolar/socolar_tiles.svg, edge in mm
+
+The tiles are the dual of a 6-grid (de Bruijn's method): six families of
+parallel lines, one every 30 degrees, each line family i shifted by
+SHIFTS[i]. Every point where grid lines cross becomes a tile whose edges
+are perpendicular to those lines, so two lines at 90 degrees give a
+square, two at 30 degrees a rhomb. The grid is split into two triangular
+grids, 0/120/240 and 90/210/330 degrees, whose shifts add up to zero:
+their lines then always cross three at a time, and every such triple
+point becomes a hexagon.
+
+There is no substitution and no deduplication: a window only computes the
+crossings whose tiles can reach it, and the same shifts always give the
+same tiling.
+
+Socolar's own rules (decorated tiles whose supertiles have jagged edges)
+give a different tiling with the same three tiles and the same 12-fold
+symmetry.
+"""
+import numpy as np
+
+# normals of the six line families: two triangular grids
+ANGLES = (0, 120, 240, 90, 210, 330)
+NORMALS = np.stack([np.cos(np.radians(ANGLES)), np.sin(np.radians(ANGLES))], axis=1)
+TRIPLES = ((0, 1, 2), (3, 4, 5))
+# shifts of the families (each triple adds up to zero), any generic values
+# give a tiling, these give the one of socolar_tiles.svg
+SHIFTS = (0.2, 0.3, -0.5, 0.4142135623730951, -0.7320508075688772, 0.3178372451957821)
+EDGE = 26.83   # mm, edge of the tiles in tramo_5_socolar.svg
+
+
+# Crossings
+def _lines(family, region, shifts):
+    # indices k of the lines x . normal + shift = k that cross region
+    corners = np.array([[region[0], region[1]], [region[2], region[1]],
+                        [region[0], region[3]], [region[2], region[3]]])
+    values = corners @ NORMALS[family] + shifts[family]
+    return np.arange(np.ceil(values.min()), np.floor(values.max()) + 1)
+
+
+def _crossings(i, j, region, shifts):
+    # (points, (k_i, k_j)) where a line of family i crosses one of family j
+    # inside region
+    ki, kj = np.meshgrid(_lines(i, region, shifts), _lines(j, region, shifts), indexing='ij')
+    ks = np.stack([ki.ravel(), kj.ravel()], axis=1)
+    points = np.linalg.solve(NORMALS[[i, j]], (ks - (shifts[i], shifts[j])).T).T
+    inside = ((points[:, 0] >= region[0]) & (points[:, 0] <= region[2])
+              & (points[:, 1] >= region[1]) & (points[:, 1] <= region[3]))
+    return points[inside], ks[inside]
+
+
+def _dual(points, families, ks, shifts, corners):
+    # tiles of the crossings: the cell indices of the lines that do not go
+    # through the point, plus the corners of the lines that do
+    cells = np.floor(points @ NORMALS.T + shifts)
+    cells[:, families] = ks - 1
+    return (cells @ NORMALS)[:, None, :] + corners
+
+
+# Tiles
+def query_window(window, shifts=SHIFTS):
+    """
+    Tiles (edge 1) whose bounding box meets window = (minx, miny, maxx,
+    maxy), as {'square': (k, 4, 2), 'rhomb': (k, 4, 2), 'hexagon': (k, 6, 2)}.
+    """
+    shifts = np.asarray(shifts, dtype=float)
+    # a crossing at x gives a tile near 3x + offset, at most 2 away
+    # (the cell indices round down), and tiles are less than 2 wide
+    offset = (shifts - 0.5) @ NORMALS
+    region = ((window[0] - offset[0] - 4) / 3, (window[1] - offset[1] - 4) / 3,
+              (window[2] - offset[0] + 4) / 3, (window[3] - offset[1] + 4) / 3)
+    tiles = {'square': [], 'rhomb': [], 'hexagon': []}
+    for triple in TRIPLES:
+        # the third line of a triple always goes through the crossing of the
+        # first two
+        points, ks = _crossings(triple[0], triple[1], region, shifts)
+        third = np.round(points @ NORMALS[triple[2]] + shifts[triple[2]])
+        n1, n2, n3 = NORMALS[list(triple)]
+        corners = np.array([n1, -n3, n2, -n1, n3, -n2])
+        tiles['hexagon'].append(_dual(points, list(triple), np.column_stack([ks, third]), shifts, corners))
+    for i in TRIPLES[0]:
+        for j in TRIPLES[1]:
+            points, ks = _crossings(i, j, region, shifts)
+            ni, nj = NORMALS[i], NORMALS[j]
+            if ni[0] * nj[1] - ni[1] * nj[0] < 0:
+                ni, nj = nj, ni
+            corners = np.array([(0, 0), ni, ni + nj, nj])
+            kind = 'square' if abs(ni @ nj) < 1e-9 else 'rhomb'
+            tiles[kind].append(_dual(points, [i, j], ks, shifts, corners))
+    result = {}
+    for kind, groups in tiles.items():
+        vertices = np.concatenate(groups)
+        low, high = vertices.min(axis=1), vertices.max(axis=1)
+        meets = ((low[:, 0] <= window[2]) & (high[:, 0] >= window[0])
+                 & (low[:, 1] <= window[3]) & (high[:, 1] >= window[1]))
+        result[kind] = vertices[meets]
+    return result
+
+
+def generate(window, edge=EDGE, shifts=SHIFTS):
+    """
+    Vertices of the tiles with edge `edge` whose bounding box meets window
+    (in the same units as edge), ready for shapely.Polygon
+    """
+    scaled = tuple(np.asarray(window) / edge)
+    return [vertices for group in query_window(scaled, shifts).values() for vertices in group * edge]
+
+
+if __name__ == '__main__':
+    import sys
+    from pathlib import Path
+    from shapely.geometry import Polygon
+
+    script_dir = Path(__file__).parent.resolve()
+    sys.path.insert(0, str(script_dir.parent))
+    from polygon_utils import simple_svg_save
+
+    edge = float(sys.argv[1]) if len(sys.argv) > 1 else EDGE
+    # the page of tramo_5_socolar.svg (simple_svg_save flips y)
+    polygons = [Polygon(tile) for tile in generate((0, -2326, 1672, 0), edge)]
+    filename = script_dir / 'socolar' / 'socolar_tiles.svg'
+    simple_svg_save(polygons, str(filename), size=('1672mm', '2326mm'), label=False)
+    print(f"{filename.name}: {len(polygons)} tiles")
@@ -0,0 +1,80 @@
+"""
+Checks the window queries of Deflation.py against deflateGeneral.
+
+    python -m pytest tramo5/test_deflation_window.py
+"""
+import os
+import sys
+
+import numpy
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import Deflation
+from Deflation import arrayTiles, deflateGeneral, deflateWindow, generate_window, queryWindow
+
+# (tiles, generations) of every tiling type whose window queries are allowed
+BOUNDED = {
+    'P1': (Deflation.pent1, 5),
+    'P2': (Deflation.sun, 5),
+    'A5': (Deflation.starA5, 4),
+    'square': (Deflation.square, 5),
+    'triangle': (Deflation.triangle, 5),
+    'sierpinskiTriangle': (Deflation.sierpinskiTriangle, 5),
+    'chair': (Deflation.chair, 4),
+}
+# windows as (x, y, width, height) fractions of the patch's bounding box,
+# away from the origin and the axes of the seeds
+WINDOWS = [(0.13, 0.61, 0.3, 0.12), (0.58, 0.22, 0.15, 0.27), (0.27, 0.33, 0.18, 0.14),
+           (0.37, 0.08, 0.05, 0.41)]
+
+
+def _bounds(vertices):
+    vertices = numpy.asarray(vertices, dtype=float)
+    return vertices.min(axis=0), vertices.max(axis=0)
+
+
+def _window(tiles, fractions):
+    low, high = _bounds([v for tile in tiles for v in tile[1:]])
+    x, y, width, height = fractions
+    size = high - low
+    return (low[0] + x * size[0], low[1] + y * size[1],
+            low[0] + (x + width) * size[0], low[1] + (y + height) * size[1])
+
+
+def _meets(tile, window):
+    low, high = _bounds(tile[1:])
+    return low[0] <= window[2] and high[0] >= window[0] and low[1] <= window[3] and high[1] >= window[1]
+
+
+def _key(tiles):
+    # tiles in order, as type and rounded vertices
+    return [(tile[0],) + tuple(numpy.round(numpy.asarray(tile[1:], dtype=float), 9).ravel()) for tile in tiles]
+
+
+@pytest.mark.parametrize('fractions', WINDOWS)
+@pytest.mark.parametrize('tiling', sorted(BOUNDED))
+def test_window_queries_match_deflate_general(tiling, fractions):
+    tiles, n = BOUNDED[tiling]
+    full = deflateGeneral(tiles, n)
+    window = _window(full, fractions)
+    expected = _key([tile for tile in full if _meets(tile, window)])
+    assert expected
+    assert _key(deflateWindow(tiles, n, window)) == expected
+    query = queryWindow(tiles, n, window)
+    ranks = numpy.cumsum([0] + [len(v) for v in query.values()])
+    generation = {kind: (vertices, numpy.arange(ranks[k], ranks[k + 1]))
+                  for k, (kind, vertices) in enumerate(query.items())}
+    assert sorted(_key(arrayTiles(generation))) == sorted(expected)
+
+
+@pytest.mark.parametrize('tiles', [Deflation.starP3, Deflation.fat, Deflation.thin, Deflation.hexagon])
+def test_window_queries_refuse_unbounded_tiles(tiles):
+    window = (0.2, 0.3, 0.6, 0.5)
+    with pytest.raises(ValueError):
+        deflateWindow(tiles, 3, window)
+    with pytest.raises(ValueError):
+        queryWindow(tiles, 3, window)
+    with pytest.raises(ValueError):
+        generate_window(window, 'P3', 3)
@@ -23,6 +23,9 @@ from polygon_utils import (
     add_inner_tile,
     crop_and_save_tile,
 )
+from polygon_duplicates import dedupe
+from manufacturability import check_cut_list, format_report
+from toolpath import order_toolpath, format_travel_report
 
 
 # Add the current directory to the path so we can import penrose_p2
@@ -57,6 +60,10 @@ centered_frame = center_frame(polygons, frame)
 filtered_polygons = [polygon for polygon in polygons if \
      is_polygon_inside_frame(polygon, centered_frame)]
 
+# drop overlapping copies before the (expensive) inset
+keep = dedupe(filtered_polygons, 1e-6)
+filtered_polygons = [polygon for polygon, kept in zip(filtered_polygons, keep) if kept]
+
 INSET_DISTANCE = 3.2   # X ratio gives gaps of about 2Xmm solid channels
 inset_polygon_list = []
 for poly in filtered_polygons:
@@ -65,31 +72,31 @@ for poly in filtered_polygons:
 
 filtered_polygons = inset_polygon_list
 
-tile_711 = add_tile(905, 170, filtered_polygons, up_shift=centered_frame.bounds[1] + 30)
+tile_711 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=centered_frame.bounds[1] + 30)
 inner_tile_711 = add_inner_tile(tile_711)
 
-tile_712 = add_tile(905, 170, filtered_polygons, up_shift=tile_711.bounds[3] + 7)
+tile_712 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=tile_711.bounds[3] + 7)
 inner_tile_712 = add_inner_tile(tile_712)
 
-tile_713 = add_tile(905, 170, filtered_polygons, up_shift=tile_712.bounds[3] + 7)
+tile_713 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=tile_712.bounds[3] + 7)
 inner_tile_713 = add_inner_tile(tile_713)
 
-tile_714 = add_tile(905, 170, filtered_polygons, up_shift=tile_713.bounds[3] + 7)
+tile_714 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=tile_713.bounds[3] + 7)
 inner_tile_714 = add_inner_tile(tile_714)
 
-tile_715 = add_tile(905, 170, filtered_polygons, up_shift=tile_714.bounds[3] + 7)
+tile_715 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=tile_714.bounds[3] + 7)
 inner_tile_715 = add_inner_tile(tile_715)
 
-tile_716 = add_tile(905, 170, filtered_polygons, up_shift=tile_715.bounds[3] + 7)
+tile_716 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=tile_715.bounds[3] + 7)
 inner_tile_716 = add_inner_tile(tile_716)
 
-tile_717 = add_tile(905, 170, filtered_polygons, up_shift=tile_716.bounds[3] + 7)
+tile_717 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=tile_716.bounds[3] + 7)
 inner_tile_717 = add_inner_tile(tile_717)
 
-tile_718 = add_tile(905, 170, filtered_polygons, up_shift=tile_717.bounds[3] + 7)
+tile_718 = add_tile(905, 170, filtered_polygons, center_tile=True, up_shift=tile_717.bounds[3] + 7)
 inner_tile_718 = add_inner_tile(tile_718)
 
-tile_719 = add_tile(905, 204, filtered_polygons, up_shift=tile_718.bounds[3] + 7)
+tile_719 = add_tile(905, 204, filtered_polygons, center_tile=True, up_shift=tile_718.bounds[3] + 7)
 inner_tile_719 = add_inner_tile(tile_719, endtile=True)
 
 final_polygon_list = inset_polygon_list + [tile_711] + [inner_tile_711] + \
@@ -102,24 +109,36 @@ final_polygon_list = inset_polygon_list + [tile_711] + [inner_tile_711] + \
 simple_svg_save(final_polygon_list, f"{str(script_dir)}/penrose_tiles.svg", label=False)
 
 # crop tiles at the edge of a tile frame 
-crop_711 = crop_and_save_tile(filtered_polygons, tile_711, inner_tile_711, "711", save_holes=False)
-crop_712 = crop_and_save_tile(filtered_polygons, tile_712, inner_tile_712, "712", save_holes=False)
-crop_713 = crop_and_save_tile(filtered_polygons, tile_713, inner_tile_713, "713", save_holes=False)
-crop_714 = crop_and_save_tile(filtered_polygons, tile_714, inner_tile_714, "714", save_holes=False)
-crop_715 = crop_and_save_tile(filtered_polygons, tile_715, inner_tile_715, "715", save_holes=False)
-crop_716 = crop_and_save_tile(filtered_polygons, tile_716, inner_tile_716, "716", save_holes=False)
-crop_717 = crop_and_save_tile(filtered_polygons, tile_717, inner_tile_717, "717", save_holes=False)
-crop_718 = crop_and_save_tile(filtered_polygons, tile_718, inner_tile_718, "718", save_holes=False)
-crop_719 = crop_and_save_tile(filtered_polygons, tile_719, inner_tile_719, "719", save_holes=False)
+crop_711 = crop_and_save_tile(filtered_polygons, inner_tile_711, save_holes=False)
+crop_712 = crop_and_save_tile(filtered_polygons, inner_tile_712, save_holes=False)
+crop_713 = crop_and_save_tile(filtered_polygons, inner_tile_713, save_holes=False)
+crop_714 = crop_and_save_tile(filtered_polygons, inner_tile_714, save_holes=False)
+crop_715 = crop_and_save_tile(filtered_polygons, inner_tile_715, save_holes=False)
+crop_716 = crop_and_save_tile(filtered_polygons, inner_tile_716, save_holes=False)
+crop_717 = crop_and_save_tile(filtered_polygons, inner_tile_717, save_holes=False)
+crop_718 = crop_and_save_tile(filtered_polygons, inner_tile_718, save_holes=False)
+crop_719 = crop_and_save_tile(filtered_polygons, inner_tile_719, save_holes=False)
 
 final_export_list = crop_711 + crop_712 + crop_713 + crop_714 + \
-    crop_715 + crop_716 + crop_717 + crop_718 + crop_719
+    crop_715 + crop_716 + crop_717 + crop_718 + crop_719 + \
+    [tile_711] + [tile_712] + [tile_713] + [tile_714] + [tile_715] + \
+        [tile_716] + [tile_717] + [tile_718] + [tile_719]
 
 # remove holes that are too small
 final_export_list = [
     p for p in final_export_list 
     if hasattr(p, 'area') and p.area >= 21
 ]
+
+# report slivers and webs too narrow for the laser (only reported: check
+# the pieces before dropping them with remove_offenders)
+cut_report = check_cut_list(final_export_list)
+print(format_report(cut_report))
+
+# order the cuts into a short laser tour, holes before the risers
+final_export_list, travel_report = order_toolpath(final_export_list)
+print(format_travel_report(travel_report))
+
 simple_svg_save(final_export_list, f"{str(script_dir)}/penrose_tiles_cropped.svg", label=False)
 
 # Example: Filter polygons within a bounding box
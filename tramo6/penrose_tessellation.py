@@ -5,7 +5,12 @@ script by [tangentstorm](http://tangentstorm.com/)
 """
 import math
 import argparse
+import hashlib
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
 
+import numpy as np
 from shapely.geometry import Polygon
 
 PHI = (1 + math.sqrt(5)) / 2
@@ -257,6 +262,279 @@ def iterate(initial_tiles, iters):
     return tiles
 
 
+# Descendants of a tile stay within this many of its diameters of its
+# bounding box (at most 0.42 measured over 8 generations)
+WINDOW_MARGIN = 0.5
+
+
+def reaches_window(tile, window, margin=WINDOW_MARGIN):
+    """
+    True when the tile, or any of its descendants, may reach
+    window = (minx, miny, maxx, maxy)
+    """
+    points = list(tile.points())
+    xs = [p.x for p in points]
+    ys = [p.y for p in points]
+    pad = margin * math.hypot(max(xs) - min(xs), max(ys) - min(ys))
+    return (min(xs) - pad <= window[2] and max(xs) + pad >= window[0]
+            and min(ys) - pad <= window[3] and max(ys) + pad >= window[1])
+
+
+def iterate_window(initial_tiles, iters, window):
+    """
+    Same as `iterate()`, restricted to the tiles whose bounding box meets
+    the window: tiles that cannot reach it are dropped at every level, so
+    the cost follows the tiles in the window rather than the whole patch.
+    """
+    tiles = set(tile for tile in initial_tiles if reaches_window(tile, window))
+    for i in range(iters):
+        margin = WINDOW_MARGIN if i < iters - 1 else 0
+        tiles = set(tile for tile in inflate(tiles) if reaches_window(tile, window, margin))
+    return tiles
+
+
+# Vectorized window query: a generation as arrays of kind (0 kite, 1 dart),
+# location, heading and scale, inflated with the rules of Tile.inflate
+SHAPES = [KITE, DART]
+# children of each kind: (child kind, parent vertex, angle of that vertex
+# (None for the heading) and turn)
+INFLATION = [
+    [(1, 0, None, -36), (1, 0, None, 36), (0, 1, 1, 36), (0, 3, 3, -36)],
+    [(0, 0, None, 0), (1, 1, 1, 72), (1, 3, 3, -108)],
+]
+
+
+def tile_vertices(kind, location, heading, scale):
+    """(k, 4, 2) vertices of the tiles, as Tile.points() without the closing point"""
+    angles = np.array([[a for a, _ in shape] for shape in SHAPES], dtype=float)
+    distances = np.array([[d for _, d in shape] for shape in SHAPES], dtype=float)
+    location = np.asarray(location, dtype=float).reshape(-1, 2)
+    heading = np.asarray(heading, dtype=float)
+    scale = np.asarray(scale, dtype=float)
+    if len(heading) and np.all(heading == np.round(heading)):
+        return KERNELS[kernel_backend](kind, location, heading, scale, angles, distances, COS, SIN)
+    return _vertices_numpy(kind, location, heading, scale, angles, distances, None, None)
+
+
+# Vertex kernels, with bit-identical results: 'numba' (when Numba is
+# installed) compiles the loops below, which fill the output array point by
+# point; 'numpy' works on whole columns. Headings are whole degrees (the
+# rules only turn by multiples of 36), so both read cos and sin from the
+# same tables. TESCALERA_KERNELS or set_kernel_backend() choose.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+COS = np.cos(np.radians(np.arange(360.0)))
+SIN = np.sin(np.radians(np.arange(360.0)))
+
+
+def _vertices_numpy(kind, location, heading, scale, angles, distances, cos, sin):
+    vertices = np.empty((len(kind), 4, 2))
+    point = location
+    vertices[:, 0] = point
+    for n in range(3):
+        heading = (heading + (180 - angles[kind, n])) % 360
+        if cos is None:
+            radians = np.radians(heading)
+            dx, dy = np.cos(radians), np.sin(radians)
+        else:
+            dx, dy = cos[heading.astype(np.int64)], sin[heading.astype(np.int64)]
+        step = distances[kind, n] * scale
+        point = np.stack([point[:, 0] + step * dx, point[:, 1] + step * dy], axis=1)
+        vertices[:, n + 1] = point
+    return vertices
+
+
+def _vertices_loops(kind, location, heading, scale, angles, distances, cos, sin):
+    vertices = np.empty((len(kind), 4, 2))
+    for k in range(len(kind)):
+        x, y, h = location[k, 0], location[k, 1], heading[k]
+        vertices[k, 0, 0], vertices[k, 0, 1] = x, y
+        for n in range(3):
+            h = (h + (180 - angles[kind[k], n])) % 360
+            step = distances[kind[k], n] * scale[k]
+            x = x + step * cos[int(h)]
+            y = y + step * sin[int(h)]
+            vertices[k, n + 1, 0], vertices[k, n + 1, 1] = x, y
+    return vertices
+
+
+KERNELS = {'numpy': _vertices_numpy}
+if numba is not None:
+    KERNELS['numba'] = numba.njit(cache=True)(_vertices_loops)
+
+kernel_backend = os.environ.get('TESCALERA_KERNELS', 'numba')
+if kernel_backend not in KERNELS:
+    kernel_backend = 'numpy'
+
+
+def set_kernel_backend(name):
+    """'numpy' or 'numba' (see KERNELS)"""
+    global kernel_backend
+    if name not in KERNELS:
+        raise ValueError("kernel backend %r is not available (%s)" % (name, ', '.join(KERNELS)))
+    kernel_backend = name
+
+
+def _inflate_arrays(kind, location, heading, scale):
+    # children of every tile, by kind of parent and rule
+    vertices = tile_vertices(kind, location, heading, scale)
+    children = []
+    for parent in range(2):
+        rows = np.flatnonzero(kind == parent)
+        for child, vertex, corner, turn in INFLATION[parent]:
+            base = heading[rows]
+            if corner is not None:
+                base = base + sum(angle for angle, _ in SHAPES[parent][:corner])
+            children.append((np.full(len(rows), child), vertices[rows, vertex],
+                             (base + turn) % 360, scale[rows] / PHI))
+    return tuple(np.concatenate(column) for column in zip(*children))
+
+
+def _unique_tiles(kind, location, heading, scale):
+    # the same tile comes from two parents: keep one (as the set in inflate())
+    key = np.column_stack([kind, np.round(location / 1e-6), np.round(heading, 6)])
+    _, first = np.unique(key, axis=0, return_index=True)
+    first.sort()
+    return kind[first], location[first], heading[first], scale[first]
+
+
+def _reaching(kind, location, heading, scale, window, margin):
+    # vectorized reaches_window
+    vertices = tile_vertices(kind, location, heading, scale)
+    low, high = vertices.min(axis=1), vertices.max(axis=1)
+    pad = margin * np.hypot(*(high - low).T)
+    keep = ((low[:, 0] - pad <= window[2]) & (high[:, 0] + pad >= window[0])
+            & (low[:, 1] - pad <= window[3]) & (high[:, 1] + pad >= window[1]))
+    return kind[keep], location[keep], heading[keep], scale[keep]
+
+
+def query_window(initial_tiles, iters, window):
+    """
+    Same tiles as `iterate_window()`, computed on arrays, one generation at
+    a time. Returns a dict of arrays: kind (0 kite, 1 dart), location,
+    heading, scale and the (k, 4, 2) vertices of every tile.
+    """
+    arrays = _reaching(*_tile_arrays(initial_tiles), window, WINDOW_MARGIN)
+    for i in range(iters):
+        margin = WINDOW_MARGIN if i < iters - 1 else 0
+        arrays = _reaching(*_inflate_step(arrays), window, margin)
+    return _with_vertices(arrays)
+
+
+def _tile_arrays(tiles):
+    # kind, location, heading and scale arrays of Tile objects (sorted, so
+    # that a set of tiles always gives the same arrays)
+    tiles = sorted(tiles, key=lambda tile: (SHAPES.index(tile.shape), tile.location.x,
+                                            tile.location.y, tile.heading, tile.scale))
+    kind = np.array([SHAPES.index(tile.shape) for tile in tiles], dtype=np.int64)
+    location = np.array([(tile.location.x, tile.location.y) for tile in tiles], dtype=float).reshape(-1, 2)
+    heading = np.array([tile.heading for tile in tiles], dtype=float)
+    scale = np.array([tile.scale for tile in tiles], dtype=float)
+    return kind, location, heading, scale
+
+
+def _inflate_step(arrays):
+    return _unique_tiles(*_inflate_arrays(*arrays))
+
+
+def _with_vertices(arrays):
+    kind, location, heading, scale = arrays
+    return {'kind': kind, 'location': location, 'heading': heading, 'scale': scale,
+            'vertices': tile_vertices(kind, location, heading, scale)}
+
+
+# Checkpointed generations: every generation inflated so far is kept as
+# arrays, so going from iters to iters + 1 costs one inflation and going back
+# costs nothing. With a checkpoint directory (TESCALERA_CHECKPOINTS, or the
+# directory argument) they are also saved as .npz files for later runs.
+CHECKPOINT_DIRECTORY = os.environ.get('TESCALERA_CHECKPOINTS')
+CHECKPOINT_ARRAYS = ('kind', 'location', 'heading', 'scale')
+_checkpoints = {}
+
+
+def iterate_checkpointed(initial_tiles, iters, directory=CHECKPOINT_DIRECTORY):
+    """
+    Same tiles as `iterate()` (without the near-duplicates its set can
+    keep), as the arrays of `query_window()`, from the checkpoints.
+    """
+    first = _tile_arrays(initial_tiles)
+    key = hashlib.sha1(b''.join(np.ascontiguousarray(a).tobytes() for a in first)).hexdigest()[:16]
+    generations = _checkpoints.setdefault(key, [first])
+    while len(generations) <= iters:
+        k = len(generations)
+        path = directory and os.path.join(directory, 'penrose_%s_%d.npz' % (key, k))
+        if path and os.path.exists(path):
+            with np.load(path) as saved:
+                generation = tuple(saved[name] for name in CHECKPOINT_ARRAYS)
+        else:
+            generation = _inflate_step(generations[-1])
+            if path:
+                os.makedirs(directory, exist_ok=True)
+                np.savez(path, **dict(zip(CHECKPOINT_ARRAYS, generation)))
+        generations.append(generation)
+    return _with_vertices(generations[iters])
+
+
+# Parallel inflation: after the first generations the tiles are split
+# between worker processes, which inflate their share and return the arrays
+# in shared memory. A tile met by two shares is the same tile in both (the
+# duplicate filter compares whole tiles), with the same descendants, so one
+# last filter over all the shares drops the copies.
+def iterate_parallel(initial_tiles, iters, workers=None, serial_iters=None):
+    """
+    Same tiles as `iterate_checkpointed()`, as the arrays of
+    `query_window()`, inflated by `workers` processes.
+    """
+    workers = workers or os.cpu_count()
+    arrays = _tile_arrays(initial_tiles)
+    k = 0
+    # inflate serially until every worker gets a few tiles
+    while k < iters and (k < serial_iters if serial_iters is not None else len(arrays[0]) < 8 * workers):
+        arrays = _inflate_step(arrays)
+        k += 1
+    if k == iters or workers == 1:
+        for i in range(k, iters):
+            arrays = _inflate_step(arrays)
+        return _with_vertices(arrays)
+
+    shares = [tuple(a[rows] for a in arrays)
+              for rows in np.array_split(np.arange(len(arrays[0])), workers) if len(rows)]
+    resource_tracker.ensure_running()
+    with multiprocessing.Pool(len(shares)) as pool:
+        results = pool.map(_inflate_share, [(share, iters - k) for share in shares])
+    arrays = tuple(np.concatenate(column) for column in
+                   zip(*[[_from_shared_memory(spec) for spec in result] for result in results]))
+    return _with_vertices(_unique_tiles(*arrays))
+
+
+def _inflate_share(job):
+    arrays, steps = job
+    for i in range(steps):
+        arrays = _inflate_step(arrays)
+    return [_to_shared_memory(a) for a in arrays]
+
+
+def _to_shared_memory(array):
+    # new shared memory block holding the array, as (name, shape, dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    block.close()
+    return block.name, array.shape, array.dtype.str
+
+
+def _from_shared_memory(spec):
+    # copy of the array in a block from _to_shared_memory, which is freed
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype, buffer=block.buf).copy()
+    block.close()
+    block.unlink()
+    return array
+
+
 def build_svg(tiles):
     buf = []
     w = buf.append
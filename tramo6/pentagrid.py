@@ -0,0 +1,251 @@
+"""
+Penrose tilings from de Bruijn's pentagrid, computed inside a window.
+
+    python pentagrid.py [P2|P3] [scale]   # writes pentagrid_tiles.svg
+
+Five families of parallel lines, one every 72 degrees, each family j
+shifted by SHIFTS[j] (the shifts add up to zero). Every point where two
+grid lines cross becomes a rhomb whose edges are perpendicular to those
+lines: a thick rhomb when the lines meet at 72 degrees, a thin one at 144
+(the P3 tiling, edge 1). The vertices are whole-number combinations of
+the five directions, the cell indices of the grid around the crossing.
+
+A window only computes the crossings whose tiles can reach it: no
+inflation, no deduplication, and the same shifts always give the same
+tiling, so risers (or chunks of a wall) can be computed independently.
+
+Kites and darts (P2, edges 1 and PHI) come from the same rhombs, cut
+along their diagonals into triangles and paired up again: every kite
+holds one thin rhomb and a half of each of the two thick rhombs beside
+it, and the remaining halves of thick rhombs pair up into darts. Which
+half of a thick rhomb goes where is read from the rhomb across one of its
+edges, found by walking along the grid line to the next crossing. The
+result has the seven vertex stars of a Penrose kite and dart tiling.
+"""
+import math
+
+import numpy as np
+
+PHI = (1 + math.sqrt(5)) / 2
+
+NORMALS = np.stack([np.cos(2 * np.pi * np.arange(5) / 5), np.sin(2 * np.pi * np.arange(5) / 5)], axis=1)
+# shifts of the five families (adding up to zero), any generic values give
+# a Penrose tiling
+SHIFTS = (0.1, 0.23, -0.17, 0.31, -0.47)
+# edge of the tiles in tramo6 (the short edge of the kites and darts of
+# penrose_tessellation.iterate(SUN, 7))
+SCALE = 600 / PHI ** 7
+
+
+# Crossings
+def _lines(family, region, shifts):
+    # indices k of the lines x . normal + shift = k that cross region
+    corners = np.array([[region[0], region[1]], [region[2], region[1]],
+                        [region[0], region[3]], [region[2], region[3]]])
+    values = corners @ NORMALS[family] + shifts[family]
+    return np.arange(np.ceil(values.min()), np.floor(values.max()) + 1)
+
+
+def _crossings(region, shifts):
+    # every crossing of two grid lines inside region, as (points, families
+    # (r, s) with r < s, cells): cells are the indices of the grid cells
+    # around the point, with the lines through it counted from their lower
+    # side, so the rhomb's corners are cells + 0, u_r, u_r + u_s and u_s
+    points, families, cells = [], [], []
+    for r in range(5):
+        for s in range(r + 1, 5):
+            kr, ks = np.meshgrid(_lines(r, region, shifts), _lines(s, region, shifts), indexing='ij')
+            ks = np.stack([kr.ravel(), ks.ravel()], axis=1)
+            p = np.linalg.solve(NORMALS[[r, s]], (ks - (shifts[r], shifts[s])).T).T
+            inside = ((p[:, 0] >= region[0]) & (p[:, 0] <= region[2])
+                      & (p[:, 1] >= region[1]) & (p[:, 1] <= region[3]))
+            c = np.floor(p[inside] @ NORMALS.T + shifts).astype(np.int64)
+            c[:, [r, s]] = ks[inside] - 1
+            points.append(p[inside])
+            families.append(np.tile((r, s), (inside.sum(), 1)))
+            cells.append(c)
+    return np.concatenate(points), np.concatenate(families), np.concatenate(cells)
+
+
+def _corners(families, cells):
+    # (k, 4, 5) cell indices of the rhombs' corners, in grid order
+    n = len(cells)
+    unit_r = np.zeros((n, 5), dtype=np.int64)
+    unit_s = np.zeros((n, 5), dtype=np.int64)
+    unit_r[np.arange(n), families[:, 0]] = 1
+    unit_s[np.arange(n), families[:, 1]] = 1
+    return np.stack([cells, cells + unit_r, cells + unit_r + unit_s, cells + unit_s], axis=1)
+
+
+def _region(window, shifts, margin):
+    # grid region whose crossings give every tile reaching window: a
+    # crossing at x gives a tile near 5/2 x, at most 1.7 away (the cell
+    # indices round down), and the tiles are less than margin wide
+    offset = -0.5 * NORMALS.sum(axis=0) + np.asarray(shifts) @ NORMALS
+    pad = 1.7 + margin
+    return ((window[0] - offset[0] - pad) / 2.5, (window[1] - offset[1] - pad) / 2.5,
+            (window[2] - offset[0] + pad) / 2.5, (window[3] - offset[1] + pad) / 2.5)
+
+
+def _meets(vertices, window):
+    low, high = vertices.min(axis=1), vertices.max(axis=1)
+    return ((low[:, 0] <= window[2]) & (high[:, 0] >= window[0])
+            & (low[:, 1] <= window[3]) & (high[:, 1] >= window[1]))
+
+
+def _counterclockwise(vertices):
+    # the rhombs of families with s - r = 3 or 4 come out clockwise
+    x, y = vertices[:, :, 0], vertices[:, :, 1]
+    area = (x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)
+    vertices[area < 0] = vertices[area < 0, ::-1]
+    return vertices
+
+
+# P3
+def query_window(window, shifts=SHIFTS):
+    """
+    Rhombs (edge 1) whose bounding box meets window = (minx, miny, maxx,
+    maxy), as {'thick': (k, 4, 2), 'thin': (k, 4, 2)}, counterclockwise.
+    """
+    shifts = np.asarray(shifts, dtype=float)
+    _, families, cells = _crossings(_region(window, shifts, 2), shifts)
+    vertices = _corners(families, cells) @ NORMALS
+    thick = np.isin(families[:, 1] - families[:, 0], (1, 4))
+    return {kind: _counterclockwise(vertices[select & _meets(vertices, window)])
+            for kind, select in (('thick', thick), ('thin', ~thick))}
+
+
+# P2
+def _neighbour(points, families, cells, line, side, shifts):
+    """
+    Rhombs across one edge of each crossing: the next crossing along the
+    grid line of family line[k] through points[k], on the side of the
+    other line where its index is cells + side (0 below, 1 above).
+    Returns their (families, cells) as in _crossings.
+    """
+    n = len(points)
+    rows = np.arange(n)
+    other = np.where(families[:, 0] == line, families[:, 1], families[:, 0])
+    # direction along the line, towards the side of the other line
+    along = NORMALS[line] @ np.array([[0, 1], [-1, 0]])
+    towards = np.where(side == 1, 1.0, -1.0) * np.sign((along * NORMALS[other]).sum(axis=1))
+    along = along * towards[:, None]
+    values = points @ NORMALS.T + shifts
+    rates = along @ NORMALS.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        steps = np.where(rates > 0, (np.ceil(values) - values) / rates, (np.floor(values) - values) / rates)
+    steps[rows, line] = np.inf
+    steps[rows, other] = 1 / np.abs(rates[rows, other])
+    crossing = np.argmin(steps, axis=1)
+    point = points + steps[rows, crossing][:, None] * along
+    next_cells = np.floor(point @ NORMALS.T + shifts).astype(np.int64)
+    # the two lines through the next crossing, counted from their lower side
+    next_cells[rows, line] = cells[rows, line]
+    next_line = np.where(rates[rows, crossing] > 0, np.ceil(values[rows, crossing]),
+                         np.floor(values[rows, crossing])).astype(np.int64)
+    next_line = np.where(crossing == other, cells[rows, other] + 1 + np.where(side == 1, 1, -1), next_line)
+    next_cells[rows, crossing] = next_line - 1
+    return np.sort(np.stack([line, crossing], axis=1), axis=1), next_cells
+
+
+def _canonical(indices):
+    # a point has one whole-number combination of the directions per sum
+    # (they add up to zero): keep the one with sum -4 to 0, as the corners
+    # have, so a vertex shared by two tiles gets the same coordinates
+    return indices - (indices.sum(axis=-1, keepdims=True) + 4) // 5
+
+
+def kites_and_darts(window, shifts=SHIFTS):
+    """
+    Kites and darts (edges 1 and PHI) whose bounding box meets window, as
+    {'kite': (k, 4, 2), 'dart': (k, 4, 2)}, counterclockwise.
+    """
+    shifts = np.asarray(shifts, dtype=float)
+    points, families, cells = _crossings(_region(window, shifts, 2 * PHI), shifts)
+    corners = _corners(families, cells)
+    thick = np.isin(families[:, 1] - families[:, 0], (1, 4))
+    # corners 0 and 2 are the acute corners of a thick rhomb and the obtuse
+    # ones of a thin rhomb, with index sums I and I + 2 (I is -4 or -3);
+    # `middle` is the one with index -3 or -2 (de Bruijn's vertex classes
+    # 2 and 3), which tells the two apart in the kites and darts
+    middle = np.where(cells.sum(axis=1) == -4, 2, 0)
+    rows = np.arange(len(cells))
+    # the tiles are built on the corners' cell indices and only turned into
+    # points at the end: the shared edges of neighbouring tiles then match
+    # exactly, which shapely needs to union or intersect them
+
+    # one kite per thin rhomb: its corner `middle` is where the two halves
+    # of thick rhombs meet, the other obtuse corner is the tail; the head
+    # is one edge beyond the joint, along the short diagonal, i.e. along
+    # the direction t halfway between r and s (PHI (u_r + u_s) = u_t)
+    thin = ~thick
+    joint, tail = corners[rows, middle][thin], corners[rows, 2 - middle][thin]
+    r, s = families[thin, 0], families[thin, 1]
+    t = np.where((s - r) % 2 == 0, (r + s) // 2, (r + s + 5) // 2) % 5
+    head = joint.copy()
+    head[np.arange(len(t)), t] += np.where(middle[thin] == 2, 1, -1)
+    kites = np.stack([_canonical(head), corners[thin, 1], tail, corners[thin, 3]], axis=1)
+
+    # every thick rhomb has two halves (obtuse corner and the two acute
+    # ones): a half whose edge from the obtuse corner to the corner
+    # `middle` is shared with a thin rhomb belongs to that rhomb's kite,
+    # the others make darts
+    halves = []
+    select = rows[thick]
+    near = middle[select]
+    for obtuse in (1, 3):
+        # the edge follows the grid line that separates its two corners, on
+        # the side of the other line given by the obtuse corner
+        r, s = families[select, 0], families[select, 1]
+        line = np.where((obtuse == 1) == (near == 0), r, s)
+        other = np.where(line == r, s, r)
+        side = corners[select, obtuse, other] - cells[select, other]
+        next_families, _ = _neighbour(points[select], families[select], cells[select], line, side, shifts)
+        dart = np.isin(next_families[:, 1] - next_families[:, 0], (1, 4))
+        halves.append((corners[select[dart], near[dart]], corners[select[dart], obtuse],
+                       corners[select[dart], 2 - near[dart]]))
+    nose, obtuse, far = (np.concatenate(parts) for parts in zip(*halves))
+    # the dart's nose is the corner `middle`; its two halves are mirror
+    # images, build it from the one with the far corner on the right of the
+    # axis nose -> obtuse corner
+    axis = (obtuse - nose) @ NORMALS
+    arm = (far - nose) @ NORMALS
+    right = axis[:, 0] * arm[:, 1] - axis[:, 1] * arm[:, 0] < 0
+    nose, obtuse, far = nose[right], obtuse[right], far[right]
+    # the axis is an edge, along some direction a: mirroring in it swaps
+    # the directions a + i and a - i
+    a = np.argmax(np.abs(obtuse - nose), axis=1)
+    mirror = (2 * a[:, None] - np.arange(5)) % 5
+    mirrored = _canonical(nose + np.take_along_axis(far - nose, mirror, axis=1))
+    darts = np.stack([nose, far, obtuse, mirrored], axis=1)
+    return {kind: _counterclockwise(vertices[_meets(vertices, window)])
+            for kind, vertices in (('kite', kites @ NORMALS), ('dart', darts @ NORMALS))}
+
+
+def generate(window, scale=SCALE, tiling='P2', shifts=SHIFTS):
+    """
+    Vertices of the tiles (P2 kites and darts, or P3 rhombs) of edge scale
+    whose bounding box meets window (in the units of scale), ready for
+    shapely.Polygon
+    """
+    query = kites_and_darts if tiling == 'P2' else query_window
+    tiles = query(tuple(np.asarray(window) / scale), shifts)
+    return [vertices for group in tiles.values() for vertices in group * scale]
+
+
+if __name__ == '__main__':
+    import sys
+    from pathlib import Path
+    from shapely.geometry import Polygon
+
+    script_dir = Path(__file__).parent.resolve()
+    sys.path.insert(0, str(script_dir.parent))
+    from polygon_utils import simple_svg_save
+
+    tiling = sys.argv[1] if len(sys.argv) > 1 else 'P2'
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else SCALE
+    # the frame of generate_stair_tiles.py (simple_svg_save flips y)
+    polygons = [Polygon(tile) for tile in generate((0, -1800, 1000, 0), scale, tiling)]
+    filename = script_dir / 'pentagrid_tiles.svg'
+    simple_svg_save(polygons, str(filename), size=('1000mm', '1800mm'), label=False)
+    print(f"{filename.name}: {len(polygons)} tiles")
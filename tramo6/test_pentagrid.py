@@ -0,0 +1,47 @@
+"""
+Checks that the pentagrid tilings tile the window: no overlaps, no holes.
+
+    python -m pytest tramo6/test_pentagrid.py
+"""
+import os
+import sys
+
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+from shapely.strtree import STRtree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pentagrid import SCALE, SHIFTS, generate
+
+OTHER_SHIFTS = (0.43, -0.21, 0.05, -0.38, 0.11)
+WINDOWS = [
+    # (window, scale): the frame of generate_stair_tiles.py, and a few
+    # small ones around and away from the origin
+    ((0, -1800, 1000, 0), SCALE),
+    ((0, 0, 200, 100), 10),
+    ((0, 0, 20, 10), 1),
+    ((-37.5, 12.25, -21, 30), 1),
+    ((150, -80, 340, 95), 7.5),
+]
+
+
+@pytest.mark.parametrize('tiling', ['P2', 'P3'])
+@pytest.mark.parametrize('shifts', [SHIFTS, OTHER_SHIFTS])
+@pytest.mark.parametrize('window, scale', WINDOWS)
+def test_tiles_cover_window_without_overlaps(window, scale, shifts, tiling):
+    polygons = [Polygon(tile) for tile in generate(window, scale, tiling, shifts)]
+    assert all(polygon.is_valid for polygon in polygons)
+    tile_area = scale ** 2
+
+    # tile areas add up to the area of their union
+    union = shapely.union_all(polygons)
+    assert sum(polygon.area for polygon in polygons) == pytest.approx(union.area, abs=1e-6 * tile_area)
+    tree = STRtree(polygons)
+    pairs = tree.query(polygons, predicate='intersects').T
+    overlap = sum(polygons[i].intersection(polygons[j]).area for i, j in pairs if i < j)
+    assert overlap < 1e-6 * tile_area
+
+    # and cover the window
+    assert box(*window).difference(union).area < 1e-6 * tile_area
@@ -2,6 +2,7 @@
 import math
 import time
 
+import shapely
 from shapely.geometry import Polygon, MultiPolygon, MultiPoint, Point
 from shapely import affinity, polygons
 from shapely import polygons as shp_polys
@@ -23,229 +24,22 @@ from polygon_utils import (
     simple_svg_save,
 )
 
+from stamping import stamp_template, stamped_to_polygons
+from manufacturability import check_cut_list, format_report
+from toolpath import order_toolpath, format_travel_report
+
 from load_hole_polygons import get_hole_points
+from hat_blocks import (
+    rotate_60,
+    convert_polygons_to_world_cs,
+    make_partial_fifth_block,
+)
 
-# Build hat tiles in grid coordinates using integers
-# Rotate/translate using grid operations (integers)
-# Attach blocks by searching integer translations
-# Convert to world coordinates using the basis vectors x and y
+# Hat blocks are built in integer grid coordinates (see hat_blocks.py),
+# then converted to world coordinates using the basis vectors x and y
 # Render to SVG using Cartesian coordinates
 # The 0.4 scale factor controls the final size, and the 60° rotation aligns the output with the tile geometry.
 
-
-def add(v1,v2):
-    return (v1[0]+v2[0],v1[1]+v2[1])
-
-def sub(v1,v2):
-    return (v1[0]-v2[0],v1[1]-v2[1])
-
-def scale(k,v):
-    return (v[0]*k,v[1]*k)
-
-def rotate_60(v):
-    sin=math.sin(math.pi/3)
-    cos=math.cos(math.pi/3)
-    return (v[0]*cos+v[1]*sin,v[1]*cos-v[0]*sin)
-
-def flip_polygon_in_grid(polygon):
-    return reversed([(x+y,-y) for (x,y) in polygon])
-
-def rotate_polygon_in_grid(polygon,count):
-    for c in range(count):
-        polygon=[(-y,x+y) for (x,y) in polygon]
-    return polygon
-
-def rotate_polygons_in_grid(polygons,count):
-    return [rotate_polygon_in_grid(p,count) for p in polygons]
-
-def translate_polygon_in_grid(polygon,shift):
-    return [(x+shift[0],y+shift[1]) for (x,y) in polygon]
-
-def translate_polygons_in_grid(polygons,shift):
-    return [translate_polygon_in_grid(p,shift) for p in polygons]
-
-def convert_vertex_to_world_cs(vertex,origin,x,y):
-    return add(origin,add(scale(vertex[0],x),scale(vertex[1],y)))
-
-def convert_polygon_to_world_cs(polygon,origin,x,y):
-    return [convert_vertex_to_world_cs(v,origin,x,y) for v in polygon]
-
-def convert_polygons_to_world_cs(polygons,origin,x,y):
-    return [convert_polygon_to_world_cs(p,origin,x,y) for p in polygons]
-
-def get_contour_edge(contour,edge_index):
-    return (contour[edge_index],contour[(edge_index+1)%len(contour)])
-
-def are_nodes_equal(node1,node2):
-    return node1[0]==node2[0] and node1[1]==node2[1]
-
-def are_edges_equal(edge1,edge2):
-    return are_nodes_equal(edge1[0],edge2[0]) and are_nodes_equal(edge1[1],edge2[1])
-
-def count_common_contour_points(contour1,contour2):
-    set1=set(contour1)
-    count=0
-    for v in contour2:
-        if v in set1:
-            count+=1
-    return count
-
-def get_single_border_contour(polygons):
-    edges=set()
-    for polygon in polygons:
-        for edge_index in range(len(polygon)):
-            edge=get_contour_edge(polygon,edge_index)
-            opposite_edge=(edge[1],edge[0])
-            if opposite_edge in edges:
-                edges.remove(opposite_edge)
-            else:
-                edges.add(edge)
-    contour=[next(iter(edges))[0]]
-    while True:
-        next_edge=None
-        for e in edges:
-            if e[0]==contour[-1]:
-                next_edge=e
-                break
-        if next_edge is None:
-            return None
-        contour.append(next_edge[1])
-        edges.remove(next_edge)
-        if are_nodes_equal(contour[-1],contour[0]):
-            contour.pop()
-            break
-    if len(edges)!=0:
-        return None
-    return contour
-
-def make_hat_in_grid():
-    return [
-        (0,0),
-        (0,3),
-        (2,2),
-        (3,3),
-        (6,0),
-        (6,-3),
-        (8,-4),
-        (9,-6),
-        (6,-6),
-        (3,-3),
-        (2,-4),
-        (0,-3),
-        (-2,-2),
-        (-3,0)
-    ]
-
-def make_first_block(add_ear):
-    result=[
-        make_hat_in_grid(),
-        translate_polygon_in_grid(rotate_polygon_in_grid(flip_polygon_in_grid(make_hat_in_grid()),3),(6,-6)),
-        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),4),(0,-6)),
-        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),5),(0,-12)),
-        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),6),(6,-12)),
-        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),7),(12,-12)),
-        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),8),(12,-6)),
-    ]
-    if add_ear:
-        result.append(translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),6),(6,-18)))
-    return result
-
-def attach_block(main,new,print_translation):
-    #return main+new
-    main_contour=get_single_border_contour(main)
-    new_contour=get_single_border_contour(new)
-    for distance in range(1000):
-        for dx in range(-distance,distance+1):
-            for dy in range(-distance,distance+1):
-                if dx+dy>distance or dx+dy<-distance:
-                    continue
-                if abs(dx)!=distance and abs(dy)!=distance and abs(dx+dy)!=distance:
-                    continue
-                candidate_contour=translate_polygon_in_grid(new_contour,(dx,dy))
-                min_acceptable_common_length=len(candidate_contour)/5
-                if count_common_contour_points(main_contour,candidate_contour)<min_acceptable_common_length+1:
-                    continue
-                candidate=translate_polygons_in_grid(new,(dx,dy))
-                combined=main+candidate
-                combined_contour=get_single_border_contour(combined)
-                if combined_contour is None:
-                    continue
-                common_length=(len(main_contour)+len(candidate_contour)-len(combined_contour))/2
-                if common_length<min_acceptable_common_length:
-                    continue
-                if print_translation:
-                    print(dx,",",dy)
-                return combined
-    raise ValueError("unable to attach a contour")
-
-def make_second_block(add_ear):
-    full_first_block=make_first_block(True)
-    result=full_first_block
-    result=attach_block(result,translate_polygons_in_grid(make_first_block(False),(-6,18)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,4),(-6,0)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,5),(-6,-12)),False)
-    if add_ear:
-        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,6),(6,-24)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,7),(12,0)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,8),(12,12)),False)
-    return result
-
-def make_third_block(add_ear):
-    full_second_block=make_second_block(True)
-    result=full_second_block
-    result=attach_block(result,translate_polygons_in_grid(make_second_block(False),(-12,42)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,4),(-48,30)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,5),(-36,-24)),False)
-    if add_ear:
-        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,6),(18,-66)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,7),(42,12)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,8),(30,66)),False)
-    return result
-
-def make_fourth_block(add_ear):
-    full_third_block=make_third_block(True)
-    result=full_third_block
-    result=attach_block(result,translate_polygons_in_grid(make_third_block(False),(-30,108)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,4),(-156,108)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,5),(-114,-54)),False)
-    if add_ear:
-        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,6),(48,-174)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,7),(120,42)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,8),(78,204)),False)
-    return result
-
-def make_fifth_block(add_ear):
-    full_fourth_block=make_fourth_block(True)
-    result=full_fourth_block
-    result=attach_block(result,translate_polygons_in_grid(make_fourth_block(False),(-78,282)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,4),(-438,312)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,5),(-318,-132)),False)
-    if add_ear:
-        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,6),(126,-456)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,7),(324,120)),False)
-    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,8),(204,564)),False)
-    return result
-
-def make_partial_fifth_block(add_ear):
-    full_fourth_block=make_fourth_block(True)
-    result=full_fourth_block
-    result=attach_block(result,translate_polygons_in_grid(make_fourth_block(False),(-78,282)),False)
-    # result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,4),(-438,312)),False)
-    return result
-
-def make_sixth_block(add_ear):
-    full_fifth_block=make_fifth_block(True)
-    result=full_fifth_block
-    result=attach_block(result,translate_polygons_in_grid(make_fifth_block(False),(-204,738)),True)
-    # result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,4),(-438,312)),True)
-    #result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,5),(-318,-132)),True)
-    #if add_ear:
-    #    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,6),(126,-456)),True)
-    #result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,7),(324,120)),True)
-    #result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,8),(204,564)),True)
-    return result
-
-
 origin=[350.,350.]
 origin=[-100.,-1400.] # adhoc translation
 x=(0, 7.1) # scaling factor
@@ -310,18 +104,6 @@ orientation_dict = {
  -0.891: (300, True)}
 
 
-def mirror_holes(origin_holes):
-    # assumes origin holes are a MultiPolygon
-    # creates a mirror image of the holes
-    mirror_group = []
-    for poly in origin_holes.geoms:
-        mirror_poly = []
-        for coor in poly.exterior.coords:
-            mirror_poly.append((-coor[0], coor[1]))
-        mirror_group.append(Polygon(mirror_poly))
-    return MultiPolygon(mirror_group)
-
-
 # Create Frame to select region of interest
 frame = shp_polys([[0,0],
                   [0 + 1400, 0],
@@ -339,28 +121,29 @@ filtered_hat_polygons = [polygon for polygon in hat_polygons if \
 
 
 def assemble_hats_and_holes(hat_polygons, origin_holes):
-    final_polygon_list = []
+    # look up the configuration (rotation, mirror) of every hat
+    transforms = []
     for k, hat_poly in enumerate(hat_polygons):
         hat_orient = get_hat_orientation(hat_poly,0, 7)
-        hat_x, hat_y = hat_poly.centroid.xy
         if hat_orient not in orientation_dict:
             print(f"{k} --> {hat_orient} not in orientation_dict")
             # this polygon has no valid orientation
             # probably because the starting point is not the first point
-            final_polygon_list.append(hat_poly)
-            continue
-        transform = orientation_dict[hat_orient]
+        transforms.append(orientation_dict.get(hat_orient))
 
-        if transform[1]:
-            # it's a mirror tile
-            holes = mirror_holes(origin_holes)
-            rot_holes = affinity.rotate(holes, angle=transform[0], origin="centroid")
-        else:
-            holes = origin_holes
-            rot_holes = affinity.rotate(holes, angle=-transform[0], origin="centroid")
-        
-        tran_holes = affinity.translate(rot_holes, hat_x, hat_y)
-        final_polygon_list.append(tran_holes)
+    # stamp the holes into all the hats at once: mirror tiles get the
+    # mirrored holes rotated one way, the others are rotated the other way
+    placed = [k for k, transform in enumerate(transforms) if transform is not None]
+    angles = [transforms[k][0] if transforms[k][1] else -transforms[k][0] for k in placed]
+    mirrored = [transforms[k][1] for k in placed]
+    hat_centres = shapely.get_coordinates(shapely.centroid([hat_polygons[k] for k in placed]))
+    stamped, ring_offsets = stamp_template(origin_holes, angles, mirrored, hat_centres)
+    stamped_holes = iter(stamped_to_polygons(stamped, ring_offsets))
+
+    final_polygon_list = []
+    for hat_poly, transform in zip(hat_polygons, transforms):
+        if transform is not None:
+            final_polygon_list.append(next(stamped_holes))
         final_polygon_list.append(hat_poly)
     return final_polygon_list
 
@@ -520,7 +303,21 @@ final_export_list = [
     if hasattr(p, 'area') and p.area >= 30
 ]
 print(max(crop_hats_721, key=lambda x: x.area).area)
-print("after cleanup: ",len(final_export_list))
+
+# report slivers and webs too narrow for the laser (only reported: check
+# the pieces before dropping them with remove_offenders, protecting the
+# riser outlines)
+cut_report = check_cut_list(final_export_list)
+print(format_report(cut_report))
+# riser_outlines = [tile_721, tile_722, tile_723, tile_724, tile_725,
+#                   tile_726, tile_727, tile_728, tile_729]
+# final_export_list = remove_offenders(
+#     final_export_list, cut_report,
+#     protected=[k for k, p in enumerate(final_export_list) if any(p is t for t in riser_outlines)])
+
+# order the cuts into a short laser tour, holes before the risers
+final_export_list, travel_report = order_toolpath(final_export_list)
+print(format_travel_report(travel_report))
 
 simple_svg_save(final_export_list, f"{str(script_dir)}/final_export_list_hat_only.svg", label=False)
 
@@ -0,0 +1,389 @@
+# tiling algorithm by Maxim Shtuchka
+# Hat blocks, importable without running the tramo7 script (hat-tiling_v2.py)
+import math
+import os
+
+import numpy as np
+
+# Build hat tiles in grid coordinates using integers
+# Rotate/translate using grid operations (integers)
+# Attach blocks by searching integer translations
+# Convert to world coordinates using the basis vectors x and y
+
+
+def add(v1,v2):
+    return (v1[0]+v2[0],v1[1]+v2[1])
+
+def sub(v1,v2):
+    return (v1[0]-v2[0],v1[1]-v2[1])
+
+def scale(k,v):
+    return (v[0]*k,v[1]*k)
+
+def rotate_60(v):
+    sin=math.sin(math.pi/3)
+    cos=math.cos(math.pi/3)
+    return (v[0]*cos+v[1]*sin,v[1]*cos-v[0]*sin)
+
+def flip_polygon_in_grid(polygon):
+    return reversed([(x+y,-y) for (x,y) in polygon])
+
+def rotate_polygon_in_grid(polygon,count):
+    for c in range(count):
+        polygon=[(-y,x+y) for (x,y) in polygon]
+    return polygon
+
+def rotate_polygons_in_grid(polygons,count):
+    return [rotate_polygon_in_grid(p,count) for p in polygons]
+
+def translate_polygon_in_grid(polygon,shift):
+    return [(x+shift[0],y+shift[1]) for (x,y) in polygon]
+
+def translate_polygons_in_grid(polygons,shift):
+    return [translate_polygon_in_grid(p,shift) for p in polygons]
+
+def convert_vertex_to_world_cs(vertex,origin,x,y):
+    return add(origin,add(scale(vertex[0],x),scale(vertex[1],y)))
+
+def convert_polygon_to_world_cs(polygon,origin,x,y):
+    return [convert_vertex_to_world_cs(v,origin,x,y) for v in polygon]
+
+def convert_polygons_to_world_cs(polygons,origin,x,y):
+    return [convert_polygon_to_world_cs(p,origin,x,y) for p in polygons]
+
+def get_contour_edge(contour,edge_index):
+    return (contour[edge_index],contour[(edge_index+1)%len(contour)])
+
+def are_nodes_equal(node1,node2):
+    return node1[0]==node2[0] and node1[1]==node2[1]
+
+def are_edges_equal(edge1,edge2):
+    return are_nodes_equal(edge1[0],edge2[0]) and are_nodes_equal(edge1[1],edge2[1])
+
+def count_common_contour_points(contour1,contour2):
+    set1=set(contour1)
+    count=0
+    for v in contour2:
+        if v in set1:
+            count+=1
+    return count
+
+def get_single_border_contour(polygons):
+    edges=set()
+    for polygon in polygons:
+        for edge_index in range(len(polygon)):
+            edge=get_contour_edge(polygon,edge_index)
+            opposite_edge=(edge[1],edge[0])
+            if opposite_edge in edges:
+                edges.remove(opposite_edge)
+            else:
+                edges.add(edge)
+    contour=[next(iter(edges))[0]]
+    while True:
+        next_edge=None
+        for e in edges:
+            if e[0]==contour[-1]:
+                next_edge=e
+                break
+        if next_edge is None:
+            return None
+        contour.append(next_edge[1])
+        edges.remove(next_edge)
+        if are_nodes_equal(contour[-1],contour[0]):
+            contour.pop()
+            break
+    if len(edges)!=0:
+        return None
+    return contour
+
+def make_hat_in_grid():
+    return [
+        (0,0),
+        (0,3),
+        (2,2),
+        (3,3),
+        (6,0),
+        (6,-3),
+        (8,-4),
+        (9,-6),
+        (6,-6),
+        (3,-3),
+        (2,-4),
+        (0,-3),
+        (-2,-2),
+        (-3,0)
+    ]
+
+def make_first_block(add_ear):
+    result=[
+        make_hat_in_grid(),
+        translate_polygon_in_grid(rotate_polygon_in_grid(flip_polygon_in_grid(make_hat_in_grid()),3),(6,-6)),
+        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),4),(0,-6)),
+        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),5),(0,-12)),
+        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),6),(6,-12)),
+        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),7),(12,-12)),
+        translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),8),(12,-6)),
+    ]
+    if add_ear:
+        result.append(translate_polygon_in_grid(rotate_polygon_in_grid(make_hat_in_grid(),6),(6,-18)))
+    return result
+
+def attach_block(main,new,print_translation):
+    #return main+new
+    main_contour=get_single_border_contour(main)
+    new_contour=get_single_border_contour(new)
+    for distance in range(1000):
+        for dx in range(-distance,distance+1):
+            for dy in range(-distance,distance+1):
+                if dx+dy>distance or dx+dy<-distance:
+                    continue
+                if abs(dx)!=distance and abs(dy)!=distance and abs(dx+dy)!=distance:
+                    continue
+                candidate_contour=translate_polygon_in_grid(new_contour,(dx,dy))
+                min_acceptable_common_length=len(candidate_contour)/5
+                if count_common_contour_points(main_contour,candidate_contour)<min_acceptable_common_length+1:
+                    continue
+                candidate=translate_polygons_in_grid(new,(dx,dy))
+                combined=main+candidate
+                combined_contour=get_single_border_contour(combined)
+                if combined_contour is None:
+                    continue
+                common_length=(len(main_contour)+len(candidate_contour)-len(combined_contour))/2
+                if common_length<min_acceptable_common_length:
+                    continue
+                if print_translation:
+                    print(dx,",",dy)
+                return combined
+    raise ValueError("unable to attach a contour")
+
+def make_second_block(add_ear):
+    full_first_block=make_first_block(True)
+    result=full_first_block
+    result=attach_block(result,translate_polygons_in_grid(make_first_block(False),(-6,18)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,4),(-6,0)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,5),(-6,-12)),False)
+    if add_ear:
+        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,6),(6,-24)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,7),(12,0)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_first_block,8),(12,12)),False)
+    return result
+
+def make_third_block(add_ear):
+    full_second_block=make_second_block(True)
+    result=full_second_block
+    result=attach_block(result,translate_polygons_in_grid(make_second_block(False),(-12,42)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,4),(-48,30)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,5),(-36,-24)),False)
+    if add_ear:
+        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,6),(18,-66)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,7),(42,12)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_second_block,8),(30,66)),False)
+    return result
+
+def make_fourth_block(add_ear):
+    full_third_block=make_third_block(True)
+    result=full_third_block
+    result=attach_block(result,translate_polygons_in_grid(make_third_block(False),(-30,108)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,4),(-156,108)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,5),(-114,-54)),False)
+    if add_ear:
+        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,6),(48,-174)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,7),(120,42)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_third_block,8),(78,204)),False)
+    return result
+
+def make_fifth_block(add_ear):
+    full_fourth_block=make_fourth_block(True)
+    result=full_fourth_block
+    result=attach_block(result,translate_polygons_in_grid(make_fourth_block(False),(-78,282)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,4),(-438,312)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,5),(-318,-132)),False)
+    if add_ear:
+        result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,6),(126,-456)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,7),(324,120)),False)
+    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,8),(204,564)),False)
+    return result
+
+def make_partial_fifth_block(add_ear):
+    full_fourth_block=make_fourth_block(True)
+    result=full_fourth_block
+    result=attach_block(result,translate_polygons_in_grid(make_fourth_block(False),(-78,282)),False)
+    # result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,4),(-438,312)),False)
+    return result
+
+def make_sixth_block(add_ear):
+    full_fifth_block=make_fifth_block(True)
+    result=full_fifth_block
+    result=attach_block(result,translate_polygons_in_grid(make_fifth_block(False),(-204,738)),True)
+    # result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,4),(-438,312)),True)
+    #result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,5),(-318,-132)),True)
+    #if add_ear:
+    #    result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,6),(126,-456)),True)
+    #result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,7),(324,120)),True)
+    #result=attach_block(result,translate_polygons_in_grid(rotate_polygons_in_grid(full_fourth_block,8),(204,564)),True)
+    return result
+
+BLOCK_MAKERS = {
+    1: make_first_block,
+    2: make_second_block,
+    3: make_third_block,
+    4: make_fourth_block,
+    5: make_fifth_block,
+}
+
+def make_block(level, add_ear=True):
+    # hat block of the given level (1 to 5), as polygons in grid coordinates
+    return BLOCK_MAKERS[level](add_ear)
+
+
+# Window query: block layout of make_*_block, as (rotation count, translation)
+# of each sub-block around the full sub-block placed as is. The first entry
+# is the sub-block without ear, the fourth (rotation 6) is the ear.
+BLOCK_LAYOUT = {
+    2: [(0,(-6,18)),(4,(-6,0)),(5,(-6,-12)),(6,(6,-24)),(7,(12,0)),(8,(12,12))],
+    3: [(0,(-12,42)),(4,(-48,30)),(5,(-36,-24)),(6,(18,-66)),(7,(42,12)),(8,(30,66))],
+    4: [(0,(-30,108)),(4,(-156,108)),(5,(-114,-54)),(6,(48,-174)),(7,(120,42)),(8,(78,204))],
+    5: [(0,(-78,282)),(4,(-438,312)),(5,(-318,-132)),(6,(126,-456)),(7,(324,120)),(8,(204,564))],
+}
+EAR = 3
+
+# rotate_polygon_in_grid as a matrix acting on column vectors
+ROTATION = np.array([[0,-1],[1,1]])
+
+def _block_children(level, add_ear):
+    # (add_ear, rotation matrix, translation) of the sub-blocks, in the
+    # order attach_block adds them
+    children = [(True, np.eye(2, dtype=np.int64), np.zeros(2, dtype=np.int64))]
+    for k, (count, shift) in enumerate(BLOCK_LAYOUT[level]):
+        if k == EAR and not add_ear:
+            continue
+        children.append((k != 0, np.linalg.matrix_power(ROTATION, count % 6), np.array(shift)))
+    return children
+
+_hulls = {}
+
+def _block_hull(level, add_ear):
+    # convex hull vertices (grid coordinates) of a block: the bounding box of
+    # any affine image of the block is the bounding box of the image of these
+    key = (level, add_ear)
+    if key not in _hulls:
+        if level == 1:
+            points = np.array([v for polygon in make_first_block(add_ear) for v in polygon])
+        else:
+            points = np.concatenate([_block_hull(level - 1, ear) @ matrix.T + shift
+                                     for ear, matrix, shift in _block_children(level, add_ear)])
+        _hulls[key] = _convex_hull(points)
+    return _hulls[key]
+
+def _convex_hull(points):
+    # monotone chain
+    points = sorted(set(map(tuple, points.tolist())))
+    def half(points):
+        chain = []
+        for p in points:
+            while len(chain) >= 2 and (chain[-1][0]-chain[-2][0])*(p[1]-chain[-2][1]) - (chain[-1][1]-chain[-2][1])*(p[0]-chain[-2][0]) <= 0:
+                chain.pop()
+            chain.append(p)
+        return chain[:-1]
+    return np.array(half(points) + half(points[::-1]))
+
+def _world_bounds(points, world):
+    # (k, 4) bounds in world coordinates of (k, n, 2) grid points
+    xy = points @ world[:2] + world[2]
+    return np.concatenate([xy.min(axis=1), xy.max(axis=1)], axis=1)
+
+def query_window(level, window, origin, x, y, add_ear=True):
+    """
+    Hats of make_block(level, add_ear), in the same order, that meet
+    window = (minx, miny, maxx, maxy) in world coordinates, as a
+    (k, 14, 2) array of world coordinates. The block is descended through
+    its layout (no contour search), and only the sub-blocks whose bounding
+    box meets the window are expanded.
+    """
+    world = np.array([x, y, origin], dtype=float)
+    minx, miny, maxx, maxy = window
+    # every block placed so far: add_ear, matrix and translation (grid)
+    ears = np.array([add_ear])
+    matrices = np.eye(2, dtype=np.int64)[None]
+    shifts = np.zeros((1, 2), dtype=np.int64)
+    for current in range(level, 0, -1):
+        # blocks of this level that meet the window
+        keep = np.zeros(len(ears), dtype=bool)
+        for ear in (False, True):
+            rows = np.flatnonzero(ears == ear)
+            hull = _block_hull(current, ear)
+            bounds = _world_bounds(np.einsum('kij,nj->kni', matrices[rows], hull) + shifts[rows, None], world)
+            keep[rows] = ((bounds[:, 0] <= maxx) & (bounds[:, 2] >= minx)
+                          & (bounds[:, 1] <= maxy) & (bounds[:, 3] >= miny))
+        ears, matrices, shifts = ears[keep], matrices[keep], shifts[keep]
+        if current == 1:
+            break
+        # expand them into their sub-blocks, keeping the order of make_block
+        parts = []
+        for ear in (False, True):
+            rows = np.flatnonzero(ears == ear)
+            for index, (child_ear, matrix, shift) in enumerate(_block_children(current, ear)):
+                parts.append((rows, np.full(len(rows), index), np.full(len(rows), child_ear),
+                              matrices[rows] @ matrix, matrices[rows] @ shift + shifts[rows]))
+        parent, index, ears, matrices, shifts = (np.concatenate(column) for column in zip(*parts))
+        order = np.lexsort((index, parent))
+        ears, matrices, shifts = ears[order], matrices[order], shifts[order]
+
+    # hats of the first blocks left (the first block without ear is the
+    # one with ear less its last hat)
+    counts = np.where(ears, 8, 7)
+    xy = KERNELS[kernel_backend](matrices, shifts, counts, np.array(make_first_block(True)), world)
+    inside = ((xy[..., 0].min(axis=1) <= maxx) & (xy[..., 0].max(axis=1) >= minx)
+              & (xy[..., 1].min(axis=1) <= maxy) & (xy[..., 1].max(axis=1) >= miny))
+    return xy[inside]
+
+
+# Hat kernels: first blocks placed by integer grid matrices (exact), then
+# converted to world coordinates with the same sums in the same order on
+# every backend, so that the results are bit-identical. 'numba' (when Numba
+# is installed) compiles the loops, which fill the output array directly;
+# 'numpy' works on whole arrays. TESCALERA_KERNELS or set_kernel_backend
+# choose.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+def _place_hats_numpy(matrices, shifts, counts, first_block, world):
+    block = np.repeat(np.arange(len(counts)), counts)
+    hat = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    grid = np.einsum('kij,knj->kni', matrices[block], first_block[hat]) + shifts[block, None]
+    xy = np.empty(grid.shape)
+    xy[..., 0] = grid[..., 0] * world[0, 0] + grid[..., 1] * world[1, 0] + world[2, 0]
+    xy[..., 1] = grid[..., 0] * world[0, 1] + grid[..., 1] * world[1, 1] + world[2, 1]
+    return xy
+
+def _place_hats_loops(matrices, shifts, counts, first_block, world):
+    xy = np.empty((counts.sum(), first_block.shape[1], 2))
+    row = 0
+    for b in range(len(counts)):
+        m, t = matrices[b], shifts[b]
+        for h in range(counts[b]):
+            for v in range(first_block.shape[1]):
+                p, q = first_block[h, v, 0], first_block[h, v, 1]
+                gx = m[0, 0] * p + m[0, 1] * q + t[0]
+                gy = m[1, 0] * p + m[1, 1] * q + t[1]
+                xy[row, v, 0] = gx * world[0, 0] + gy * world[1, 0] + world[2, 0]
+                xy[row, v, 1] = gx * world[0, 1] + gy * world[1, 1] + world[2, 1]
+            row += 1
+    return xy
+
+KERNELS = {'numpy': _place_hats_numpy}
+if numba is not None:
+    KERNELS['numba'] = numba.njit(cache=True)(_place_hats_loops)
+
+kernel_backend = os.environ.get('TESCALERA_KERNELS', 'numba')
+if kernel_backend not in KERNELS:
+    kernel_backend = 'numpy'
+
+def set_kernel_backend(name):
+    # 'numpy' or 'numba' (see KERNELS)
+    global kernel_backend
+    if name not in KERNELS:
+        raise ValueError("kernel backend %r is not available (%s)" % (name, ', '.join(KERNELS)))
+    kernel_backend = name
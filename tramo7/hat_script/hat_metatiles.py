@@ -0,0 +1,288 @@
+"""
+Hat tilings from the H, T, P and F metatiles of Smith, Myers, Kaplan and
+Goodman-Strauss ("An aperiodic monotile", 2023), as in Kaplan's hatviz.
+
+    python hat_metatiles.py [level]   # writes metatile_hats.svg
+
+A metatile of level n is a fixed list of metatiles of level n - 1, each
+with its affine placement (a rotation by a multiple of 60 degrees and a
+translation); the metatiles of level 1 hold 4 (H), 1 (T) or 2 (P, F)
+hats. The placements of each level are cut once from a patch of level
+n - 1 metatiles around an H, so a tiling of any level is a product of
+matrices per metatile, applied to whole arrays, with no contour search
+(make_block) and nothing to deduplicate: every hat has one place in the
+hierarchy. A window only expands the metatiles whose hull meets it.
+
+The hats come out in the integer grid of hat_blocks, with its vertex order
+(flipped hats as flip_polygon_in_grid), so convert_polygons_to_world_cs
+and the orientations of hat-tiling_v2.py apply to them.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from hat_blocks import make_hat_in_grid, flip_polygon_in_grid, rotate_60, _convex_hull, _world_bounds
+
+KINDS = ('H', 'T', 'P', 'F')
+R3 = math.sqrt(3)
+
+
+# Affine maps, as 3x3 matrices acting on column vectors (x, y, 1)
+def _affine(a, b, c, d, e, f):
+    return np.array([[a, b, c], [d, e, f], [0, 0, 1.]])
+
+
+def _translate(v):
+    return _affine(1, 0, v[0], 0, 1, v[1])
+
+
+def _rotate(angle, about=(0, 0)):
+    c, s = math.cos(angle), math.sin(angle)
+    return _translate(about) @ _affine(c, -s, 0, s, c, 0) @ _translate(-np.asarray(about))
+
+
+def _apply(matrix, point):
+    return matrix[:2, :2] @ point + matrix[:2, 2]
+
+
+def _match(p1, q1, p2, q2):
+    # the rotation, scaling and translation taking segment p1 q1 to p2 q2
+    def segment(p, q):
+        return _affine(q[0] - p[0], p[1] - q[1], p[0], q[1] - p[1], q[0] - p[0], p[1])
+    return segment(p2, q2) @ np.linalg.inv(segment(p1, q1))
+
+
+def _intersect(p1, q1, p2, q2):
+    # crossing of the lines p1 q1 and p2 q2
+    d1, d2 = q1 - p1, q2 - p2
+    t = (d2[0] * (p1[1] - p2[1]) - d2[1] * (p1[0] - p2[0])) / (d2[1] * d1[0] - d2[0] * d1[1])
+    return p1 + t * d1
+
+
+# Metatiles, in the frame of the paper (hexagons of edge 1)
+def _hex(x, y):
+    return np.array([x + 0.5 * y, R3 / 2 * y])
+
+
+HAT = np.array([_hex(0, 0), _hex(-1, -1), _hex(0, -2), _hex(2, -2), _hex(2, -1), _hex(4, -2), _hex(5, -1),
+                _hex(4, 0), _hex(3, 0), _hex(2, 2), _hex(0, 3), _hex(0, 2), _hex(-1, 2)])
+
+
+def _first_metatiles():
+    # {kind: (outline, [(child, placement)])}, the children are hats at half
+    # scale ('flipped' for the reflected hat of H)
+    h = R3 / 2
+    half = _affine(0.5, 0, 0, 0, 0.5, 0)
+    flip = _affine(0.5, 0, 0, 0, -0.5, 0)
+    H = np.array([(0, 0), (4, 0), (4.5, h), (2.5, 5 * h), (1.5, 5 * h), (-0.5, h)])
+    T = np.array([(0, 0), (3, 0), (1.5, 3 * h)])
+    P = np.array([(0, 0), (4, 0), (3, 2 * h), (-1, 2 * h)])
+    F = np.array([(0, 0), (3, 0), (3.5, h), (3, 2 * h), (-1, 2 * h)])
+    pair = [('hat', _affine(0.5, 0, 1.5, 0, 0.5, h)), ('hat', _translate((0, 2 * h)) @ _rotate(-math.pi / 3) @ half)]
+    return {
+        'H': (H, [('hat', _match(HAT[5], HAT[7], H[5], H[0])),
+                  ('hat', _match(HAT[9], HAT[11], H[1], H[2])),
+                  ('hat', _match(HAT[5], HAT[7], H[3], H[4])),
+                  ('flipped', _translate((2.5, h)) @ _rotate(2 * math.pi / 3) @ flip)]),
+        'T': (T, [('hat', _affine(0.5, 0, 0.5, 0, 0.5, h))]),
+        'P': (P, pair),
+        'F': (F, pair),
+    }
+
+
+# The patch the next level is cut from: every rule glues a metatile along an
+# edge, either an edge of one metatile already placed, as (child, edge,
+# kind, edge of the new one), or between the vertices of two, as (child,
+# vertex, child, vertex, kind, edge of the new one)
+PATCH = (('H',), (0, 0, 'P', 2), (1, 0, 'H', 2), (2, 0, 'P', 2), (3, 0, 'H', 2), (4, 4, 'P', 2),
+         (0, 4, 'F', 3), (2, 4, 'F', 3), (4, 1, 3, 2, 'F', 0), (8, 3, 'H', 0), (9, 2, 'P', 0),
+         (10, 2, 'H', 0), (11, 4, 'P', 2), (12, 0, 'H', 2), (13, 0, 'F', 3), (14, 2, 'F', 1),
+         (15, 3, 'H', 4), (8, 2, 'F', 1), (17, 3, 'H', 0), (18, 2, 'P', 0), (19, 2, 'H', 2),
+         (20, 4, 'F', 3), (20, 0, 'P', 2), (22, 0, 'H', 2), (23, 4, 'F', 3), (23, 0, 'F', 3),
+         (16, 0, 'P', 2), (9, 4, 0, 2, 'T', 2), (4, 0, 'F', 3))
+# the patch children that make up each metatile of the next level
+CHILDREN = {'H': (0, 9, 16, 27, 26, 6, 1, 8, 10, 15), 'T': (11,), 'P': (7, 2, 3, 4, 28),
+            'F': (21, 20, 22, 23, 24, 25)}
+
+
+def _next_metatiles(metatiles):
+    children = []
+
+    def vertex(n, i):
+        kind, matrix = children[n]
+        outline = metatiles[kind][0]
+        return _apply(matrix, outline[i % len(outline)])
+
+    for rule in PATCH:
+        if len(rule) == 1:
+            children.append((rule[0], np.eye(3)))
+            continue
+        if len(rule) == 4:
+            n, edge, kind, new_edge = rule
+            p, q = vertex(n, edge + 1), vertex(n, edge)
+        else:
+            n, i, m, j, kind, new_edge = rule
+            p, q = vertex(m, j), vertex(n, i)
+        outline = metatiles[kind][0]
+        children.append((kind, _match(outline[new_edge], outline[(new_edge + 1) % len(outline)], p, q)))
+
+    # outlines of the new metatiles, from the corners of the patch
+    turn = _rotate(-math.pi / 3)[:2, :2]
+    bps1, bps2 = vertex(8, 2), vertex(21, 2)
+    p72, p252 = vertex(7, 2), vertex(25, 2)
+    llc = _intersect(bps1, _apply(_rotate(-2 * math.pi / 3, bps1), bps2), vertex(6, 2), p72)
+    w = turn @ (vertex(6, 2) - llc)
+    H = [llc, bps1, bps1 + w, vertex(14, 2), vertex(14, 2) - turn @ w, vertex(6, 2)]
+    P = [p72, p72 + bps1 - llc, bps1, llc]
+    F = [bps2, vertex(24, 2), vertex(25, 0), p252, p252 + llc - bps1]
+    corner = H[1] + H[4] - H[5]
+    T = [corner, _apply(_rotate(-math.pi / 3, corner), H[2]), H[2]]
+    result = {}
+    for kind, outline in (('H', H), ('T', T), ('P', P), ('F', F)):
+        # centred on their outline
+        outline = np.array(outline)
+        centre = outline.mean(axis=0)
+        result[kind] = (outline - centre, [(children[n][0], _translate(-centre) @ children[n][1])
+                                           for n in CHILDREN[kind]])
+    return result
+
+
+@lru_cache(maxsize=None)
+def metatiles(level):
+    """{kind: (outline, [(child kind, placement)])} of the metatiles of a level (from 1)"""
+    if level == 1:
+        return _first_metatiles()
+    return _next_metatiles(metatiles(level - 1))
+
+
+# Placements in the grid of hat_blocks: the half scale hat of the paper is
+# make_hat_in_grid() under GRID, and the flipped hats are rotations of
+# flip_polygon_in_grid(make_hat_in_grid())
+GRID = np.array([[4, 0, 0], [-2, 2 * R3, 0], [0, 0, 1.]])
+DOUBLE = _affine(2, 0, 0, 0, 2, 0)
+FLIP = np.array([[1, 1], [0, -1]])
+HATS = np.array([make_hat_in_grid(), list(flip_polygon_in_grid(make_hat_in_grid()))])
+
+
+@lru_cache(maxsize=None)
+def _tables(level):
+    # {kind: (child kinds, (m, 3, 3) placements)}, in grid coordinates; the
+    # children of level 1 are hats (0) and flipped hats (1)
+    names = ('hat', 'flipped') if level == 1 else KINDS
+    scale = DOUBLE if level == 1 else np.eye(3)
+    inverse = np.linalg.inv(GRID)
+    return {kind: (np.array([names.index(child) for child, _ in children]),
+                   np.array([GRID @ matrix @ scale @ inverse for _, matrix in children]))
+            for kind, (_, children) in metatiles(level).items()}
+
+
+@lru_cache(maxsize=None)
+def _hull(level, kind):
+    # convex hull of the hats of a metatile, in grid coordinates
+    kinds, matrices = _tables(level)[kind]
+    if level == 1:
+        points = np.einsum('kij,nj->kni', matrices[:, :2, :2], HATS[0]) + matrices[:, None, :2, 2]
+    else:
+        points = np.concatenate([_hull(level - 1, KINDS[child]) @ matrix[:2, :2].T + matrix[:2, 2]
+                                 for child, matrix in zip(kinds, matrices)])
+    return _convex_hull(points.reshape(-1, 2))
+
+
+def _root(level, kind):
+    # placement of the top metatile: centred on the grid origin, moved by less
+    # than a grid step so that its hats land on the grid
+    matrix = np.eye(3)
+    for current in range(level, 0, -1):
+        kinds, matrices = _tables(current)[kind]
+        matrix = matrix @ matrices[0]
+        kind = KINDS[kinds[0]] if current > 1 else kind
+    return _translate(np.rint(matrix[:2, 2]) - matrix[:2, 2])
+
+
+def _meets(bounds, window):
+    return ((bounds[:, 0] <= window[2]) & (bounds[:, 2] >= window[0])
+            & (bounds[:, 1] <= window[3]) & (bounds[:, 3] >= window[1]))
+
+
+def _within(bounds, window):
+    return ((bounds[:, 0] >= window[0]) & (bounds[:, 2] <= window[2])
+            & (bounds[:, 1] >= window[1]) & (bounds[:, 3] <= window[3]))
+
+
+def _hats_in_grid(level, kind, window, world):
+    # (k, 14, 2) integer grid coordinates of the hats of a metatile whose
+    # world bounding box meets window (all of them for window None)
+    kinds = np.array([KINDS.index(kind)])
+    matrices = _root(level, kind)[None]
+    # metatiles that may cross the edge of the window: the children of the
+    # others are all inside, and are not tested again
+    crossing = np.array([window is not None])
+    for current in range(level, 0, -1):
+        if crossing.any():
+            keep = np.ones(len(kinds), dtype=bool)
+            for k, name in enumerate(KINDS):
+                rows = np.flatnonzero((kinds == k) & crossing)
+                hull = np.einsum('kij,nj->kni', matrices[rows, :2, :2], _hull(current, name))
+                bounds = _world_bounds(hull + matrices[rows, None, :2, 2], world)
+                keep[rows] = _meets(bounds, window)
+                crossing[rows] = ~_within(bounds, window)
+            kinds, matrices, crossing = kinds[keep], matrices[keep], crossing[keep]
+        # expand them into their children
+        parts = []
+        for k, name in enumerate(KINDS):
+            rows = np.flatnonzero(kinds == k)
+            child_kinds, child_matrices = _tables(current)[name]
+            parts.append((np.tile(child_kinds, len(rows)),
+                          (matrices[rows, None] @ child_matrices).reshape(-1, 3, 3),
+                          np.repeat(crossing[rows], len(child_kinds))))
+        kinds, matrices, crossing = (np.concatenate(column) for column in zip(*parts))
+
+    # hats: every placement is now a grid symmetry, exact once rounded
+    flipped = kinds == 1
+    linear = np.rint(matrices[:, :2, :2]).astype(np.int64)
+    linear[flipped] = linear[flipped] @ FLIP
+    shifts = np.rint(matrices[:, :2, 2]).astype(np.int64)
+    grid = np.einsum('kij,knj->kni', linear, HATS[kinds]) + shifts[:, None]
+    if crossing.any():
+        keep = np.ones(len(grid), dtype=bool)
+        keep[crossing] = _meets(_world_bounds(grid[crossing], world), window)
+        grid = grid[keep]
+    return grid
+
+
+def make_metatile(level, kind='H'):
+    """Hats of a metatile of the given level, as polygons in grid coordinates (like make_block)"""
+    return [[tuple(vertex) for vertex in hat] for hat in _hats_in_grid(level, kind, None, None).tolist()]
+
+
+def query_window(level, window, origin, x, y, kind='H'):
+    """
+    Hats of a metatile of the given level (centred on origin) that meet
+    window = (minx, miny, maxx, maxy) in world coordinates, as a (k, 14, 2)
+    array of world coordinates (grid basis x and y, as in hat_blocks).
+    Only the metatiles whose hull meets the window are expanded.
+    """
+    world = np.array([x, y, origin], dtype=float)
+    grid = _hats_in_grid(level, kind, window, world)
+    return grid @ world[:2] + world[2]
+
+
+if __name__ == '__main__':
+    import sys
+    from pathlib import Path
+    from shapely.geometry import Polygon
+
+    script_dir = Path(__file__).parent.resolve()
+    sys.path.insert(0, str(script_dir.parent.parent))
+    from polygon_utils import simple_svg_save
+
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # the 1400 x 2000 mm frame of hat-tiling_v2.py, the basis of hat_blocks
+    # (simple_svg_save flips y)
+    x = (0, 7.1)
+    hats = query_window(level, (0, -2000, 1400, 0), (700, -1000), x, rotate_60(x))
+    polygons = [Polygon(hat) for hat in hats]
+    filename = script_dir / 'metatile_hats.svg'
+    simple_svg_save(polygons, str(filename), size=('1400mm', '2000mm'), label=False)
+    print(f"{filename.name}: {len(polygons)} hats")
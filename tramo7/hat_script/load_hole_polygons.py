@@ -1,24 +1,12 @@
-from xml.etree import ElementTree as ET
-from svgpathtools import parse_path
-from svgpathtools.parser import parse_transform
-from svgpathtools.path import Line, CubicBezier
-
 import os
+import sys
+from pathlib import Path
 
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.resolve().parent.parent
+sys.path.insert(0, str(project_root))
 
-def extract_points_from_path(path_data):
-    """
-    returns a list of points
-    from the svg.path object
-    """
-    # keep only points that are Line or Bezier
-    points = [(p.start.real, p.start.imag) 
-              for p in path_data 
-              if isinstance(p, (Line, CubicBezier))]
-    # append the last point          
-    points.append((path_data[-1].end.real, path_data[-1].end.imag))
-    
-    return points
+from svg_paths import read_svg_paths
 
 
 def get_hole_points(svg_file_path=None):
@@ -37,20 +25,13 @@ def get_hole_points(svg_file_path=None):
     if svg_file_path is None:
         svg_file_path = os.path.join(os.path.dirname(__file__), 'hat_and_holes.svg')
     
-    tree = ET.parse(svg_file_path)
-    root = tree.getroot()
-
-    # Let's store the paths defining the holes
-    hole_paths = []
-    for path in root.iter('{http://www.w3.org/2000/svg}path'):
-        if 'hole' in path.get('id'):
-            path_data = parse_path(path.get('d'))
-            hole_paths.append(path_data)
+    # the hole outlines are straight segments (Inkscape writes some of them
+    # as flat cubic curves, which collapse to their end points).
+    # Transforms are not applied: the hat script places the holes itself.
+    hole_paths = read_svg_paths(svg_file_path, id_contains='hole', apply_transforms=False)
 
-    hole_points = []
     # create list of holes with sub-lists of tuples (points)
-    for hole in hole_paths:
-        hole_points.append(extract_points_from_path(hole))
+    hole_points = [[tuple(p) for p in points.tolist()] for points, _ in hole_paths]
     
     return hole_points
 
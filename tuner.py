@@ -0,0 +1,184 @@
+"""
+Interactive tuning of a pattern in Jupyter.
+
+    from tuner import tune
+    from penrose_tessellation import SUN, iterate, get_shapely_polygons
+
+    def penrose(iters=6, scale=1.0):
+        return [affinity.scale(p, scale, scale, origin=(0, 0))
+                for p in get_shapely_polygons(iterate(SUN, iters))]
+
+    tune(penrose, iters=(3, 8, 1), scale=(0.5, 3, 0.1),
+         frame_shift=(-50, 50, 1), inset_distance=(0, 6, 0.1))
+
+Every keyword given as a (min, max, step) tuple becomes a slider, any other
+keyword is a fixed value. Parameters of the generator function go to the
+generator, the others to the stages of the riser pipeline:
+
+    generate -> frame (tabica_width, tabica_height, frame_shift)
+             -> inset (inset_distance)
+             -> crop  (side_margin, bottom_margin, window_height)
+
+Stage outputs are memoized on the parameters they depend on, so moving the
+frame does not regenerate the pattern and changing a margin only re-crops
+(through a RiserSession). The result is redrawn as one LineCollection.
+"""
+import inspect
+import time
+from collections import OrderedDict
+
+import numpy as np
+import shapely
+from shapely import affinity
+from shapely.geometry import JOIN_STYLE
+
+from polygon_geometry import add_tile, add_inner_tile, _flatten_polygons, _ensure_iterable
+from riser_session import RiserSession
+
+# defaults of the pipeline parameters, as in the step_X.Y notebooks
+DEFAULTS = {
+    'tabica_width': 908,
+    'tabica_height': 170,
+    'frame_shift': 0,
+    'inset_distance': 3,
+    'side_margin': 16,
+    'bottom_margin': 26,
+    'window_height': 122,
+}
+
+
+class Pipeline:
+    """
+    Chain of stages with memoized outputs. Every stage is a function of the
+    previous stage's output and of its own parameters; it is only run again
+    when one of those (or anything upstream) changed.
+    """
+    def __init__(self, stages, cache_size=8):
+        """
+        Args:
+            stages: list of (name, function, parameter names); function is
+                    called as function(previous_output, **parameters)
+            cache_size: outputs kept per stage
+        """
+        self.stages = stages
+        self.cache_size = cache_size
+        self._cache = {name: OrderedDict() for name, _, _ in stages}
+        self.timings = {}
+
+    def run(self, **params):
+        """Output of the last stage; self.timings holds each stage's time (None when cached)"""
+        output, key = None, ()
+        for name, function, names in self.stages:
+            key = (key, tuple(params[n] for n in names))
+            cache = self._cache[name]
+            if key in cache:
+                cache.move_to_end(key)
+                output = cache[key]
+                self.timings[name] = None
+                continue
+            start = time.perf_counter()
+            output = function(output, **{n: params[n] for n in names})
+            self.timings[name] = time.perf_counter() - start
+            cache[key] = output
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return output
+
+    def format_timings(self):
+        return '  '.join(f"{name} {'cached' if seconds is None else f'{seconds:.3f}s'}"
+                         for name, seconds in self.timings.items())
+
+
+# Riser pipeline
+def _frame_stage(polygons, tabica_width, tabica_height, frame_shift):
+    # centre the tabica on the pattern and keep the polygons whose centroid is inside
+    flat = _flatten_polygons(_ensure_iterable(polygons))
+    polygons = np.empty(len(flat), dtype=object)
+    polygons[:] = flat
+    x, y = shapely.get_coordinates(shapely.centroid(polygons)).T
+    # same centring as center_frame, from the centroid array
+    frame = add_tile(tabica_width, tabica_height, [])
+    frame = affinity.translate(frame, (x.min() + x.max() - tabica_width) / 2,
+                               (y.min() + y.max() - tabica_height) / 2 + frame_shift)
+    minx, miny, maxx, maxy = frame.bounds
+    inside = (minx <= x) & (x <= maxx) & (miny <= y) & (y <= maxy)
+    return polygons[inside], frame
+
+
+def _inset_stage(framed, inset_distance):
+    polygons, frame = framed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # slivers of the pattern buffer to nothing
+        inset = shapely.buffer(polygons, -inset_distance, join_style=JOIN_STYLE.mitre)
+    inset = inset[~shapely.is_empty(inset)]
+    return RiserSession(list(inset), save_holes=False), frame
+
+
+def _crop_stage(inset, side_margin, bottom_margin, window_height):
+    session, frame = inset
+    window = add_inner_tile(frame, side_margin=side_margin, bottom_margin=bottom_margin,
+                            height=window_height)
+    return session.place('tuner', window) + [frame, window]
+
+
+def riser_pipeline(generate):
+    """Pipeline generate -> frame -> inset -> crop for a pattern generator"""
+    generator_params = list(inspect.signature(generate).parameters)
+    return Pipeline([
+        ('generate', lambda _, **kwargs: generate(**kwargs), generator_params),
+        ('frame', _frame_stage, ['tabica_width', 'tabica_height', 'frame_shift']),
+        ('inset', _inset_stage, ['inset_distance']),
+        ('crop', _crop_stage, ['side_margin', 'bottom_margin', 'window_height']),
+    ])
+
+
+# Widget
+def _slider(widgets, name, value, minimum, maximum, step):
+    integer = all(isinstance(v, int) for v in (value, minimum, maximum, step))
+    slider = widgets.IntSlider if integer else widgets.FloatSlider
+    return slider(value=value, min=minimum, max=maximum, step=step, description=name,
+                  continuous_update=False)
+
+
+def tune(generate, **params):
+    """
+    Show sliders for the given parameters and redraw the cropped riser on
+    every change (see the module docstring). Returns the widget.
+    """
+    import ipywidgets as widgets
+    import matplotlib.pyplot as plt
+    from IPython.display import display
+    from preview import plot_outlines
+
+    pipeline = riser_pipeline(generate)
+    signature = inspect.signature(generate).parameters
+    values = {**DEFAULTS,
+              **{name: p.default for name, p in signature.items() if p.default is not p.empty}}
+    sliders = {}
+    for name, value in params.items():
+        if isinstance(value, tuple):
+            minimum, maximum, step = value
+            start = values.get(name, minimum)
+            sliders[name] = _slider(widgets, name, start, minimum, maximum, step)
+        else:
+            values[name] = value
+
+    output = widgets.Output()
+    status = widgets.Label()
+
+    def redraw(_=None):
+        values.update({name: slider.value for name, slider in sliders.items()})
+        start = time.perf_counter()
+        cut_list = pipeline.run(**values)
+        with output:
+            output.clear_output(wait=True)
+            plot_outlines(cut_list, colors='blue', linewidth=0.5)
+            plt.show()
+        status.value = f"{pipeline.format_timings()}  total {time.perf_counter() - start:.3f}s"
+
+    for slider in sliders.values():
+        slider.observe(redraw, names='value')
+    box = widgets.VBox([*sliders.values(), status, output])
+    display(box)
+    redraw()
+    return box